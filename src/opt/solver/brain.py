@@ -1,17 +1,26 @@
 import time
 import numpy as np
 from typing import List
-from pyomo.environ import value
 
 from src.scenario.operate import Operate
 from src.scenario.env import Env
 from src.opt.solver.model.pym import PyoModel
+from src.opt.solver.model.greedy import GreedyModel
+from src.opt.solver.model.matrix import MatrixModel
+from src.opt.solver.model.decompose import DecompositionModel
+from src.opt.solver.model.active import ActiveModel
+from src.opt.solver.decision_cache import DecisionCache
+from src.opt.solver.evaluator import Evaluator
+from src.tools.instrument import INSTRUMENT, timed
 
 
 class Brain:
     def __init__(self, env: Env, is_scheduled: bool, has_caching: bool, linear: bool = True, deletion: bool = False,
-                 solver: str = 'scip'):
-        self.opt = PyoModel(env=env, solver=solver)
+                 solver: str = 'scip', persistent: bool = False, builder: str = 'pyomo', decision_cache: int = 0,
+                 cache_quantum: float = 0.0, time_limit: float = None, mip_gap: float = None, fallback: str = 'greedy',
+                 reduce_active: bool = False, symmetry: float = None):
+        self.n_iot = env.n_iot
+        self.n_edge = env.n_edge
 
         self.is_scheduled = is_scheduled
         self.has_caching = has_caching
@@ -19,159 +28,252 @@ class Brain:
         # deletion
         self.deletion = deletion
 
-        if is_scheduled:
-            self.opt.add_schedule_var_cons()
-        if has_caching:
-            self.opt.add_cache_var_cons()
+        # DECISIONS OF SEEN STATES (decision_cache entries at most, 0 solves every slot)
+        self.decision_cache = DecisionCache(decision_cache, cache_quantum) if decision_cache > 0 else None
+        self.state_key = None
 
-        if is_scheduled and has_caching:
+        # SLOT DEADLINE (time_limit s, e.g. env.duration) over the fallback decision, the previous slot's ('previous',
+        # greedy in the first slot) or the greedy one ('greedy'), and the solve in the time left: a solve stopped by
+        # the limit keeps the better of its incumbent and the fallback, one without an incumbent the fallback
+        if fallback not in ('greedy', 'previous'):
+            raise ValueError(f"Unknown fallback {fallback}.")
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+        self.fallback = fallback
+        self.fallback_opt = None
+        # seconds the solves ran past the limit they were given, halved per solve (HiGHS checks its limit between
+        # presolve rounds)
+        self.solver_overrun = 0.0
+        self.last_action = None
+        self.slot = None
+        self.slot_log = list()
+
+        # OBJECTIVE OF ANY DECISION ON THE CURRENT PARAMS
+        self.evaluator = Evaluator(env=env, is_scheduled=is_scheduled, has_caching=has_caching,
+                                   deletion=deletion and is_scheduled and has_caching)
+
+        # MODEL OVER ALL DEVICES, OR REBUILT PER SLOT OVER THOSE WITH PENDING WORK (reduce_active); symmetry is the
+        # tolerance of interchangeable edges/devices, None leaves the symmetries in (see MatrixModel)
+        if builder not in ('pyomo', 'matrix', 'decompose'):
+            raise ValueError(f"Unknown model builder {builder}.")
+        self.solver = solver
+        self.builder = builder
+        self.linear = linear
+        self.persistent = persistent
+        self.symmetry = symmetry
+        if reduce_active:
+            self.opt = ActiveModel(env=env, is_scheduled=is_scheduled, has_caching=has_caching, build=self._build_model)
+        else:
+            self.opt = self._build_model(env)
+
+        if time_limit is not None or mip_gap is not None:
+            self.opt.set_limits(time_limit, mip_gap)
+        if time_limit is not None:
+            self.fallback_opt = GreedyModel(env=env, is_scheduled=is_scheduled, has_caching=has_caching,
+                                            deletion=deletion and is_scheduled and has_caching)
+
+    def _build_model(self, env):
+        if self.solver == 'heuristic':
+            return GreedyModel(env=env, is_scheduled=self.is_scheduled, has_caching=self.has_caching,
+                               deletion=self.deletion)
+        if self.builder == 'matrix':
+            return MatrixModel(env=env, is_scheduled=self.is_scheduled, has_caching=self.has_caching,
+                               linear=self.linear, deletion=self.deletion, solver=self.solver, symmetry=self.symmetry)
+        if self.builder == 'decompose':
+            return DecompositionModel(env=env, is_scheduled=self.is_scheduled, has_caching=self.has_caching,
+                                      linear=self.linear, deletion=self.deletion, solver=self.solver)
+        opt = PyoModel(env=env, solver=self.solver, persistent=self.persistent)
+        self._set_object(opt, self.linear)
+        if self.symmetry is not None:
+            opt.set_symmetry(self.symmetry)
+        return opt
+
+    def _set_object(self, opt, linear):
+        if self.is_scheduled:
+            opt.add_schedule_var_cons()
+        if self.has_caching:
+            opt.add_cache_var_cons()
+
+        if self.is_scheduled and self.has_caching:
             if linear:
-                if deletion:
+                if self.deletion:
                     # config deletion obj
-                    self.opt.set_linear_plus_deletion_object()
+                    opt.set_linear_plus_deletion_object()
                 else:
-                    self.opt.set_linear_object()
+                    opt.set_linear_object()
             else:
-                self.opt.set_nonlinear_object()
-        elif is_scheduled:
-            self.opt.set_schedule_object()
-        elif has_caching:
-            self.opt.set_cache_object()
+                opt.set_nonlinear_object()
+        elif self.is_scheduled:
+            opt.set_schedule_object()
+        elif self.has_caching:
+            opt.set_cache_object()
         else:
-            self.opt.set_offload_object()
+            opt.set_offload_object()
 
+    @timed('set_param')
     def set_mutable_param(self, operate: Operate):
         t = operate.env.time_count
-        for iot_index in range(operate.env.n_iot):
-            self.opt.model.G[iot_index] = operate.queue_iot_comp_remain[iot_index]
-
-            for edge_index in range(operate.env.n_edge):
-                self.opt.model.U[iot_index, edge_index] = operate.queue_iot_tran_remain[iot_index, edge_index]
-                self.opt.model.Q[iot_index, edge_index] = operate.queue_fog_comp_remain[iot_index, edge_index]
+        self.set_state(G=operate.queue_iot_comp_remain, U=operate.queue_iot_tran_remain,
+                       Q=operate.queue_fog_comp_remain, D=operate.env.bit_arrive[t], y_pre=operate.y_pre,
+                       z_pre=operate.z_pre, slot=t)
 
-        for iot_index in range(len(self.opt.model.I)):
-            self.opt.model.D[iot_index] = operate.env.bit_arrive[t][iot_index]
+    def set_state(self, G, U, Q, D, y_pre, z_pre, slot=None):
+        # MUTABLE PARAMS FROM ARRAYS (an observed or a predicted state), slot labels the slot_log entry
+        self.slot = slot
+        state = (('G', G), ('U', U), ('Q', Q), ('D', D), ('y_pre', y_pre), ('z_pre', z_pre))
+        for name, values in state:
+            self.opt.set_param_array(name, values)
+            self.evaluator.set_param_array(name, values)
+        if self.fallback_opt is not None:
+            for name, values in state:
+                self.fallback_opt.set_param_array(name, values)
 
-        for iot_index in range(operate.env.n_iot):
-            for edge_index in range(operate.env.n_edge):
-                self.opt.model.y_pre[iot_index, edge_index] = operate.y_pre[iot_index, edge_index]
-                self.opt.model.z_pre[iot_index, edge_index] = operate.z_pre[iot_index, edge_index]
+        if self.decision_cache is not None:
+            self.state_key = self.decision_cache.key(G, U, Q, D, y_pre, z_pre)
 
     def choose_action(self):
         start_time = time.time()
-        res = self.opt.solver.solve(self.opt.model)
-        # res.write()
+        if self.decision_cache is not None:
+            action = self.decision_cache.get(self.state_key)
+            if action is not None:
+                # STORED DECISION, THE SOLUTION TIME IS THE LOOKUP
+                action = action[:-2] + (time.time() - start_time, action[-1])
+                if self.time_limit is not None:
+                    self._log_slot(action, None, 'cached')
+                return action
+
+        fallback = None
+        if self.time_limit is None:
+            res = self.opt.solve()
+            # res.write()
+            decision_opt = self.opt
+        else:
+            decision_opt, status, fallback = self._solve_by_deadline()
 
         end_time = time.time()
 
         solution_time = end_time - start_time
 
-        opt_val = value(self.opt.model.obj)
+        with INSTRUMENT.phase('extract'):
+            opt_val = decision_opt.obj_value()
 
-        offloads: np.ndarray = np.zeros([len(self.opt.model.I), len(self.opt.model.J)])
-        actions = [0 for _ in self.opt.model.I]
-        actions = [int(action) for action in actions]
+            offloads: np.ndarray = decision_opt.get_binary_array('x')
+            actions = np.where(offloads.any(axis=1), offloads.argmax(axis=1) + 1, 0)
+            actions = [int(action) for action in actions]
 
-        for iot_index in range(len(self.opt.model.I)):
-            for edge_index in range(len(self.opt.model.J)):
-                if value(self.opt.model.x[iot_index, edge_index]) == 1:
-                    offloads[iot_index, edge_index] = 1
-                    actions[iot_index] = edge_index + 1
-
-        allocation: List = list()
-        if self.is_scheduled:
-            for edge in range(len(self.opt.model.J)):
-                allocation.append(np.zeros([len(self.opt.model.I), len(self.opt.model.I)]))
+            allocation: List = list()
+            if self.is_scheduled:
+                allocation = list(decision_opt.get_binary_array('k'))
 
-            for edge_index in range(len(self.opt.model.J)):
-                for iot_index in range(len(self.opt.model.I)):
-                    for iot_index_ in range(len(self.opt.model.I)):
-                        if value(self.opt.model.k[edge_index, iot_index, iot_index_]) == 1:
-                            allocation[edge_index][iot_index, iot_index_] = 1
-
-        container_caching: np.ndarray = np.zeros([len(self.opt.model.I), len(self.opt.model.J)])
-        image_caching: np.ndarray = np.zeros([len(self.opt.model.I), len(self.opt.model.J)])
-        if self.has_caching:
-            for iot_index in range(len(self.opt.model.I)):
-                for edge_index in range(len(self.opt.model.J)):
-
-                    if value(self.opt.model.y[iot_index, edge_index]) == 1:
-                        container_caching[iot_index, edge_index] = 1
-                    else:
-                        container_caching[iot_index, edge_index] = 0
-
-                    if value(self.opt.model.z[iot_index, edge_index]) == 1:
-                        image_caching[iot_index, edge_index] = 1
-                    else:
-                        image_caching[iot_index, edge_index] = 0
+            container_caching: np.ndarray = np.zeros([self.n_iot, self.n_edge])
+            image_caching: np.ndarray = np.zeros([self.n_iot, self.n_edge])
+            if self.has_caching:
+                container_caching = decision_opt.get_binary_array('y')
+                image_caching = decision_opt.get_binary_array('z')
 
         # self.opt.display_solution()
         # self.opt.display_linear_coe()
 
         if self.is_scheduled and self.has_caching:
             # deletion print obj value
-            if self.deletion:
+            if self.deletion and isinstance(decision_opt, PyoModel):
                 obj_value = self.get_obj_value(x=offloads, y=container_caching, z=image_caching, k=allocation)
                 print(f'obj_value = {obj_value}')
-            return actions, allocation, container_caching, image_caching, solution_time, opt_val
+            action = actions, allocation, container_caching, image_caching, solution_time, opt_val
         elif self.is_scheduled:
-            return actions, allocation, solution_time, opt_val
+            action = actions, allocation, solution_time, opt_val
         elif self.has_caching:
-            return actions, container_caching, image_caching, solution_time, opt_val
+            action = actions, container_caching, image_caching, solution_time, opt_val
         else:
-            return actions, solution_time, opt_val
+            action = actions, solution_time, opt_val
+
+        if self.time_limit is not None:
+            self._log_slot(action, fallback, status)
+
+        # fallback decisions are not stored, the state gets solved again
+        if self.decision_cache is not None and fallback is None:
+            self.decision_cache.put(self.state_key, action)
+        return action
+
+    def _log_slot(self, action, fallback, status):
+        # SLOT RECORD AND THE DECISION KEPT FOR THE 'previous' FALLBACK, action as returned by choose_action
+        actions, rest = np.asarray(action[0]), list(action[1:-2])
+        offloads = np.zeros([self.n_iot, self.n_edge])
+        offloads[actions > 0, actions[actions > 0] - 1] = 1
+        allocation = rest.pop(0) if self.is_scheduled else list()
+        container_caching, image_caching = (rest[0], rest[1]) if self.has_caching else \
+            (np.zeros([self.n_iot, self.n_edge]), np.zeros([self.n_iot, self.n_edge]))
+
+        solution_time = action[-2]
+        self.slot_log.append({'slot': len(self.slot_log) if self.slot is None else self.slot,
+                              'solve_time': solution_time, 'deadline_miss': solution_time > self.time_limit,
+                              'fallback': fallback, 'status': status})
+        self.last_action = (offloads, allocation, container_caching, image_caching)
+
+    def _solve_by_deadline(self):
+        # (model holding the decision, solver status, fallback used or None); the fallback is taken first and the
+        # solver gets what is left of time_limit less its overrun, so that the slot stays within the deadline
+        start_time = time.time()
+        fallback = self._fallback_decision()
+        time_left = self.time_limit - (time.time() - start_time) - self.solver_overrun
+        if time_left <= 0:
+            return self.fallback_opt, 'No time left for the solver', fallback
+
+        self.opt.set_limits(time_left, self.mip_gap)
+        solve_start = time.time()
+        try:
+            res = self.opt.solve()
+        except ValueError as error:
+            return self.fallback_opt, str(error), fallback
+        finally:
+            self.solver_overrun = max(time.time() - solve_start - time_left, self.solver_overrun / 2)
+
+        status = self._termination(res)
+        if 'time' not in status.lower() or 'limit' not in status.lower():
+            return self.opt, status, None
+        # INCUMBENT CUT BY THE LIMIT: the fallback decision when that is better
+        if self.fallback_opt.obj_value() < self.opt.obj_value():
+            return self.fallback_opt, status, fallback
+        return self.opt, status, None
+
+    def _fallback_decision(self):
+        # PREVIOUS SLOT'S DECISION ON THE CURRENT PARAMS ('previous'), OR THE GREEDY ONE
+        if self.fallback == 'previous' and self.last_action is not None:
+            offloads, allocation, container_caching, image_caching = self.last_action
+            self.fallback_opt.x = offloads
+            if self.has_caching:
+                self.fallback_opt.y, self.fallback_opt.z = container_caching, image_caching
+            if self.is_scheduled:
+                # task order from the precedence matrices: position = number of tasks ahead
+                self.fallback_opt.order = np.argsort(np.rint(np.array(allocation).sum(axis=1)), axis=1, kind='stable')
+            self.fallback_opt.obj = self.fallback_opt.evaluate(self.fallback_opt.x, self.fallback_opt.y,
+                                                               self.fallback_opt.z, self.fallback_opt.order)
+            return 'previous'
+
+        self.fallback_opt.solve()
+        return 'greedy'
+
+    def _termination(self, res):
+        # SOLVER STATUS OF res: pyomo termination condition, HiGHS model status or the decomposition's own
+        if res is None:
+            # no device with pending work (reduce_active)
+            return 'ok'
+        # pyomo's SolverResults is a dict as well, its termination condition goes first
+        termination = getattr(getattr(res, 'solver', None), 'termination_condition', None)
+        if termination is not None:
+            return str(termination)
+        if isinstance(res, dict):
+            return res['status']
+        opt = self.opt.opt if isinstance(self.opt, ActiveModel) else self.opt
+        if isinstance(opt, MatrixModel):
+            return opt.highs.modelStatusToString(res)
+        return 'ok'
+
+    def close(self):
+        # WORKER POOLS OF THE MODEL (decompose builder, also behind reduce_active)
+        if hasattr(self.opt, 'close'):
+            self.opt.close()
 
     def get_obj_value(self, x, y, z, k):
-        obj_value = 0
-        for i in self.opt.model.I:
-            # mod.comp_time_on_iot[i]
-            obj_value += (1 - sum(x[i, j] for j in self.opt.model.J)) * (
-                        value(self.opt.model.G[i]) + value(self.opt.model.D[i])) * value(self.opt.model.rho[i]) / value(
-                self.opt.model.Fd[i])
-            # mod.tran_time_on_iot[i]
-            obj_value += sum(
-                x[i, j] * (value(self.opt.model.U[i, j]) + value(self.opt.model.D[i])) / value(self.opt.model.R[i, j]) for j in
-                self.opt.model.J)
-            # prepare
-            obj_value += sum(
-                x[i, j] * y[i, j] * (1 - value(self.opt.model.y_pre[i, j])) * value(self.opt.model.theta[i])
-                for j in self.opt.model.J)
-            obj_value += sum(
-                x[i, j] * z[i, j] * (1 - value(self.opt.model.z_pre[i, j])) * value(self.opt.model.mu[i]) / value(self.opt.model.R_pull[j])
-                for j in self.opt.model.J)
-            # wait
-            obj_value += sum(sum(
-                x[i, j] * value(self.opt.model.Q[ii, j]) * value(self.opt.model.rho[ii]) / value(self.opt.model.Fe[j]) +
-                x[i, j] * x[ii, j] * k[j][ii, i] * value(self.opt.model.D[ii]) * self.opt.model.rho[ii] / self.opt.model.Fe[j]
-                for ii in self.opt.model.I)
-                             for j in self.opt.model.J)
-
-            # edge computing time
-            obj_value += sum(
-                x[i, j] * value(self.opt.model.D[i]) * value(self.opt.model.rho[i]) / value(self.opt.model.Fe[j])
-                for j in self.opt.model.J)
-
-            # mod.delete_time[i, j]
-            obj_value += sum(
-                x[i, j] * (1 - y[i, j]) * value(self.opt.model.y_pre[i, j]) * value(self.opt.model.delta_container[i]) for j in
-                self.opt.model.J)
-            obj_value += sum(
-                x[i, j] * (1 - z[i, j]) * value(self.opt.model.z_pre[i, j]) * value(self.opt.model.delta_image[i]) for j in
-                self.opt.model.J)
-
-            # plus deletion
-            obj_value += sum(self.opt.model.delta_container[i] * (y[i, j] - value(self.opt.model.y_pre[i, j])) ** 2
-                             + self.opt.model.delta_image[i] * (z[i, j] - value(self.opt.model.z_pre[i, j])) ** 2for j in self.opt.model.J)
-
-        # print model obj value
-        model_obj = sum(self.opt.model.coe_non[i] +
-               sum(sum(self.opt.model.coe_q[i_, i, j] * x[i, j] * x[i_, j] * k[j][i_, i] for i_ in self.opt.model.I) for j in self.opt.model.J) +
-               sum(self.opt.model.coe_x[i, j] * x[i, j] for j in self.opt.model.J)
-               + sum(self.opt.model.coe_l[i, j] * x[i, j] * y[i, j] for j in self.opt.model.J)
-               + sum(self.opt.model.coe_m[i, j] * x[i, j] * z[i, j] for j in self.opt.model.J)
-               + sum(self.opt.model.delta_container[i] * (y[i, j] - value(self.opt.model.y_pre[i, j])) ** 2
-                     + self.opt.model.delta_image[i] * (z[i, j] - value(self.opt.model.z_pre[i, j])) ** 2 for j in self.opt.model.J)
-               for i in self.opt.model.I)
-        # print(f'model_obj_value = {value(model_obj)}')
-
-        return obj_value
+        # OBJECTIVE OF A DECISION ON THE PARAMS OF THE SLOT (a batch of decisions gives one value each)
+        return self.evaluator.evaluate(x, y, z, np.asarray(k))
@@ -0,0 +1,59 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+
+class DecisionCache:
+    """Action tuples of Brain.choose_action keyed on the mutable params of the slot, LRU over max_size entries.
+
+    quantum > 0 rounds every param to a multiple of quantum before hashing, so near-identical states share a decision.
+    """
+
+    def __init__(self, max_size=1024, quantum=0.0):
+        self.max_size = max_size
+        self.quantum = quantum
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, *arrays):
+        digest = hashlib.blake2b(digest_size=16)
+        for values in arrays:
+            values = np.asarray(values, dtype=np.float64)
+            if self.quantum > 0:
+                values = np.rint(values / self.quantum).astype(np.int64)
+            else:
+                # -0.0 and 0.0 hash alike
+                values = values + 0.0
+            digest.update(str(values.shape).encode())
+            digest.update(np.ascontiguousarray(values).tobytes())
+        return digest.digest()
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, action):
+        self.entries[key] = action
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.entries),
+                'hit_rate': self.hits / lookups if lookups > 0 else 0.0}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
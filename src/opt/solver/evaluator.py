@@ -0,0 +1,100 @@
+import numpy as np
+
+from src.scenario.env import Env
+
+
+class Evaluator:
+    """Objective of the Pyomo models for given decisions, from delay coefficient arrays computed once per slot.
+
+    evaluate takes one decision (x, y, z [I, J], k [J, I, I] precedence or [J, I] task order) or a batch with a
+    leading axis B on each and returns a float or B values. The terms are those of add_expressions.py:
+    t_l local, t_u transmit, t_s container startup, t_d image pull, t_c/t_m container/image deletion, t_r wait behind
+    queued work, t_e edge compute (also the wait caused behind a task scheduled earlier).
+    """
+
+    def __init__(self, env: Env, is_scheduled: bool, has_caching: bool, deletion: bool = False):
+        self.n_iot = env.n_iot
+        self.n_edge = env.n_edge
+        self.is_scheduled = is_scheduled
+        self.has_caching = has_caching
+        self.deletion = deletion and has_caching
+
+        # CONSTANTS
+        self.Fd = env.comp_cap_iot
+        self.Fe = env.comp_cap_edge
+        self.rho = env.comp_density
+        self.R = env.tran_cap_iot
+        self.theta = env.container_startup
+        self.delta_container = env.container_delete
+        self.mu = env.image_size
+        self.delta_image = env.image_delete
+        self.R_pull = env.edge_download_speed
+
+        # MUTABLE PARAMS AND THE TERMS OF THE LAST ONES (None: stale)
+        self.params = {'D': np.zeros(self.n_iot), 'G': np.zeros(self.n_iot),
+                       'U': np.zeros([self.n_iot, self.n_edge]), 'Q': np.zeros([self.n_iot, self.n_edge]),
+                       'y_pre': np.zeros([self.n_iot, self.n_edge]), 'z_pre': np.zeros([self.n_iot, self.n_edge])}
+        self.terms = None
+
+    def set_param_array(self, name, values):
+        values = np.asarray(values, dtype=float).reshape(self.params[name].shape)
+        changed = np.count_nonzero(values != self.params[name])
+        if changed > 0:
+            self.params[name] = values.copy()
+            self.terms = None
+
+        return changed
+
+    def delay_terms(self):
+        if self.terms is not None:
+            return self.terms
+
+        D, G, U, Q = self.params['D'], self.params['G'], self.params['U'], self.params['Q']
+        y_pre, z_pre = self.params['y_pre'], self.params['z_pre']
+
+        t_l = (G + D) * self.rho / self.Fd
+        t_u = (U + D[:, None]) / self.R
+        t_s = (1 - y_pre) * self.theta[:, None]
+        t_d = (1 - z_pre) * self.mu[:, None] / self.R_pull[None, :]
+        t_c = y_pre * self.delta_container[:, None]
+        t_m = z_pre * self.delta_image[:, None]
+        t_r = (Q * self.rho[:, None]).sum(axis=0) / self.Fe
+        t_e = D[:, None] * self.rho[:, None] / self.Fe[None, :]
+
+        self.terms = t_l, t_u, t_s, t_d, t_c, t_m, t_r, t_e
+        return self.terms
+
+    def evaluate(self, x, y=None, z=None, k=None):
+        t_l, t_u, t_s, t_d, t_c, t_m, t_r, t_e = self.delay_terms()
+        x = np.asarray(x, dtype=float)
+        single = x.ndim == 2
+        if single:
+            x = x[None]
+            y = None if y is None else np.asarray(y, dtype=float)[None]
+            z = None if z is None else np.asarray(z, dtype=float)[None]
+            k = None if k is None else np.asarray(k)[None]
+
+        # t_l for everything, a task that is offloaded swaps it for its edge terms
+        obj = t_l.sum() + np.einsum('bij,ij->b', x, t_u + t_e - t_l[:, None])
+        if self.has_caching:
+            y, z = np.asarray(y, dtype=float), np.asarray(z, dtype=float)
+            obj += np.einsum('bij,ij->b', x, t_c + t_m) + np.einsum('bij,bij,ij->b', x, y, t_s - t_c) \
+                + np.einsum('bij,bij,ij->b', x, z, t_d - t_m)
+            if self.deletion:
+                obj += np.einsum('bij,i->b', np.abs(y - self.params['y_pre']), self.delta_container) \
+                    + np.einsum('bij,i->b', np.abs(z - self.params['z_pre']), self.delta_image)
+        if self.is_scheduled:
+            obj += x.sum(axis=1) @ t_r
+            obj += self._wait(x, np.asarray(k), t_e)
+
+        return float(obj[0]) if single else obj
+
+    def _wait(self, x, k, t_e):
+        # WAIT BEHIND NEW TASKS AHEAD ON THE SAME EDGE: sum over i, i_ of x[i_, j] x[i, j] k[j, i_, i] t_e[i_, j]
+        if k.ndim == 4:
+            return np.einsum('bkj,bij,bjki,kj->b', x, x, k, t_e, optimize=True)
+
+        # task orders [B, J, I]: running sum of the work ahead in order
+        x_order = np.take_along_axis(x.transpose(0, 2, 1), k, axis=2)
+        queued = x_order * np.take_along_axis(np.broadcast_to(t_e.T, x_order.shape), k, axis=2)
+        return ((np.cumsum(queued, axis=2) - queued) * x_order).sum(axis=(1, 2))
@@ -0,0 +1,149 @@
+import numpy as np
+from collections import OrderedDict
+
+from src.scenario.env import Env
+from src.tools.instrument import INSTRUMENT
+
+
+class ActiveEnv:
+    """The model constants of Env restricted to the devices in active, with the cache room idle devices leave."""
+
+    def __init__(self, env: Env, active, container_cache_limit, image_cache_limit):
+        self.n_iot = active.size
+        self.n_edge = env.n_edge
+
+        self.comp_cap_iot = env.comp_cap_iot[active]
+        self.comp_cap_edge = env.comp_cap_edge
+        self.comp_density = env.comp_density[active]
+        self.tran_cap_iot = env.tran_cap_iot[active]
+        self.container_size = env.container_size[active]
+        self.container_startup = env.container_startup[active]
+        self.container_delete = env.container_delete[active]
+        self.image_size = env.image_size[active]
+        self.image_delete = env.image_delete[active]
+        self.edge_container_cache_limit = container_cache_limit
+        self.edge_image_cache_limit = image_cache_limit
+        self.edge_download_speed = env.edge_download_speed
+
+
+class ActiveModel:
+    """Any model of Brain built per slot over the devices with pending work (nonzero D, G, U or Q) only.
+
+    An idle device stays local and keeps its caches (its delay terms are all zero then), so the reduced optimum is the
+    full one unless the cache room of idle devices was needed. Models are kept per active set (max_models, LRU);
+    solutions come back at full size, task orders put the idle devices last.
+    """
+
+    def __init__(self, env: Env, is_scheduled: bool, has_caching: bool, build, max_models: int = 8):
+        self.env = env
+        self.n_iot = env.n_iot
+        self.n_edge = env.n_edge
+        self.is_scheduled = is_scheduled
+        self.has_caching = has_caching
+        self.build = build
+        self.max_models = max_models
+        self.limits = None
+
+        # schedule as dense (J, I, I) precedence like the MIP's k, or as (J, I) task orders for large fleets
+        self.dense_schedule = True
+
+        # MUTABLE PARAMS
+        self.params = {'D': np.zeros(self.n_iot), 'G': np.zeros(self.n_iot),
+                       'U': np.zeros([self.n_iot, self.n_edge]), 'Q': np.zeros([self.n_iot, self.n_edge]),
+                       'y_pre': np.zeros([self.n_iot, self.n_edge]), 'z_pre': np.zeros([self.n_iot, self.n_edge])}
+
+        self.models = OrderedDict()
+        self.opt = None
+        self.active = np.zeros(0, np.int64)
+        self.n_build = 0
+
+    def set_param_array(self, name, values):
+        values = np.asarray(values, dtype=float).reshape(self.params[name].shape)
+        changed = np.count_nonzero(values != self.params[name])
+        self.params[name] = values.copy()
+
+        return changed
+
+    def set_limits(self, time_limit=None, mip_gap=None):
+        self.limits = (time_limit, mip_gap)
+        for opt in self.models.values():
+            opt.set_limits(time_limit, mip_gap)
+
+    def active_devices(self):
+        pending = (self.params['D'] > 0) | (self.params['G'] > 0) | (self.params['U'] > 0).any(axis=1) | \
+            (self.params['Q'] > 0).any(axis=1)
+        return np.flatnonzero(pending)
+
+    def _model(self, active):
+        # CACHE ROOM LEFT BY THE IDLE DEVICES' CACHED ITEMS
+        idle = np.ones(self.n_iot, bool)
+        idle[active] = False
+        container_limit = self.env.edge_container_cache_limit - self.env.container_size[idle] @ self.params['y_pre'][idle]
+        image_limit = self.env.edge_image_cache_limit - self.env.image_size[idle] @ self.params['z_pre'][idle]
+
+        key = (active.tobytes(), container_limit.tobytes(), image_limit.tobytes())
+        if key in self.models:
+            self.models.move_to_end(key)
+            return self.models[key]
+
+        opt = self.build(ActiveEnv(self.env, active, container_limit, image_limit))
+        if self.limits is not None:
+            opt.set_limits(*self.limits)
+        self.n_build += 1
+        self.models[key] = opt
+        if len(self.models) > self.max_models:
+            _, evicted = self.models.popitem(last=False)
+            if hasattr(evicted, 'close'):
+                evicted.close()
+        return opt
+
+    def solve(self):
+        self.active = self.active_devices()
+        if self.active.size == 0:
+            self.opt = None
+            return None
+
+        with INSTRUMENT.phase('model_write'):
+            self.opt = self._model(self.active)
+            for name, values in self.params.items():
+                self.opt.set_param_array(name, values[self.active])
+
+        return self.opt.solve()
+
+    def obj_value(self):
+        # idle devices add nothing
+        return 0.0 if self.opt is None else self.opt.obj_value()
+
+    def get_binary_array(self, name):
+        if name == 'k':
+            order = self._order()
+            if not self.dense_schedule:
+                return order
+            position = np.argsort(order, axis=1)
+            return (position[:, :, None] < position[:, None, :]).astype(float)
+
+        if name in ('y', 'z'):
+            values = self.params[f'{name}_pre'].copy()
+        else:
+            values = np.zeros([self.n_iot, self.n_edge])
+        if self.opt is not None:
+            values[self.active] = self.opt.get_binary_array(name)
+        return values
+
+    def _order(self):
+        # (J, I) TASK ORDERS: the reduced model's order of the active devices, then the idle ones
+        idle = np.setdiff1d(np.arange(self.n_iot), self.active)
+        if self.opt is None:
+            return np.tile(np.arange(self.n_iot), (self.n_edge, 1))
+
+        k = np.asarray(self.opt.get_binary_array('k'))
+        if k.ndim == 3:
+            # position = number of tasks ahead
+            k = np.argsort(np.rint(k.sum(axis=1)), axis=1, kind='stable')
+        return np.concatenate([self.active[k.astype(np.int64)], np.tile(idle, (self.n_edge, 1))], axis=1)
+
+    def close(self):
+        for opt in self.models.values():
+            if hasattr(opt, 'close'):
+                opt.close()
+        self.models = OrderedDict()
@@ -0,0 +1,225 @@
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.scenario.env import Env
+from src.opt.solver.model.greedy import GreedyModel
+from src.opt.solver.model.matrix import MatrixModel
+from src.tools.instrument import INSTRUMENT
+
+
+def solve_edge(sub, cost, col_lower, col_upper):
+    # ONE EDGE SUBPROBLEM: (objective, dual bound, column values)
+    import highspy
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+
+    row_start, row_index, row_value, row_lower, row_upper = sub
+    highs.passModel(cost.size, row_lower.size, row_index.size, 2, 1, 0.0, cost, col_lower, col_upper,
+                    row_lower, row_upper, row_start, row_index, row_value, np.ones(cost.size, np.int32))
+    highs.run()
+    if highs.getInfo().primal_solution_status == 0:
+        raise ValueError(f"HiGHS found no solution: {highs.modelStatusToString(highs.getModelStatus())}.")
+    info = highs.getInfo()
+
+    return info.objective_function_value, info.mip_dual_bound, np.array(highs.getSolution().col_value)
+
+
+class DecompositionModel(MatrixModel):
+    """Lagrangian relaxation of offload_cons, the only rows that couple edges, solved as one MIP per edge.
+
+    Every iteration solves the n_edge subproblems on a process pool (max_workers=1 solves them in this process),
+    then moves the multipliers by a Polyak subgradient step. When a device is offloaded to several edges it is kept on
+    the one where its share of the objective is least and the edges are solved again with x fixed; the greedy offload
+    of GreedyModel is one more candidate, the best decision is kept. The multipliers carry over to the next slot;
+    dual_bound is the best Lagrangian bound of the last solve.
+    """
+
+    def __init__(self, env: Env, is_scheduled: bool, has_caching: bool, linear: bool = True, deletion: bool = False,
+                 solver: str = 'highs', max_workers=None, max_iter: int = 30, gap: float = 1e-3):
+        super().__init__(env=env, is_scheduled=is_scheduled, has_caching=has_caching, linear=linear,
+                         deletion=deletion, solver=solver)
+        self.max_workers = max_workers
+        self.max_iter = max_iter
+        self.gap = gap
+        self.time_limit = None
+        self.executor = None
+        self.greedy = GreedyModel(env=env, is_scheduled=is_scheduled, has_caching=has_caching, deletion=self.deletion)
+
+        self.multiplier = np.zeros(self.n_iot)
+        self.dual_bound = -np.inf
+        self.n_iter = 0
+
+        # EDGE BLOCKS: columns, rows (all but offload_cons) and their entries in the CSR arrays
+        offload_rows, _, _ = self._group_slice('offload')
+        row_edge = self.col_edge[self.row_index[self.row_start[:-1]]]
+        row_edge[offload_rows] = -1
+        local = np.zeros(self.n_col, np.int64)
+
+        self.edge_cols, self.edge_rows, self.edge_entries, self.edge_structure = list(), list(), list(), list()
+        for edge_index in range(self.n_edge):
+            cols = np.flatnonzero(self.col_edge == edge_index)
+            rows = np.flatnonzero(row_edge == edge_index)
+            local[cols] = np.arange(cols.size)
+
+            length = self.row_start[rows + 1] - self.row_start[rows]
+            first = np.cumsum(length) - length
+            entries = np.repeat(self.row_start[rows], length) + np.arange(length.sum()) - np.repeat(first, length)
+
+            self.edge_cols.append(cols)
+            self.edge_rows.append(rows)
+            self.edge_entries.append(entries)
+            self.edge_structure.append((np.r_[0, np.cumsum(length)].astype(np.int32),
+                                        local[self.row_index[entries]].astype(np.int32)))
+
+    def set_limits(self, time_limit=None, mip_gap=None):
+        # the iterations stop before one more would pass time_limit, with the best decision so far, mip_gap replaces gap
+        self.time_limit = time_limit
+        if mip_gap is not None:
+            self.gap = mip_gap
+
+    def set_param_array(self, name, values):
+        self.greedy.set_param_array(name, values)
+        return super().set_param_array(name, values)
+
+    def _edge_problems(self):
+        # (row_start, row_index, row_value, row_lower, row_upper) per edge with this slot's values and bounds
+        return [(row_start, row_index, self.row_value[entries], self.row_lower[rows], self.row_upper[rows])
+                for (row_start, row_index), entries, rows in zip(self.edge_structure, self.edge_entries,
+                                                                 self.edge_rows)]
+
+    def _solve_edges(self, subs, cost, col_lower):
+        tasks = [(sub, cost[cols], col_lower[cols], self.col_upper[cols]) for sub, cols in zip(subs, self.edge_cols)]
+        if self.max_workers == 1:
+            return [solve_edge(*task) for task in tasks]
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return list(self.executor.map(solve_edge, *zip(*tasks)))
+
+    def _device_cost(self, cost, solution):
+        # [n_iot, n_edge] share of each edge's objective: the device's own (i, j) terms plus the waiting it has and causes
+        contribution = cost * solution
+        device_cost = np.zeros([self.n_iot, self.n_edge])
+        for name, col in self.col.items():
+            if col.ndim == 2:
+                device_cost += contribution[col]
+        if self.has_pq:
+            wait = contribution[self.col['iq']]
+            device_cost += (wait.sum(axis=1) + wait.sum(axis=2)).T
+        return device_cost
+
+    def _repair(self, subs, cost, solution):
+        # ONE EDGE PER DEVICE (the cheapest among those chosen)
+        x = np.rint(solution[self.col['x']])
+        x_cost = np.where(x == 1, self._device_cost(cost, solution), np.inf)
+        keep = np.zeros_like(x)
+        offloaded = np.flatnonzero(x.sum(axis=1) > 0)
+        keep[offloaded, x_cost[offloaded].argmin(axis=1)] = 1
+
+        return self._solve_fixed(subs, cost, keep)
+
+    def _solve_fixed(self, subs, cost, keep):
+        # EVERY EDGE WITH x FIXED TO keep [n_iot, n_edge]
+        x_col = self.col['x']
+        col_lower = np.zeros(self.n_col)
+        col_lower[x_col] = keep
+        col_upper = self.col_upper.copy()
+        self.col_upper[x_col] = keep
+        try:
+            results = self._solve_edges(subs, cost, col_lower)
+        finally:
+            self.col_upper = col_upper
+
+        solution = np.zeros(self.n_col)
+        for cols, (_, _, values) in zip(self.edge_cols, results):
+            solution[cols] = values
+        return solution, sum(result[0] for result in results)
+
+    def _keep_cached(self, solution):
+        # KEEP CACHED ENTRIES OF OTHER DEVICES WHILE THEY FIT (as GreedyModel): an edge subproblem leaves y and z of the
+        # devices it does not serve free at the same objective, HiGHS then evicts them
+        y_pre, z_pre = self.params['y_pre'], self.params['z_pre']
+        solution = solution.copy()
+        y, z = np.rint(solution[self.col['y']]), np.rint(solution[self.col['z']])
+        used_y, used_z = (y * self.eta[:, None]).sum(axis=0), (z * self.mu[:, None]).sum(axis=0)
+        for j in range(self.n_edge):
+            for i in np.flatnonzero((y_pre[:, j] == 1) & (y[:, j] == 0)):
+                if used_y[j] + self.eta[i] <= self.eta_max[j]:
+                    y[i, j] = 1
+                    used_y[j] += self.eta[i]
+            for i in np.flatnonzero((z_pre[:, j] == 1) & (z[:, j] == 0)):
+                if used_z[j] + self.mu[i] <= self.mu_max[j]:
+                    z[i, j] = 1
+                    used_z[j] += self.mu[i]
+
+        solution[self.col['y']], solution[self.col['z']] = y, z
+        if self.deletion:
+            solution[self.col['del_y']], solution[self.col['del_z']] = np.abs(y - y_pre), np.abs(z - z_pre)
+        return solution
+
+    def solve(self):
+        start_time = time.time()
+        with INSTRUMENT.phase('model_write'):
+            cost, offset = self.objective()
+            self.update_rows()
+            subs = self._edge_problems()
+
+        x_col = self.col['x']
+        best_bound, step_scale, n_stall, iter_time = -np.inf, 2.0, 0, 0.0
+        status = 'Iteration limit reached'
+        with INSTRUMENT.phase('model_solve'):
+            self.greedy.solve()
+            best_solution, best_obj = self._solve_fixed(subs, cost, self.greedy.x)
+            best_obj += offset
+
+            for self.n_iter in range(1, self.max_iter + 1):
+                iter_start = time.time()
+                relaxed_cost = cost.copy()
+                relaxed_cost[x_col] += self.multiplier[:, None]
+                results = self._solve_edges(subs, relaxed_cost, np.zeros(self.n_col))
+
+                solution = np.zeros(self.n_col)
+                for cols, (_, _, values) in zip(self.edge_cols, results):
+                    solution[cols] = values
+                bound = offset - self.multiplier.sum() + sum(result[1] for result in results)
+                if bound > best_bound + 1e-12:
+                    best_bound, n_stall = bound, 0
+                else:
+                    n_stall += 1
+                    if n_stall >= 3:
+                        step_scale, n_stall = step_scale / 2, 0
+
+                # PRIMAL: feasible as is, or repaired
+                subgradient = np.rint(solution[x_col]).sum(axis=1) - 1
+                if subgradient.max() <= 0:
+                    obj = offset + cost @ solution
+                else:
+                    solution, obj = self._repair(subs, cost, solution)
+                    obj += offset
+                if obj < best_obj:
+                    best_obj, best_solution = obj, solution
+
+                if best_obj - best_bound <= self.gap * max(1.0, abs(best_obj)) or not subgradient.any():
+                    status = 'Optimal'
+                    break
+                # stop when another iteration as long as the longest so far would pass the limit
+                iter_time = max(iter_time, time.time() - iter_start)
+                if self.time_limit is not None and time.time() - start_time + iter_time >= self.time_limit:
+                    status = 'Time limit reached'
+                    break
+                step = step_scale * (best_obj - bound) / np.square(subgradient).sum()
+                self.multiplier = np.maximum(0.0, self.multiplier + step * subgradient)
+
+        if self.has_caching:
+            best_solution = self._keep_cached(best_solution)
+            best_obj = offset + cost @ best_solution
+        self.solution = best_solution
+        self.obj = best_obj
+        self.dual_bound = best_bound
+
+        return {'obj': best_obj, 'dual_bound': best_bound, 'iterations': self.n_iter, 'status': status}
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,211 @@
+import numpy as np
+
+from src.scenario.env import Env
+from src.opt.solver.evaluator import Evaluator
+from src.tools.instrument import timed
+
+
+class GreedyModel:
+    """Solver-free offload/cache/schedule decision on the same delay terms as add_expressions.py.
+
+    Devices are assigned greedily by marginal delay (local, or the cheapest edge with cache room), edges run their
+    tasks shortest-first, and local search re-inserts every device at its best place until nothing improves.
+    """
+
+    def __init__(self, env: Env, is_scheduled: bool, has_caching: bool, deletion: bool = False, max_pass: int = 3):
+        self.n_iot = env.n_iot
+        self.n_edge = env.n_edge
+        self.is_scheduled = is_scheduled
+        self.has_caching = has_caching
+        self.deletion = deletion
+        self.max_pass = max_pass
+
+        # schedule as dense (J, I, I) precedence like the MIP's k, or as (J, I) task orders for large fleets
+        self.dense_schedule = True
+
+        # CONSTANTS
+        self.Fd = env.comp_cap_iot
+        self.Fe = env.comp_cap_edge
+        self.rho = env.comp_density
+        self.R = env.tran_cap_iot
+        self.theta = env.container_startup
+        self.eta = env.container_size
+        self.delta_container = env.container_delete
+        self.mu = env.image_size
+        self.delta_image = env.image_delete
+        self.R_pull = env.edge_download_speed
+        self.eta_max = env.edge_container_cache_limit
+        self.mu_max = env.edge_image_cache_limit
+
+        # MUTABLE PARAMS
+        self.params = {'D': np.zeros(self.n_iot), 'G': np.zeros(self.n_iot),
+                       'U': np.zeros([self.n_iot, self.n_edge]), 'Q': np.zeros([self.n_iot, self.n_edge]),
+                       'y_pre': np.zeros([self.n_iot, self.n_edge]), 'z_pre': np.zeros([self.n_iot, self.n_edge])}
+        self.evaluator = Evaluator(env=env, is_scheduled=is_scheduled, has_caching=has_caching, deletion=self.deletion)
+
+        # SOLUTION
+        self.x = np.zeros([self.n_iot, self.n_edge])
+        self.y = np.zeros([self.n_iot, self.n_edge])
+        self.z = np.zeros([self.n_iot, self.n_edge])
+        self.order = np.tile(np.arange(self.n_iot), (self.n_edge, 1))
+        self.obj = 0.0
+
+    def set_param_array(self, name, values):
+        values = np.asarray(values, dtype=float).reshape(self.params[name].shape)
+        changed = np.count_nonzero(values != self.params[name])
+        self.params[name] = values.copy()
+        self.evaluator.set_param_array(name, values)
+
+        return changed
+
+    def set_limits(self, time_limit=None, mip_gap=None):
+        # NOTHING TO LIMIT, THE GREEDY PASS IS ITS OWN FALLBACK
+        pass
+
+    def delay_terms(self):
+        return self.evaluator.delay_terms()
+
+    def _offload_cost(self):
+        # DELAY OF DEVICE i ON EDGE j BEFORE WAITING BEHIND OTHER NEW TASKS (y = 1, z kept or forced by y_pre = 0)
+        t_l, t_u, t_s, t_d, t_c, t_m, t_r, t_e = self.delay_terms()
+        y_pre, z_pre = self.params['y_pre'], self.params['z_pre']
+
+        cost = t_u + t_e
+        if self.is_scheduled:
+            cost = cost + t_r[None, :]
+        if self.has_caching:
+            z = np.where(y_pre == 0, 1, z_pre)
+            cost = cost + t_s + z * t_d + (1 - z) * t_m
+            if self.deletion:
+                cost = cost + self.delta_container[:, None] * (1 - y_pre) \
+                    + self.delta_image[:, None] * np.abs(z - z_pre)
+
+        return t_l, cost
+
+    @timed('model_solve')
+    def solve(self):
+        D, Q = self.params['D'], self.params['Q']
+        y_pre, z_pre = self.params['y_pre'], self.params['z_pre']
+        t_l, cost = self._offload_cost()
+
+        # WAIT ON EDGE j: t_e = w / Fe and shortest-first gives sum of min(w_i, w_s) / Fe over co-located tasks
+        w = D * self.rho if self.is_scheduled else np.zeros(self.n_iot)
+        rank = np.argsort(np.argsort(w, kind='stable'), kind='stable')
+        w_below = np.zeros([self.n_edge, self.n_iot + 1])
+        n_below = np.zeros([self.n_edge, self.n_iot + 1])
+        n_member = np.zeros(self.n_edge)
+
+        # CACHE ROOM: entries forced by queued work (cache_con3) and by offloaded devices
+        need_z = np.where(y_pre == 0, 1, z_pre)
+        forced = Q > 0
+        req_y = forced.copy()
+        req_z = forced & (need_z == 1)
+        used_y = (req_y * self.eta[:, None]).sum(axis=0)
+        used_z = (req_z * self.mu[:, None]).sum(axis=0)
+
+        place = -np.ones(self.n_iot, np.int64)
+
+        def marginal(i):
+            wait = (w_below[:, rank[i]] + w[i] * (n_member - n_below[:, rank[i]])) / self.Fe
+            c = cost[i] + wait
+            if self.has_caching:
+                add_y = np.where(req_y[i], 0, self.eta[i])
+                add_z = np.where(req_z[i] | (need_z[i] == 0), 0, self.mu[i])
+                c = np.where((used_y + add_y <= self.eta_max) & (used_z + add_z <= self.mu_max), c, np.inf)
+            return c
+
+        def insert(i, j):
+            place[i] = j
+            w_below[j, rank[i] + 1:] += w[i]
+            n_below[j, rank[i] + 1:] += 1
+            n_member[j] += 1
+            if self.has_caching:
+                if not req_y[i, j]:
+                    req_y[i, j] = True
+                    used_y[j] += self.eta[i]
+                if need_z[i, j] == 1 and not req_z[i, j]:
+                    req_z[i, j] = True
+                    used_z[j] += self.mu[i]
+
+        def remove(i):
+            j = place[i]
+            place[i] = -1
+            w_below[j, rank[i] + 1:] -= w[i]
+            n_below[j, rank[i] + 1:] -= 1
+            n_member[j] -= 1
+            if self.has_caching and not forced[i, j]:
+                req_y[i, j] = False
+                used_y[j] -= self.eta[i]
+                if req_z[i, j]:
+                    req_z[i, j] = False
+                    used_z[j] -= self.mu[i]
+
+        # GREEDY: LARGEST SAVING FIRST
+        saving = t_l - cost.min(axis=1)
+        for i in np.argsort(-saving, kind='stable'):
+            c = marginal(i)
+            j = int(np.argmin(c))
+            if c[j] < t_l[i]:
+                insert(i, j)
+
+        # LOCAL SEARCH: RE-INSERT EACH DEVICE AT ITS BEST PLACE
+        for _ in range(self.max_pass):
+            improved = False
+            for i in range(self.n_iot):
+                j_old = place[i]
+                if j_old >= 0:
+                    remove(i)
+                c = marginal(i)
+                j = int(np.argmin(c))
+                old = t_l[i] if j_old < 0 else c[j_old]
+                if min(c[j], t_l[i]) < old - 1e-12:
+                    if c[j] < t_l[i]:
+                        insert(i, j)
+                    improved = True
+                elif j_old >= 0:
+                    insert(i, j_old)
+            if not improved:
+                break
+
+        self.x = np.zeros([self.n_iot, self.n_edge])
+        self.x[place >= 0, place[place >= 0]] = 1
+
+        if self.has_caching:
+            self._set_caching(req_y, req_z, used_y, used_z)
+
+        # SHORTEST TASK FIRST ON EVERY EDGE, IDLE DEVICES AFTER
+        self.order = np.array([np.lexsort((w, self.x[:, j] == 0)) for j in range(self.n_edge)])
+        self.obj = self.evaluate(self.x, self.y, self.z, self.order)
+
+        return self.obj
+
+    def _set_caching(self, req_y, req_z, used_y, used_z):
+        # KEEP CACHED ENTRIES OF OTHER DEVICES WHILE THEY FIT
+        y_pre, z_pre = self.params['y_pre'], self.params['z_pre']
+        self.y = req_y.astype(float)
+        self.z = req_z.astype(float)
+        for j in range(self.n_edge):
+            for i in np.flatnonzero((y_pre[:, j] == 1) & ~req_y[:, j]):
+                if used_y[j] + self.eta[i] <= self.eta_max[j]:
+                    self.y[i, j] = 1
+                    used_y[j] += self.eta[i]
+            for i in np.flatnonzero((z_pre[:, j] == 1) & ~req_z[:, j]):
+                if used_z[j] + self.mu[i] <= self.mu_max[j]:
+                    self.z[i, j] = 1
+                    used_z[j] += self.mu[i]
+
+    def evaluate(self, x, y, z, order):
+        # OBJECTIVE OF THE MATCHING PYOMO MODEL FOR A DECISION (order: (J, I) task order per edge)
+        return self.evaluator.evaluate(x, y, z, order)
+
+    def obj_value(self):
+        return self.obj
+
+    def get_binary_array(self, name):
+        if name == 'k':
+            if not self.dense_schedule:
+                return self.order
+            position = np.argsort(self.order, axis=1)
+            return (position[:, :, None] < position[:, None, :]).astype(float)
+
+        return getattr(self, name)
@@ -0,0 +1,353 @@
+import numpy as np
+
+from src.scenario.env import Env
+from src.opt.solver.evaluator import Evaluator
+from src.opt.solver.symmetry import edge_constants, edge_classes, device_constants, device_classes
+from src.tools.instrument import INSTRUMENT
+
+
+class MatrixModel:
+    """The linear MIPs of PyoModel assembled straight from NumPy arrays (no rule callbacks, no Expressions).
+
+    Variables are laid out block by block (x, k, y, z, il, im, ip, iq, del_y, del_z) in the index order of the Pyomo
+    vars, constraints are rows of one CSR matrix. The structure is built once, a slot only rewrites the objective, the
+    y_pre coefficients of cache_con2 and the row bounds that hold Q and y_pre. Solved by HiGHS from the matrix or
+    written as a free MPS file for any other solver.
+
+    symmetry (a relative tolerance, None for off) breaks the symmetries of the MIP every slot: k is fixed to shortest
+    edge compute first, optimal for the waits of tasks that share an edge and arbitrary for the others, and the edges
+    that are interchangeable within the tolerance take their new work in decreasing order, interchangeable devices
+    their edges in increasing order (rows added to the HiGHS model only, not written by write_mps).
+    """
+
+    def __init__(self, env: Env, is_scheduled: bool, has_caching: bool, linear: bool = True, deletion: bool = False,
+                 solver: str = 'highs', symmetry: float = None):
+        if solver not in ('highs', 'appsi_highs'):
+            raise ValueError(f"Matrix builder solves with highs, not {solver} (write_mps gives a file for others).")
+        if is_scheduled and has_caching and not linear:
+            raise ValueError("Matrix builder needs a linear objective.")
+
+        import highspy
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue('output_flag', False)
+
+        self.n_iot = env.n_iot
+        self.n_edge = env.n_edge
+        self.is_scheduled = is_scheduled
+        self.has_caching = has_caching
+        self.deletion = deletion and is_scheduled and has_caching
+        self.has_lm = has_caching
+        self.has_pq = is_scheduled
+        self.symmetry = symmetry
+        self.edge_constants = edge_constants(env)
+        self.device_constants = device_constants(env)
+
+        # CONSTANTS
+        self.Fd = env.comp_cap_iot
+        self.Fe = env.comp_cap_edge
+        self.rho = env.comp_density
+        self.R = env.tran_cap_iot
+        self.theta = env.container_startup
+        self.eta = env.container_size
+        self.delta_container = env.container_delete
+        self.mu = env.image_size
+        self.delta_image = env.image_delete
+        self.R_pull = env.edge_download_speed
+        self.eta_max = env.edge_container_cache_limit
+        self.mu_max = env.edge_image_cache_limit
+
+        # MUTABLE PARAMS
+        self.params = {'D': np.zeros(self.n_iot), 'G': np.zeros(self.n_iot),
+                       'U': np.zeros([self.n_iot, self.n_edge]), 'Q': np.zeros([self.n_iot, self.n_edge]),
+                       'y_pre': np.zeros([self.n_iot, self.n_edge]), 'z_pre': np.zeros([self.n_iot, self.n_edge])}
+        self.evaluator = Evaluator(env=env, is_scheduled=is_scheduled, has_caching=has_caching, deletion=self.deletion)
+
+        self._add_columns()
+        self._add_rows()
+
+        self.solution = np.zeros(self.n_col)
+        self.obj = 0.0
+
+    def _add_columns(self):
+        I, J = self.n_iot, self.n_edge    # noqa: E741
+        blocks = [('x', (I, J))]
+        if self.is_scheduled:
+            blocks.append(('k', (J, I, I)))
+        if self.has_caching:
+            blocks += [('y', (I, J)), ('z', (I, J))]
+        if self.has_lm:
+            blocks += [('il', (I, J)), ('im', (I, J))]
+        if self.has_pq:
+            blocks += [('ip', (J, I, I)), ('iq', (J, I, I))]
+        if self.deletion:
+            blocks += [('del_y', (I, J)), ('del_z', (I, J))]
+
+        # COLUMN INDEX ARRAYS SHAPED LIKE THE PYOMO VARS, AND THE EDGE OF EVERY COLUMN
+        self.col = dict()
+        self.n_col = 0
+        col_edge = list()
+        for name, shape in blocks:
+            self.col[name] = self.n_col + np.arange(int(np.prod(shape))).reshape(shape)
+            self.n_col += int(np.prod(shape))
+            edge = np.arange(J)[:, None, None] if len(shape) == 3 else np.arange(J)[None, :]
+            col_edge.append(np.broadcast_to(edge, shape).ravel())
+        self.col_edge = np.concatenate(col_edge)
+
+        self.col_upper = np.ones(self.n_col)
+        if self.is_scheduled:
+            # schedule_con3: k[j, i, i] == 0
+            self.col_upper[self.col['k'][:, np.arange(I), np.arange(I)].ravel()] = 0
+
+    def _add_rows(self):
+        I, J = self.n_iot, self.n_edge    # noqa: E741
+        x = self.col['x']
+        self.groups = dict()
+        self.row_index, self.row_value, self.row_lower, self.row_upper = list(), list(), list(), list()
+
+        # offload_cons: sum_j x[i, j] <= 1
+        self._add_group('offload', x, np.ones([I, J]), -np.inf, 1)
+
+        if self.is_scheduled:
+            k = self.col['k']
+            j, i, ii = np.nonzero(np.ones([J, I, I], bool) & (np.arange(I)[:, None] != np.arange(I))[None])
+            self._add_group('schedule_con1', np.stack([k[j, i, ii], k[j, ii, i]], axis=1), [1, 1], 1, 1)
+            j, i, ii, iii = np.nonzero(np.ones([J, I, I, I], bool) & self._distinct(I)[None])
+            self._add_group('schedule_con2', np.stack([k[j, i, ii], k[j, ii, iii], k[j, i, iii]], axis=1),
+                            [1, 1, -1], -np.inf, 1)
+
+        if self.has_caching:
+            y, z = self.col['y'].ravel(), self.col['z'].ravel()
+            self._add_group('cache_con1', np.stack([x.ravel(), y], axis=1), [1, -1], -np.inf, 0)
+            # (1 - y_pre) * y - z <= 0, the y coefficient is rewritten every slot
+            self._add_group('cache_con2', np.stack([y, z], axis=1), [1, -1], -np.inf, 0)
+            # Q <= 1000 * y, the lower bound is rewritten every slot
+            self._add_group('cache_con3', y[:, None], [1000], 0, np.inf)
+            self._add_group('cache_con4', self.col['y'].T, np.tile(self.eta, (J, 1)), -np.inf, self.eta_max)
+            self._add_group('cache_con5', self.col['z'].T, np.tile(self.mu, (J, 1)), -np.inf, self.mu_max)
+
+        if self.has_lm:
+            for name, var in (('il', 'y'), ('im', 'z')):
+                self._add_product_rows(name, self.col[name].ravel(), x.ravel(), self.col[var].ravel())
+
+        if self.has_pq:
+            # ip[j, ii, i] = k[j, ii, i] * x[ii, j] and iq[j, ii, i] = x[i, j] * ip[j, ii, i]
+            k = self.col['k']
+            x_ii = np.broadcast_to(x.T[:, :, None], (J, I, I)).ravel()
+            x_i = np.broadcast_to(x.T[:, None, :], (J, I, I)).ravel()
+            self._add_product_rows('ip', self.col['ip'].ravel(), k.ravel(), x_ii)
+            self._add_product_rows('iq', self.col['iq'].ravel(), x_i, self.col['ip'].ravel())
+
+        if self.deletion:
+            # |del - var| linearized as del - var in [-pre, pre] and del + var in [pre, 2 - pre]
+            for name, var in (('del_y', 'y'), ('del_z', 'z')):
+                cols = np.stack([self.col[name].ravel(), self.col[var].ravel()], axis=1)
+                self._add_group(f'{name}_minus', cols, [1, -1], 0, 0)
+                self._add_group(f'{name}_plus', cols, [1, 1], 0, 2)
+
+        # CSR
+        n_entry = np.concatenate([np.full(index.shape[0], index.shape[1]) for index in self.row_index])
+        self.row_start = np.r_[0, np.cumsum(n_entry)].astype(np.int32)
+        self.row_index = np.concatenate([index.ravel() for index in self.row_index]).astype(np.int32)
+        self.row_value = np.concatenate([value.ravel() for value in self.row_value]).astype(np.float64)
+        self.row_lower = np.concatenate(self.row_lower)
+        self.row_upper = np.concatenate(self.row_upper)
+        self.n_row = self.row_lower.size
+
+    @staticmethod
+    def _distinct(n):
+        index = np.arange(n)
+        return (index[:, None, None] != index[None, :, None]) & (index[None, :, None] != index[None, None, :]) & \
+            (index[:, None, None] != index[None, None, :])
+
+    def _add_group(self, name, cols, values, lower, upper):
+        # rows with the same number of entries: cols [n_row, n_entry], values broadcast to it
+        cols = np.asarray(cols)
+        cols = cols.reshape(len(cols), int(np.prod(cols.shape[1:])))
+        n_row = cols.shape[0]
+        row = sum(len(lower_) for lower_ in self.row_lower)
+        entry = sum(index.size for index in self.row_index)
+        self.groups[name] = (row, n_row, entry, cols.shape[1])
+
+        self.row_index.append(cols)
+        self.row_value.append(np.broadcast_to(np.asarray(values, np.float64), cols.shape))
+        self.row_lower.append(np.broadcast_to(np.asarray(lower, np.float64), n_row).copy())
+        self.row_upper.append(np.broadcast_to(np.asarray(upper, np.float64), n_row).copy())
+
+    def _add_product_rows(self, name, product, var1, var2):
+        # product = var1 * var2 for binaries, as add_constraints._add_aux_var_cons
+        self._add_group(f'{name}_c1', np.stack([product, var1], axis=1), [1, -1], -np.inf, 0)
+        self._add_group(f'{name}_c2', np.stack([product, var2], axis=1), [1, -1], -np.inf, 0)
+        self._add_group(f'{name}_c3', np.stack([var1, var2, product], axis=1), [1, 1, -1], -np.inf, 1)
+
+    def _group_slice(self, name):
+        row, n_row, entry, n_entry = self.groups[name]
+        return slice(row, row + n_row), slice(entry, entry + n_row * n_entry), n_entry
+
+    def set_param_array(self, name, values):
+        values = np.asarray(values, dtype=float).reshape(self.params[name].shape)
+        changed = np.count_nonzero(values != self.params[name])
+        self.params[name] = values.copy()
+        self.evaluator.set_param_array(name, values)
+
+        return changed
+
+    def delay_terms(self):
+        return self.evaluator.delay_terms()
+
+    def objective(self):
+        # COST VECTOR AND CONSTANT, TERM BY TERM AS THE OBJECTIVE RULES IN add_expressions.py
+        t_l, t_u, t_s, t_d, t_c, t_m, t_r, t_e = self.delay_terms()
+        cost = np.zeros(self.n_col)
+
+        coe_x = t_u + t_e - t_l[:, None]
+        if self.is_scheduled:
+            coe_x = coe_x + t_r[None, :]
+        if self.has_caching:
+            coe_x = coe_x + t_c + t_m
+        cost[self.col['x']] = coe_x
+        if self.has_lm:
+            cost[self.col['il']] = t_s - t_c
+            cost[self.col['im']] = t_d - t_m
+        if self.has_pq:
+            # coe_q[i_, i, j] = t_e[i_, j] on iq[j, i_, i]
+            cost[self.col['iq']] = np.broadcast_to(t_e.T[:, :, None], (self.n_edge, self.n_iot, self.n_iot))
+        if self.deletion:
+            cost[self.col['del_y']] = self.delta_container[:, None]
+            cost[self.col['del_z']] = self.delta_image[:, None]
+
+        return cost, t_l.sum()
+
+    def update_rows(self):
+        # ENTRIES AND BOUNDS THAT HOLD MUTABLE PARAMS
+        y_pre, z_pre = self.params['y_pre'].ravel(), self.params['z_pre'].ravel()
+        if self.has_caching:
+            _, entries, n_entry = self._group_slice('cache_con2')
+            self.row_value[entries][0::n_entry] = 1 - y_pre
+            rows, _, _ = self._group_slice('cache_con3')
+            self.row_lower[rows] = self.params['Q'].ravel()
+        if self.deletion:
+            for name, pre in (('del_y', y_pre), ('del_z', z_pre)):
+                rows, _, _ = self._group_slice(f'{name}_minus')
+                self.row_lower[rows], self.row_upper[rows] = -pre, pre
+                rows, _, _ = self._group_slice(f'{name}_plus')
+                self.row_lower[rows], self.row_upper[rows] = pre, 2 - pre
+
+    def set_limits(self, time_limit=None, mip_gap=None):
+        # None restores the HiGHS default
+        self.highs.setOptionValue('time_limit', float('inf') if time_limit is None else float(time_limit))
+        self.highs.setOptionValue('mip_rel_gap', 1e-4 if mip_gap is None else float(mip_gap))
+
+    def symmetry_rows(self):
+        # CSR parts of the ordering rows of interchangeable edges and devices, consecutive members of a class:
+        # sum_i D[i] x[i, j] >= sum_i D[i] x[i, j'] (new work), sum_j (j + 1) x[i, j] <= sum_j (j + 1) x[i', j] (edge)
+        starts, indices, values = [np.zeros(1, np.int64)], list(), list()
+        arrived = np.flatnonzero(self.params['D'] > 0)
+        for members in edge_classes(self.edge_constants, self.params, self.has_caching, self.symmetry):
+            if arrived.size == 0:
+                break
+            first, second = members[:-1], members[1:]
+            x = self.col['x'][arrived]
+            indices.append(np.concatenate([x[:, first].T, x[:, second].T], axis=1).ravel())
+            values.append(np.tile(np.r_[self.params['D'][arrived], -self.params['D'][arrived]], first.size))
+            starts.append(np.full(first.size, 2 * arrived.size))
+        for members in device_classes(self.device_constants, self.params, self.has_caching, self.symmetry):
+            first, second = members[:-1], members[1:]
+            indices.append(np.concatenate([self.col['x'][second], self.col['x'][first]], axis=1).ravel())
+            values.append(np.tile(np.r_[np.arange(1, self.n_edge + 1), -np.arange(1, self.n_edge + 1)], first.size))
+            starts.append(np.full(first.size, 2 * self.n_edge))
+
+        start = np.cumsum(np.concatenate(starts))
+        n_row = start.size - 1
+        return start, np.concatenate(indices or [np.zeros(0, np.int64)]), np.concatenate(values or [np.zeros(0)]), \
+            np.zeros(n_row), np.full(n_row, np.inf)
+
+    def task_order(self):
+        # (J, I, I) PRECEDENCE OF SHORTEST EDGE COMPUTE FIRST (D * rho, ties by index), THE SAME ON EVERY EDGE
+        order = np.lexsort((np.arange(self.n_iot), self.params['D'] * self.rho))
+        position = np.argsort(order)
+        return np.broadcast_to(position[:, None] < position[None, :], (self.n_edge, self.n_iot, self.n_iot))
+
+    def solve(self):
+        with INSTRUMENT.phase('model_write'):
+            cost, offset = self.objective()
+            self.update_rows()
+            col_lower, col_upper = np.zeros(self.n_col), self.col_upper
+            if self.symmetry is not None and self.is_scheduled:
+                col_upper = col_upper.copy()
+                col_lower[self.col['k']] = col_upper[self.col['k']] = self.task_order()
+            row_start, row_index, row_value = self.row_start, self.row_index, self.row_value
+            row_lower, row_upper = self.row_lower, self.row_upper
+            if self.symmetry is not None:
+                start, index, value, lower, upper = self.symmetry_rows()
+                row_start = np.r_[row_start, row_start[-1] + start[1:]].astype(np.int32)
+                row_index = np.r_[row_index, index].astype(np.int32)
+                row_value = np.r_[row_value, value]
+                row_lower, row_upper = np.r_[row_lower, lower], np.r_[row_upper, upper]
+            self.highs.passModel(self.n_col, row_lower.size, row_index.size, 2, 1, offset, cost,
+                                 col_lower, col_upper, row_lower, row_upper,
+                                 row_start, row_index, row_value, np.ones(self.n_col, np.int32))
+
+        with INSTRUMENT.phase('model_solve'):
+            self.highs.run()
+
+        with INSTRUMENT.phase('model_load'):
+            status = self.highs.getModelStatus()
+            if self.highs.getInfo().primal_solution_status == 0:
+                raise ValueError(f"HiGHS found no solution: {self.highs.modelStatusToString(status)}.")
+            self.solution = np.array(self.highs.getSolution().col_value)
+            self.obj = self.highs.getInfo().objective_function_value
+
+        return status
+
+    def obj_value(self):
+        return self.obj
+
+    def get_var_array(self, name):
+        return self.solution[self.col[name]]
+
+    def get_binary_array(self, name):
+        return (np.rint(self.get_var_array(name)) == 1).astype(float)
+
+    def write_mps(self, path):
+        # FREE MPS, ALL COLUMNS BINARY (BV); THE CONSTANT GOES IN AS -RHS OF THE OBJECTIVE ROW
+        cost, offset = self.objective()
+        self.update_rows()
+        names = np.empty(self.n_col, object)
+        for name, col in self.col.items():
+            for index in np.ndindex(col.shape):
+                names[col[index]] = name + ''.join(f'_{n}' for n in index)
+
+        lines = ['NAME matrix_model', 'ROWS', ' N obj']
+        kind = np.where(self.row_lower == self.row_upper, 'E',
+                        np.where(np.isinf(self.row_lower), 'L', np.where(np.isinf(self.row_upper), 'G', 'L')))
+        lines += [f' {kind[r]} r{r}' for r in range(self.n_row)]
+
+        lines.append('COLUMNS')
+        row_of = np.repeat(np.arange(self.n_row), np.diff(self.row_start))
+        order = np.argsort(self.row_index, kind='stable')
+        col_start = np.searchsorted(self.row_index[order], np.arange(self.n_col + 1))
+        for c in range(self.n_col):
+            if cost[c] != 0:
+                lines.append(f' {names[c]} obj {cost[c]:.17g}')
+            for n in order[col_start[c]:col_start[c + 1]]:
+                lines.append(f' {names[c]} r{row_of[n]} {self.row_value[n]:.17g}')
+            if cost[c] == 0 and col_start[c] == col_start[c + 1]:
+                lines.append(f' {names[c]} obj 0')
+
+        lines.append('RHS')
+        if offset != 0:
+            lines.append(f' rhs obj {-offset:.17g}')
+        rhs = np.where(kind == 'G', self.row_lower, self.row_upper)
+        lines += [f' rhs r{r} {rhs[r]:.17g}' for r in np.flatnonzero(rhs != 0)]
+        ranged = np.flatnonzero((kind == 'L') & np.isfinite(self.row_lower))
+        if ranged.size > 0:
+            lines.append('RANGES')
+            lines += [f' rng r{r} {self.row_upper[r] - self.row_lower[r]:.17g}' for r in ranged]
+
+        lines.append('BOUNDS')
+        lines += [f' BV bnd {names[c]}' if self.col_upper[c] == 1 else f' FX bnd {names[c]} 0'
+                  for c in range(self.n_col)]
+        lines.append('ENDATA')
+
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
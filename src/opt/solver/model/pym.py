@@ -1,18 +1,47 @@
 import numpy as np
 from pyomo.environ import Binary, SolverFactory, ConcreteModel, Set, Var, Param, Constraint, Objective, value
-from pyomo.environ import minimize, Expression
+from pyomo.environ import minimize, Expression, ConstraintList
 from pyomo.core.expr.visitor import identify_variables
 from pyomo.core.expr import MonomialTermExpression
+from pyomo.core.expr.visitor import identify_mutable_parameters
+from pyomo.common.collections import ComponentMap, ComponentSet
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
 
 from src.scenario.env import Env
+from src.tools.instrument import INSTRUMENT
+from src.opt.solver.symmetry import edge_constants, edge_classes, device_constants, device_classes
 import src.opt.solver.components.add_constraints as cons
 import src.opt.solver.components.add_expressions as exps
 
+# TIME LIMIT (s) AND RELATIVE MIP GAP OPTION NAMES PER SOLVER
+LIMIT_OPTIONS = {'cplex': ('timelimit', 'mipgap'), 'gurobi': ('TimeLimit', 'MIPGap'), 'scip': ('limits/time', 'limits/gap'),
+                 'cbc': ('sec', 'ratio'), 'glpk': ('tmlim', 'mipgap'), 'highs': ('time_limit', 'mip_rel_gap')}
+
 
 class PyoModel:
-    def __init__(self, env: Env, solver: str = 'scip'):
+    def __init__(self, env: Env, solver: str = 'scip', persistent: bool = False):
         self.model = ConcreteModel()
+
+        # PERSISTENT SOLVER (keeps the model loaded between slots, appsi solvers are persistent already)
+        self.persistent = persistent
+        if persistent and not solver.startswith('appsi_'):
+            if f'{solver}_persistent' not in SolverFactory:
+                raise ValueError(f"Solver {solver} has no persistent interface.")
+            solver = f'{solver}_persistent'
+        self.solver_name = solver
         self.solver = SolverFactory(solver)
+        self.options = dict()
+        self.param_cons = ComponentMap()
+        self.changed_params = ComponentSet()
+        self.has_solution = False
+
+        # SYMMETRY BREAKING (set_symmetry)
+        self.symmetry = None
+        self.rho = env.comp_density
+        self.edge_constants = edge_constants(env)
+        self.device_constants = device_constants(env)
+        self.k_data = None
+        self.k_fixed = None
 
         self.model.I = Set(initialize=[i for i in range(env.n_iot)])    # noqa: E741
         self.model.J = Set(initialize=[j for j in range(env.n_edge)])
@@ -47,6 +76,159 @@ class PyoModel:
         self.model.offload_cons = Constraint(self.model.I, rule=cons.offload_cons_rule)
         exps.add_basic_expressions(self.model)
 
+        # FLAT VAR DATA, FILLED ON FIRST EXTRACTION
+        self.var_data = {}
+
+        # FLAT PARAM DATA (ROW-MAJOR LIKE THE OPERATE ARRAYS) AND LAST WRITTEN VALUES
+        self.param_data = {}
+        for name in ('D', 'G'):
+            self.param_data[name] = ([getattr(self.model, name)[i] for i in self.model.I], np.zeros(env.n_iot))
+        for name in ('U', 'Q', 'y_pre', 'z_pre'):
+            self.param_data[name] = ([getattr(self.model, name)[i, j] for i in self.model.I for j in self.model.J],
+                                     np.zeros(env.n_iot * env.n_edge))
+
+    def set_param_array(self, name, values):
+        # WRITE ONLY THE ENTRIES THAT DIFFER FROM THE LAST WRITE
+        data, last = self.param_data[name]
+        values = np.asarray(values, dtype=float).ravel()
+        changed = np.flatnonzero(values != last)
+        for n, v in zip(changed.tolist(), values[changed].tolist()):
+            data[n].set_value(v)
+            self.changed_params.add(data[n])
+        last[changed] = values[changed]
+
+        return changed.size
+
+    def get_var_array(self, name):
+        # ALL VALUES OF AN INDEXED VAR AS A DENSE ARRAY SHAPED BY ITS INDEX SETS (None -> nan)
+        if name not in self.var_data:
+            var = getattr(self.model, name)
+            shape = tuple(len(index_set) for index_set in var.index_set().subsets())
+            self.var_data[name] = (list(var.values()), shape)
+        data, shape = self.var_data[name]
+
+        return np.array([var_data.value for var_data in data], dtype=float).reshape(shape)
+
+    def obj_value(self):
+        return value(self.model.obj)
+
+    def get_binary_array(self, name):
+        return (np.rint(self.get_var_array(name)) == 1).astype(float)
+
+    def set_limits(self, time_limit=None, mip_gap=None):
+        # SOLVER OPTIONS FOR AN ANYTIME SOLVE (None leaves the solver default)
+        name = self.solver_name.replace('appsi_', '').replace('_persistent', '').replace('_direct', '')
+        if name not in LIMIT_OPTIONS:
+            raise ValueError(f"No time limit/gap options known for solver {self.solver_name}.")
+        time_option, gap_option = LIMIT_OPTIONS[name]
+        self.options = dict()
+        if time_limit is not None:
+            # glpk takes whole seconds
+            self.options[time_option] = max(1, int(np.ceil(time_limit))) if name == 'glpk' else time_limit
+        if mip_gap is not None:
+            self.options[gap_option] = mip_gap
+
+    def set_symmetry(self, tol):
+        # AS MatrixModel: k fixed to shortest edge compute first, ordering of interchangeable edges and devices (tol)
+        self.symmetry = tol
+
+    def _break_symmetry(self):
+        I, J = len(self.model.I), len(self.model.J)    # noqa: E741
+        params = {name: last.reshape((I, J) if last.size == I * J and name not in ('D', 'G') else (I,))
+                  for name, (_, last) in self.param_data.items()}
+        is_loaded = isinstance(self.solver, PersistentSolver) and self.solver.has_instance()
+
+        if hasattr(self.model, 'k'):
+            if self.k_data is None:
+                self.k_data = [self.model.k[j, i, ii] for j in self.model.J for i in self.model.I for ii in self.model.I]
+                self.k_fixed = np.full(len(self.k_data), -1.0)
+            order = np.lexsort((np.arange(I), params['D'] * self.rho))
+            position = np.argsort(order)
+            precedence = np.tile((position[:, None] < position[None, :]).astype(float).ravel(), J)
+            # bounds, not fix(): a fixed var would be substituted into all its schedule constraints
+            for n in np.flatnonzero(precedence != self.k_fixed).tolist():
+                self.k_data[n].setlb(precedence[n])
+                self.k_data[n].setub(precedence[n])
+                if is_loaded:
+                    self.solver.update_var(self.k_data[n])
+            self.k_fixed = precedence
+
+        if hasattr(self.model, 'symmetry_cons'):
+            if is_loaded:
+                for con in self.model.symmetry_cons.values():
+                    self.solver.remove_constraint(con)
+            self.model.del_component(self.model.symmetry_cons)
+        self.model.symmetry_cons = ConstraintList()
+
+        x, has_caching = self.model.x, hasattr(self.model, 'y')
+        arrived = np.flatnonzero(params['D'] > 0).tolist()
+        for members in edge_classes(self.edge_constants, params, has_caching, self.symmetry):
+            for j, j_ in zip(members[:-1].tolist(), members[1:].tolist()):
+                if len(arrived) > 0:
+                    self.model.symmetry_cons.add(sum(params['D'][i] * x[i, j] for i in arrived)
+                                                 >= sum(params['D'][i] * x[i, j_] for i in arrived))
+        for members in device_classes(self.device_constants, params, has_caching, self.symmetry):
+            for i, i_ in zip(members[:-1].tolist(), members[1:].tolist()):
+                self.model.symmetry_cons.add(sum((j + 1) * x[i, j] for j in self.model.J)
+                                             <= sum((j + 1) * x[i_, j] for j in self.model.J))
+        if is_loaded:
+            for con in self.model.symmetry_cons.values():
+                self.solver.add_constraint(con)
+
+    def solve(self):
+        if self.symmetry is not None:
+            with INSTRUMENT.phase('model_write'):
+                self._break_symmetry()
+
+        # non-persistent solvers write the model inside model_solve
+        with INSTRUMENT.phase('model_write'):
+            if isinstance(self.solver, PersistentSolver):
+                if self.solver.has_instance():
+                    self._push_changed_params()
+                else:
+                    self._load_instance()
+        self.changed_params = ComponentSet()
+
+        # WARM START FROM THE PREVIOUS SLOT'S SOLUTION (STILL LOADED IN THE VARS)
+        with INSTRUMENT.phase('model_solve'):
+            if self.persistent and self.has_solution and getattr(self.solver, 'warm_start_capable', lambda: False)():
+                res = self.solver.solve(self.model, warmstart=True, load_solutions=False, options=self.options)
+            else:
+                res = self.solver.solve(self.model, load_solutions=False, options=self.options)
+
+        # THE INCUMBENT WHEN A LIMIT HITS, NONE MEANS NO DECISION
+        with INSTRUMENT.phase('model_load'):
+            try:
+                if isinstance(self.solver, PersistentSolver):
+                    self.solver.load_vars()
+                else:
+                    self.model.solutions.load_from(res)
+            except (ValueError, RuntimeError) as error:
+                raise ValueError(f"{self.solver_name} found no solution: {res.solver.termination_condition}.") \
+                    from error
+        self.has_solution = True
+
+        return res
+
+    def _load_instance(self):
+        self.solver.set_instance(self.model)
+
+        for con in self.model.component_data_objects(Constraint, active=True):
+            for param in identify_mutable_parameters(con.expr):
+                self.param_cons.setdefault(param, list()).append(con)
+
+    def _push_changed_params(self):
+        # PARAMS WRITTEN THROUGH set_param_array SINCE THE LAST SOLVE
+        changed_cons = ComponentSet()
+        for param in self.changed_params:
+            changed_cons.update(self.param_cons.get(param, list()))
+
+        for con in changed_cons:
+            self.solver.remove_constraint(con)
+            self.solver.add_constraint(con)
+        if len(self.changed_params) > 0:
+            self.solver.set_objective(self.model.obj)
+
     def add_cache_var_cons(self):
         self.model.y = Var(self.model.I, self.model.J, within=Binary)
         self.model.z = Var(self.model.I, self.model.J, within=Binary)
@@ -0,0 +1,190 @@
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.scenario.env import Env
+from src.scenario.operate import Operate
+from src.opt.solver.brain import Brain
+
+# BRAIN OF A WORKER PROCESS
+_worker_brain = None
+
+
+def _init_worker(env, brain_kwargs):
+    global _worker_brain
+    _worker_brain = Brain(env, **brain_kwargs)
+
+
+def _solve_in_worker(state):
+    _worker_brain.set_state(**state)
+    return _worker_brain.choose_action()
+
+
+def _close_worker():
+    _worker_brain.close()
+
+
+class Pipeline:
+    """Decides slot t+1 on a predicted state while the caller simulates slot t.
+
+    prefetch(operate, action) predicts the state after the slot is stepped with action and starts solving it on a
+    worker ('process', or 'thread' for solvers that release the GIL); choose_action(operate) for the next slot compares
+    the observed state with the prediction. Within rtol (relative to the largest queue) the prefetched decision is
+    used, otherwise it is solved again on the observed state (on_mismatch='resolve') or used anyway ('keep').
+    """
+
+    def __init__(self, env: Env, is_scheduled: bool, has_caching: bool, worker: str = 'process', rtol: float = 0.05,
+                 on_mismatch: str = 'resolve', **brain_kwargs):
+        if worker not in ('process', 'thread'):
+            raise ValueError(f"Unknown pipeline worker {worker}.")
+        if on_mismatch not in ('resolve', 'keep'):
+            raise ValueError(f"Unknown mismatch handling {on_mismatch}.")
+
+        self.env = env
+        self.is_scheduled = is_scheduled
+        self.has_caching = has_caching
+        self.rtol = rtol
+        self.on_mismatch = on_mismatch
+
+        brain_kwargs = dict(brain_kwargs, is_scheduled=is_scheduled, has_caching=has_caching)
+        self.brain = Brain(env, **brain_kwargs)
+        if worker == 'process':
+            self.executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(env, brain_kwargs))
+            self.solve = _solve_in_worker
+        else:
+            self.worker_brain = Brain(env, **brain_kwargs)
+            self.executor = ThreadPoolExecutor(max_workers=1)
+            self.solve = self._solve_in_thread
+
+        self.future = None
+        self.predicted = None
+        self.n_hit = 0
+        self.n_mismatch = 0
+        self.n_direct = 0
+        self.wait_time = 0.0
+        self.errors = list()
+
+    def _solve_in_thread(self, state):
+        self.worker_brain.set_state(**state)
+        return self.worker_brain.choose_action()
+
+    def predict_state(self, operate: Operate, action):
+        """Mutable params of the next slot if this slot is stepped with action.
+
+        The device queues are FIFO at a fixed rate and come out exact. An edge serves its queued work in device order,
+        then what arrives this slot in the task order of action, less the deletion and deploy times; caches keep what
+        action keeps plus the containers and images of served devices.
+        """
+        env = operate.env
+        t = env.time_count
+        n_iot, n_edge = env.n_iot, env.n_edge
+        D = np.asarray(env.bit_arrive[t], dtype=float)
+
+        offload = np.asarray(action[0])
+        rest = list(action[1:-2])
+        order = [np.arange(n_iot)] * n_edge
+        if self.is_scheduled:
+            allocation = rest.pop(0)
+            order = [np.asarray(k_j) if np.ndim(k_j) == 1 else np.argsort(np.rint(np.sum(k_j, axis=0)), kind='stable')
+                     for k_j in allocation]
+        y_pre, z_pre = operate.y_pre, operate.z_pre
+        y, z = (rest[0], rest[1]) if self.has_caching else (None, None)
+
+        # DEVICE QUEUES
+        G = np.maximum(0.0, operate.queue_iot_comp_remain + D * (offload == 0)
+                       - env.duration * env.comp_cap_iot / env.comp_density)
+        U = operate.queue_iot_tran_remain.copy()
+        edge = np.flatnonzero(offload > 0)
+        U[edge, offload[edge] - 1] += D[edge]
+        moved = np.minimum(U, env.duration * env.tran_cap_iot)
+        U -= moved
+
+        # EDGE QUEUES
+        Q = np.zeros([n_iot, n_edge])
+        y_next, z_next = y_pre.copy(), z_pre.copy()
+        for j in range(n_edge):
+            budget = env.duration
+            if self.has_caching:
+                budget -= ((y_pre[:, j] * (1 - y[:, j])) * env.container_delete).sum()
+                budget -= ((z_pre[:, j] * (1 - z[:, j])) * env.image_delete).sum()
+                y_next[:, j] *= y[:, j]
+                z_next[:, j] *= z[:, j]
+
+            devices = np.r_[np.arange(n_iot), order[j]]
+            work = np.r_[operate.queue_fog_comp_remain[:, j], moved[order[j], j]]
+            deploy = (1 - y_next[devices, j]) * (env.container_startup[devices]
+                                                  + (1 - z_next[devices, j]) * env.image_size[devices]
+                                                  / env.edge_download_speed[j])
+            # a device deploys once, before its first task with work
+            active = np.flatnonzero(work > 0)
+            first = np.zeros(devices.size, bool)
+            first[active[np.unique(devices[active], return_index=True)[1]]] = True
+            deploy = np.where(first, deploy, 0.0)
+            comp = work * env.comp_density[devices] / env.comp_cap_edge[j]
+            need = deploy + comp
+            start = np.cumsum(need) - need
+            served = np.clip(budget - start, 0.0, need)
+            comp_served = np.clip(served - deploy, 0.0, comp)
+            left = np.where(comp > 0, work * (1 - comp_served / np.where(comp > 0, comp, 1.0)), 0.0)
+            np.add.at(Q[:, j], devices, left)
+            # a task is taken while there is time left, a missing container is deployed from its (pulled) image
+            reached = devices[first & (start < budget)]
+            reached = reached[y_next[reached, j] == 0]
+            y_next[reached, j] = 1
+            z_next[reached, j] = 1
+
+        return {'G': G, 'U': U, 'Q': Q, 'D': np.asarray(env.bit_arrive[t + 1], dtype=float),
+                'y_pre': y_next, 'z_pre': z_next}
+
+    def prefetch(self, operate: Operate, action):
+        # START DECIDING THE NEXT SLOT (none after the last arrival slot)
+        if operate.env.time_count + 1 >= operate.env.n_time:
+            return
+        self.predicted = self.predict_state(operate, action)
+        self.future = self.executor.submit(self.solve, self.predicted)
+
+    def _error(self, operate: Operate):
+        # LARGEST QUEUE DIFFERENCE RELATIVE TO THE LARGEST QUEUE, CACHE STATES MUST MATCH
+        actual = {'G': operate.queue_iot_comp_remain, 'U': operate.queue_iot_tran_remain,
+                  'Q': operate.queue_fog_comp_remain}
+        if not (np.array_equal(self.predicted['y_pre'], operate.y_pre)
+                and np.array_equal(self.predicted['z_pre'], operate.z_pre)):
+            return np.inf
+        scale = max(1.0, *(np.abs(values).max(initial=0.0) for values in actual.values()))
+        return max(np.abs(self.predicted[name] - values).max(initial=0.0) for name, values in actual.items()) / scale
+
+    def choose_action(self, operate: Operate):
+        if self.future is None:
+            self.n_direct += 1
+            self.brain.set_mutable_param(operate)
+            return self.brain.choose_action()
+
+        start_time = time.time()
+        action = self.future.result()
+        self.wait_time += time.time() - start_time
+        self.future = None
+
+        error = self._error(operate)
+        self.errors.append(error)
+        if error <= self.rtol:
+            self.n_hit += 1
+            return action
+        self.n_mismatch += 1
+        if self.on_mismatch == 'keep':
+            return action
+        self.brain.set_mutable_param(operate)
+        return self.brain.choose_action()
+
+    def stats(self):
+        return {'hit': self.n_hit, 'mismatch': self.n_mismatch, 'direct': self.n_direct, 'wait_time': self.wait_time}
+
+    def close(self):
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+        if self.solve is _solve_in_worker:
+            self.executor.submit(_close_worker).result()
+        else:
+            self.worker_brain.close()
+        self.executor.shutdown()
+        self.brain.close()
@@ -0,0 +1,49 @@
+import numpy as np
+
+from src.scenario.env import Env
+
+
+def edge_constants(env: Env):
+    # [J, n] CONSTANTS THAT TELL EDGES APART: Fe, R_pull, cache limits and the transmit capacity of every device
+    return np.column_stack([env.comp_cap_edge, env.edge_download_speed, env.edge_container_cache_limit,
+                            env.edge_image_cache_limit, env.tran_cap_iot.T])
+
+
+def device_constants(env: Env):
+    # [I, n] CONSTANTS THAT TELL DEVICES APART
+    return np.column_stack([env.comp_cap_iot, env.comp_density, env.container_size, env.container_startup,
+                            env.container_delete, env.image_size, env.image_delete, env.tran_cap_iot])
+
+
+def edge_classes(constants, params, has_caching, tol):
+    """Edges interchangeable within a relative tolerance tol on their constants and the slot's U, Q (and caches).
+
+    Returns the classes with more than one edge as index arrays in increasing order; an edge joins the first class
+    whose first edge it matches.
+    """
+    features = [constants, params['U'].T, params['Q'].T]
+    if has_caching:
+        features += [params['y_pre'].T, params['z_pre'].T]
+    return _classes(np.concatenate(features, axis=1), tol)
+
+
+def device_classes(constants, params, has_caching, tol):
+    # DEVICES INTERCHANGEABLE ON THEIR CONSTANTS AND THE SLOT'S D, G, U, Q (AND CACHES), AS edge_classes
+    features = [constants, params['D'][:, None], params['G'][:, None], params['U'], params['Q']]
+    if has_caching:
+        features += [params['y_pre'], params['z_pre']]
+    return _classes(np.concatenate(features, axis=1), tol)
+
+
+def _classes(features, tol):
+    classes = list()
+    for j in range(features.shape[0]):
+        for members in classes:
+            first = features[members[0]]
+            if np.all(np.abs(features[j] - first) <= tol * np.maximum(np.abs(features[j]), np.abs(first))):
+                members.append(j)
+                break
+        else:
+            classes.append([j])
+
+    return [np.array(members) for members in classes if len(members) > 1]
@@ -0,0 +1,227 @@
+import numpy as np
+
+from src.scenario.env import Env
+from src.scenario.sharing import processor_sharing
+from src.scenario.task_queue import ArrayTaskQueue
+
+
+class BatchSim:
+    """Monte Carlo replications of Sim advancing together, one lane per replication in every task queue.
+
+    Replications share the constants of env and start from its current edge caches. Decisions are shared or given
+    per replication (leading axis of size n_rep). Edge caches must hold every container and image, so no replication
+    ever evicts.
+    """
+
+    def __init__(self, env: Env):
+        self.env = env
+        self.is_serial = True
+
+        if env.n_iot * env.container_size.max() > env.edge_container_cache_limit.min() or \
+                env.n_iot * env.image_size.max() > env.edge_image_cache_limit.min():
+            raise ValueError(f"BatchSim needs edge caches that hold all {env.n_iot} containers and images.")
+
+        self.n_rep = 0
+        self.bit_arrive = np.zeros([0, env.n_time, env.n_iot])
+
+    def reset(self, bit_arrive):
+        # bit_arrive: [n_rep, n_time, n_iot]
+        self.bit_arrive = np.asarray(bit_arrive, np.float64)
+        self.n_rep = self.bit_arrive.shape[0]
+        n_rep, n_iot, n_edge = self.n_rep, self.env.n_iot, self.env.n_edge
+
+        # TIME COUNT
+        self.time_count = int(0)
+
+        # LANES: rep * n_iot + iot, (rep * n_iot + iot) * n_edge + edge and rep * n_edge + edge
+        self.Queue_iot_comp = ArrayTaskQueue(n_lane=n_rep * n_iot)
+        self.Queue_iot_tran = ArrayTaskQueue(n_lane=n_rep * n_iot * n_edge)
+        self.Queue_edge_comp = ArrayTaskQueue(n_lane=n_rep * n_edge)
+
+        # CACHE STATE [n_rep, n_edge, n_iot]
+        cache = self.env.edge_server_cache
+        self.y = np.array([[[cache[edge_index].has_container(container_index=iot_index) for iot_index in range(n_iot)]
+                            for edge_index in range(n_edge)]] * n_rep, dtype=bool).reshape([n_rep, n_edge, n_iot])
+        self.z = np.array([[[cache[edge_index].has_image(image_index=iot_index) for iot_index in range(n_iot)]
+                            for edge_index in range(n_edge)]] * n_rep, dtype=bool).reshape([n_rep, n_edge, n_iot])
+
+        # TASK DELAY
+        self.process_delay = np.zeros([n_rep, self.env.n_time, n_iot])
+        self.process_delay_trans = np.zeros([n_rep, self.env.n_time, n_iot])
+
+    def _task_orders(self, schedule):
+        # SAME FORMS AS Sim.step: per edge a k matrix (task i before s) or a task order
+        if schedule is None:
+            return np.tile(np.arange(self.env.n_iot), (self.env.n_edge, 1))
+        orders = list()
+        for k in schedule:
+            k = np.asarray(k)
+            orders.append(k.astype(np.int64) if k.ndim == 1 else np.argsort(np.rint(k.sum(axis=0)), kind='stable'))
+        return np.array(orders)
+
+    def queue_empty(self):
+        return len(self.Queue_iot_comp) == 0 and len(self.Queue_iot_tran) == 0 and len(self.Queue_edge_comp) == 0
+
+    def step(self, offload=None, schedule=None, container_cache=None, image_cache=None):
+        n_iot, n_edge, t = self.env.n_iot, self.env.n_edge, self.time_count
+
+        # PUT TASKS INTO IOT QUEUE (offload: [n_iot] or [n_rep, n_iot])
+        offload = np.broadcast_to(np.asarray(offload, np.int64), (self.n_rep, n_iot))
+        arrive = self.bit_arrive[:, t] != 0
+        rep, iot = np.nonzero(arrive & (offload == 0))
+        self.Queue_iot_comp.push(lanes=rep * n_iot + iot, time=t, size=self.bit_arrive[rep, t, iot])
+        rep, iot = np.nonzero(arrive & (offload > 0))
+        self.Queue_iot_tran.push(lanes=(rep * n_iot + iot) * n_edge + offload[rep, iot] - 1, time=t,
+                                 size=self.bit_arrive[rep, t, iot])
+
+        self._process_env(schedule, container_cache, image_cache)
+
+        done = False
+        if self.time_count >= self.env.n_time:
+            while not done:
+                if self.queue_empty():
+                    done = True
+                else:
+                    self._process_env(schedule, container_cache, image_cache)
+
+        return done
+
+    def _process_env(self, schedule=None, container_cache=None, image_cache=None):
+        n_rep, n_iot, n_edge = self.n_rep, self.env.n_iot, self.env.n_edge
+        now = self.time_count * self.env.duration
+
+        # PROCESS IOT COMP AND TRANS QUEUE
+        lane, task_time, _, elapsed = self.Queue_iot_comp.drain(
+            self.env.duration, cap=np.tile(self.env.comp_cap_iot, n_rep), density=np.tile(self.env.comp_density, n_rep))
+        rep, iot = np.divmod(lane, n_iot)
+        self.process_delay[rep, task_time, iot] = now + elapsed - task_time * self.env.duration
+
+        lane, task_time, task_size, elapsed = self.Queue_iot_tran.drain(
+            self.env.duration, cap=np.tile(self.env.tran_cap_iot.reshape(-1), n_rep))
+        lane, edge = np.divmod(lane, n_edge)
+        rep, iot = np.divmod(lane, n_iot)
+        self.process_delay_trans[rep, task_time, iot] = now + elapsed - task_time * self.env.duration
+
+        # PUT TASKS INTO EDGE COMP IN ORDER (every transmitted task enters in the same slot)
+        orders = self._task_orders(schedule)
+        rank = np.argsort(orders, axis=1)
+        sort = np.lexsort((np.arange(lane.size), rank[edge, iot], edge, rep))
+        group = (rep * n_edge + edge)[sort]
+        first = np.r_[True, group[1:] != group[:-1]] if group.size > 0 else np.zeros(0, bool)
+        position = np.arange(group.size) - np.maximum.accumulate(np.where(first, np.arange(group.size), 0))
+        for n in range(int(position.max()) + 1 if group.size > 0 else 0):
+            pick = sort[position == n]
+            self.Queue_edge_comp.push(lanes=group[position == n], time=task_time[pick], size=task_size[pick],
+                                      iot=iot[pick])
+
+        # DELETE UNCACHED ENTRIES (container_cache, image_cache: [n_iot, n_edge] or [n_rep, n_iot, n_edge])
+        edge_time_remain = np.full([n_rep, n_edge], self.env.duration, np.float64)
+        if container_cache is not None and image_cache is not None:
+            container_cache = np.broadcast_to(np.asarray(container_cache), (n_rep, n_iot, n_edge))
+            image_cache = np.broadcast_to(np.asarray(image_cache), (n_rep, n_iot, n_edge))
+            for iot_index in range(n_iot):
+                delete = self.z[:, :, iot_index] & (image_cache[:, iot_index, :] == 0)
+                edge_time_remain[delete] -= self.env.image_delete[iot_index]
+                self.z[:, :, iot_index] &= ~delete
+                delete = self.y[:, :, iot_index] & (container_cache[:, iot_index, :] == 0)
+                edge_time_remain[delete] -= self.env.container_delete[iot_index]
+                self.y[:, :, iot_index] &= ~delete
+
+        if self.is_serial:
+            self._process_edge_comp(edge_time_remain.reshape(-1))
+        else:
+            self._process_edge_comp_in_concurrent(edge_time_remain.reshape(-1))
+
+        # TIME UPDATE
+        self.time_count += 1
+
+    def _dep_container(self, rep, edge, iot):
+        # DEPLOY TIME OF CONTAINERS (download the image first if needed), caches them
+        miss_container = ~self.y[rep, edge, iot]
+        miss_image = miss_container & ~self.z[rep, edge, iot]
+        deploy_time = np.where(miss_image, self.env.image_size[iot] / self.env.edge_download_speed[edge], 0.0)
+        deploy_time = np.where(miss_container, deploy_time + self.env.container_startup[iot], 0.0)
+        self.y[rep, edge, iot] = True
+        self.z[rep, edge, iot] = True
+
+        return deploy_time
+
+    def _process_edge_comp(self, edge_time_remain):
+        queue = self.Queue_edge_comp
+        active = np.flatnonzero((queue.count > 0) & (edge_time_remain > 0))
+        while active.size > 0:
+            pos = queue.head[active]
+            rep, edge = np.divmod(active, self.env.n_edge)
+            iot = queue.iot[active, pos]
+            edge_time_remain[active] -= self._dep_container(rep, edge, iot)
+
+            remain = queue.remain[active, pos]
+            comp_cap_edge = self.env.comp_cap_edge[edge]
+            iot_comp_density = self.env.comp_density[iot]
+            finish = edge_time_remain[active] * comp_cap_edge / iot_comp_density >= remain
+
+            # FINISHED TASKS
+            lane = active[finish]
+            edge_time_remain[lane] -= remain[finish] * iot_comp_density[finish] / comp_cap_edge[finish]
+            task_time = queue.time[lane, pos[finish]]
+            self.process_delay[rep[finish], task_time, iot[finish]] = self.time_count * self.env.duration + \
+                (self.env.duration - edge_time_remain[lane]) - task_time * self.env.duration
+            queue.head[lane] = (queue.head[lane] + 1) % queue.capacity
+            queue.count[lane] -= 1
+            queue.remain_total[lane] -= remain[finish]
+
+            # PARTIALLY SERVED TASKS
+            part = active[~finish]
+            served = edge_time_remain[part] * comp_cap_edge[~finish] / iot_comp_density[~finish]
+            queue.remain[part, pos[~finish]] -= served
+            queue.remain_total[part] -= served
+            edge_time_remain[part] = 0
+
+            active = lane[(edge_time_remain[lane] > 0) & (queue.count[lane] > 0)]
+
+    def _process_edge_comp_in_concurrent(self, edge_time_remain):
+        queue = self.Queue_edge_comp
+        for lane in np.flatnonzero(queue.count > 0):
+            rep, edge = divmod(int(lane), self.env.n_edge)
+            pos = (queue.head[lane] + np.arange(queue.count[lane])) % queue.capacity
+            serve = pos[queue.remain[lane, pos] > 0]
+            iot = queue.iot[lane, serve]
+
+            time_remain = edge_time_remain[lane]
+            for iot_index in dict.fromkeys(iot.tolist()):
+                time_remain -= self._dep_container(rep, edge, iot_index)
+            if time_remain <= 0 or serve.size == 0:
+                continue
+
+            done, finish_time, remain_new = processor_sharing(
+                device=iot, remain=queue.remain[lane, serve], density=self.env.comp_density,
+                comp_cap=self.env.comp_cap_edge[edge], time_budget=time_remain)
+            task_time = queue.time[lane, serve[done]]
+            self.process_delay[rep, task_time, iot[done]] = self.time_count * self.env.duration + \
+                (self.env.duration - time_remain) + finish_time[done] - task_time * self.env.duration
+            queue.remain[lane, serve] = remain_new
+
+            # KEEP UNFINISHED TASKS IN ORDER
+            keep = pos[~np.isin(pos, serve[done])]
+            for column in ('time', 'size', 'remain', 'iot'):
+                values = getattr(queue, column)
+                values[lane, pos[:keep.size]] = values[lane, keep]
+            queue.count[lane] = keep.size
+            queue.remain_total[lane] = queue.remain[lane, pos[:keep.size]].sum()
+
+    def delay_stats(self):
+        # PER REPLICATION OVER ARRIVED TASKS
+        arrived = self.bit_arrive != 0
+        n_task = arrived.sum(axis=(1, 2))
+        total_delay = np.where(arrived, self.process_delay, 0).sum(axis=(1, 2))
+
+        return {'n_task': n_task, 'total_delay': total_delay,
+                'mean_delay': total_delay / np.maximum(n_task, 1),
+                'max_delay': np.where(arrived, self.process_delay, 0).max(axis=(1, 2))}
+
+    @staticmethod
+    def confidence_interval(values, z=1.96):
+        # NORMAL APPROXIMATION OVER REPLICATIONS
+        values = np.asarray(values, np.float64)
+        half_width = z * values.std(ddof=1) / np.sqrt(values.size) if values.size > 1 else 0.0
+        return values.mean() - half_width, values.mean() + half_width
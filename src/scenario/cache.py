@@ -1,4 +1,6 @@
-import random
+import numpy as np
+
+from src.scenario.eviction import make_policy
 
 
 class Container:
@@ -17,7 +19,8 @@ class Image:
 
 
 class EdgeServerCache:
-    def __init__(self, container_set, image_set, container_cache_limit, image_cache_limit, download_speed):
+    def __init__(self, container_set, image_set, container_cache_limit, image_cache_limit, download_speed,
+                 policy='random'):
         self.container_set = [
             Container(index=index,
                       size=container['size'],
@@ -39,10 +42,20 @@ class EdgeServerCache:
         self.current_image_cache_usage = 0
         self.download_speed = download_speed
 
+        # EVICTION POLICIES ('random', 'lru', 'lfu' or 'gds')
+        self.container_policy = make_policy(policy)
+        self.image_policy = make_policy(policy)
+
+        # CHANGE LOG: (kind, index, cached) since the last drain_changes
+        self.changes = list()
+
     def cache_container(self, container_index):
         if self.current_container_cache_usage + self.container_set[container_index].size <= self.container_cache_limit:
             self.container_cache[container_index] = self.container_set[container_index]
             self.current_container_cache_usage += self.container_set[container_index].size
+            self.container_policy.insert(container_index, size=self.container_set[container_index].size,
+                                         cost=self.container_set[container_index].startup_time)
+            self.changes.append(('container', container_index, 1))
             return True
         return False
 
@@ -50,9 +63,48 @@ class EdgeServerCache:
         if self.current_image_cache_usage + self.image_set[image_index].size <= self.image_cache_limit:
             self.image_cache[image_index] = self.image_set[image_index]
             self.current_image_cache_usage += self.image_set[image_index].size
+            self.image_policy.insert(image_index, size=self.image_set[image_index].size,
+                                     cost=self.image_set[image_index].size / self.download_speed)
+            self.changes.append(('image', image_index, 1))
             return True
         return False
 
+    def drain_changes(self):
+        changes = self.changes
+        self.changes = list()
+        return changes
+
+    def stats(self):
+        return {'container': self.container_policy.stats(), 'image': self.image_policy.stats()}
+
+    def reset_stats(self):
+        self.container_policy.reset_stats()
+        self.image_policy.reset_stats()
+
+    def get_state(self):
+        # CACHED INDICES, USAGE, CHANGE LOG (kind 0 for containers, 1 for images) AND POLICY STATE AS ARRAYS
+        state = {'container': np.array(list(self.container_cache), np.int64),
+                 'image': np.array(list(self.image_cache), np.int64),
+                 'usage': np.array([self.current_container_cache_usage, self.current_image_cache_usage], np.float64),
+                 'changes': np.array([(int(kind == 'image'), index, cached) for kind, index, cached in self.changes],
+                                     np.int64).reshape([-1, 3])}
+        for name, policy in (('container_policy', self.container_policy), ('image_policy', self.image_policy)):
+            state.update({f'{name}.{key}': values for key, values in policy.get_state().items()})
+        return state
+
+    def set_state(self, state):
+        # fresh dicts and policies, so a shallow copy of this cache can take a state of its own
+        self.container_cache = {index: self.container_set[index] for index in state['container'].tolist()}
+        self.image_cache = {index: self.image_set[index] for index in state['image'].tolist()}
+        self.current_container_cache_usage, self.current_image_cache_usage = state['usage'].tolist()
+        self.changes = [('image' if kind else 'container', index, cached)
+                        for kind, index, cached in state['changes'].tolist()]
+        for name in ('container_policy', 'image_policy'):
+            policy = type(getattr(self, name))()
+            prefix = f'{name}.'
+            policy.set_state({key[len(prefix):]: values for key, values in state.items() if key.startswith(prefix)})
+            setattr(self, name, policy)
+
     def has_container(self, container_index):
         return container_index in self.container_cache
 
@@ -62,12 +114,13 @@ class EdgeServerCache:
     def download_image(self, image_index):
         download_time = self.image_set[image_index].size / self.download_speed
         delete_time = 0
+        self.image_policy.miss()
         flag = self.cache_image(image_index)
 
         while not flag:
             # delete some image cache
-            random_image_index = random.choice(list(self.image_cache.keys()))
-            delete_time += self.del_image(image_index=random_image_index)
+            victim_image_index = self.image_policy.evict()
+            delete_time += self.del_image(image_index=victim_image_index)
 
             flag = self.cache_image(image_index)
 
@@ -77,9 +130,13 @@ class EdgeServerCache:
         deploy_time = 0
 
         if self.has_container(container_index):
+            self.container_policy.hit(container_index)
             return 0
+        self.container_policy.miss()
 
-        if not self.has_image(image_index=container_index):
+        if self.has_image(image_index=container_index):
+            self.image_policy.hit(container_index)
+        else:
             deploy_time += self.download_image(container_index)
 
         if self.has_image(container_index):
@@ -89,8 +146,8 @@ class EdgeServerCache:
 
             while not flag:
                 # delete some container cache
-                random_container_index = random.choice(list(self.container_cache.keys()))
-                delete_time += self.del_container(container_index=random_container_index)
+                victim_container_index = self.container_policy.evict()
+                delete_time += self.del_container(container_index=victim_container_index)
 
                 flag = self.cache_container(container_index)
 
@@ -104,6 +161,8 @@ class EdgeServerCache:
         if self.has_image(image_index):
             image = self.image_cache.pop(image_index)
             self.current_image_cache_usage -= image.size
+            self.image_policy.remove(image_index)
+            self.changes.append(('image', image_index, 0))
             return image.delete_time
         else:
             print(f"Failed to delete image {image_index}. No such image.")
@@ -113,6 +172,8 @@ class EdgeServerCache:
         if self.has_container(container_index):
             container = self.container_cache.pop(container_index)
             self.current_container_cache_usage -= container.size
+            self.container_policy.remove(container_index)
+            self.changes.append(('container', container_index, 0))
             return container.delete_time
         else:
             print(f"Failed to delete container {container_index}. No such container.")
@@ -1,26 +1,36 @@
+import os
 import numpy as np
 from collections import deque
 
 from src.scenario.cache import EdgeServerCache
+from src.scenario.stream import DelayLog
+from src.scenario.task_log import TaskLog
+from src.scenario.task_queue import ArrayTaskQueue
 
 
 class Env:
     def __init__(self, num_iot, num_edge, num_time, duration, task_arrive_prob, max_bit_arrive, min_bit_arrive,
                  comp_cap_iot, comp_cap_edge, tran_cap_iot, comp_density, container_size, container_startup,
                  container_delete, image_size, image_delete, edge_container_cache_limit, edge_image_cache_limit,
-                 edge_download_speed):
+                 edge_download_speed, queue_engine='deque', cache_policy='random', delay_path=None):
         # INPUT DATA
         self.n_iot = num_iot
         self.n_edge = num_edge
         self.n_time = num_time
         self.duration = duration
 
+        # QUEUE ENGINE ('deque' for per-task dicts, 'array' for NumPy lanes)
+        if queue_engine not in ('deque', 'array'):
+            raise ValueError(f"Unknown queue engine {queue_engine}.")
+        self.queue_engine = queue_engine
+
         # BIT_ARRIVE_SET
         self.task_arrive_prob = task_arrive_prob
         self.max_bit_arrive = max_bit_arrive
         self.min_bit_arrive = min_bit_arrive
 
-        self.bit_arrive = np.zeros([self.n_time, self.n_iot])
+        # zero-stride placeholder until Sim.reset, so long horizons allocate nothing
+        self.bit_arrive = np.broadcast_to(0.0, (self.n_time, self.n_iot))
 
         self.comp_cap_iot = comp_cap_iot * np.ones(self.n_iot)
         self.comp_cap_edge = comp_cap_edge * np.ones([self.n_edge])
@@ -66,7 +76,8 @@ class Env:
                 image_set=self.image_set,
                 container_cache_limit=self.edge_container_cache_limit[edge_index],
                 image_cache_limit=self.edge_image_cache_limit[edge_index],
-                download_speed=self.edge_download_speed[edge_index]
+                download_speed=self.edge_download_speed[edge_index],
+                policy=cache_policy
             )
             for edge_index in range(self.n_edge)
         ]
@@ -79,24 +90,70 @@ class Env:
                 self.edge_server_cache[edge_index].download_image(image_index=iot_index)
                 self.edge_server_cache[edge_index].dep_container(container_index=iot_index)
 
+        # COUNT HITS AND MISSES FROM THE FIRST SLOT ON
+        for edge_index in range(self.n_edge):
+            self.edge_server_cache[edge_index].reset_stats()
+
         # TIME COUNT
         self.time_count = int(0)
 
-        self.Queue_iot_comp = list()
-        self.Queue_iot_tran = list()
+        self.init_queues()
+
+        # TASK DELAY (dense matrices, or append-only logs at delay_path)
+        self.delay_path = delay_path
+        self.process_delay = None
+        self.process_delay_trans = None
+
+        # PER-TASK RECORDS AND DELAY QUANTILES (set log_tasks before Sim.reset)
+        self.log_tasks = False
+        self.task_log = None
+
+        self.init_delays()
+
+    def init_delays(self):
+        self.close_delays()
+        if self.delay_path is None:
+            self.process_delay = np.zeros([self.n_time, self.n_iot])
+            self.process_delay_trans = np.zeros([self.n_time, self.n_iot])
+        else:
+            root, ext = os.path.splitext(self.delay_path)
+            self.process_delay = DelayLog(self.delay_path)
+            self.process_delay_trans = DelayLog(root + '_trans' + ext)
+
+        self.task_log = None
+        if self.log_tasks:
+            path = None
+            if self.delay_path is not None:
+                root, ext = os.path.splitext(self.delay_path)
+                path = root + '_tasks' + ext
+            self.task_log = TaskLog(self.n_iot, self.n_edge, path=path)
+
+    def close_delays(self):
+        for delay in (self.process_delay, self.process_delay_trans, self.task_log):
+            if isinstance(delay, (DelayLog, TaskLog)):
+                delay.close()
+
+    def init_queues(self):
         self.Queue_edge_wait = list()
         self.Queue_edge_comp = list()
 
         for iot in range(self.n_iot):
-            self.Queue_iot_comp.append(deque())
-            self.Queue_iot_tran.append(list())
             self.Queue_edge_wait.append(list())
             for edge in range(self.n_edge):
-                self.Queue_iot_tran[iot].append(deque())
                 self.Queue_edge_wait[iot].append(deque())
         for edge in range(self.n_edge):
             self.Queue_edge_comp.append(deque())
 
-        # TASK DELAY
-        self.process_delay = np.zeros([self.n_time, self.n_iot])
-        self.process_delay_trans = np.zeros([self.n_time, self.n_iot])
+        if self.queue_engine == 'array':
+            # ARRAY LANES: iot for computing, iot * n_edge + edge for transmitting
+            self.Queue_iot_comp = ArrayTaskQueue(n_lane=self.n_iot)
+            self.Queue_iot_tran = ArrayTaskQueue(n_lane=self.n_iot * self.n_edge)
+        else:
+            self.Queue_iot_comp = list()
+            self.Queue_iot_tran = list()
+
+            for iot in range(self.n_iot):
+                self.Queue_iot_comp.append(deque())
+                self.Queue_iot_tran.append(list())
+                for edge in range(self.n_edge):
+                    self.Queue_iot_tran[iot].append(deque())
@@ -0,0 +1,250 @@
+import heapq
+import random
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class EvictionPolicy(ABC):
+    """Chooses which cached entry to evict and counts hits, misses and evictions."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abstractmethod
+    def insert(self, key, size, cost):
+        pass
+
+    @abstractmethod
+    def touch(self, key, n=1):
+        pass
+
+    @abstractmethod
+    def remove(self, key):
+        pass
+
+    @abstractmethod
+    def victim(self):
+        pass
+
+    def hit(self, key, n=1):
+        # n repeated hits on the same key at once
+        self.hits += n
+        self.touch(key, n)
+
+    def miss(self):
+        self.misses += 1
+
+    def evict(self):
+        self.evictions += 1
+        return self.victim()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_state(self):
+        # counters and bookkeeping as arrays, keys in the policy's own order
+        return {'counter': np.array([self.hits, self.misses, self.evictions], np.int64)}
+
+    def set_state(self, state):
+        self.hits, self.misses, self.evictions = state['counter'].tolist()
+
+
+class RandomPolicy(EvictionPolicy):
+    # uniform victim, keys in a list with swap-remove so a pick is O(1)
+    def __init__(self):
+        super().__init__()
+        self.keys = list()
+        self.position = dict()
+
+    def insert(self, key, size, cost):
+        self.position[key] = len(self.keys)
+        self.keys.append(key)
+
+    def touch(self, key, n=1):
+        pass
+
+    def remove(self, key):
+        position = self.position.pop(key, None)
+        if position is None:
+            return
+        last = self.keys.pop()
+        if position < len(self.keys):
+            self.keys[position] = last
+            self.position[last] = position
+
+    def victim(self):
+        return random.choice(self.keys)
+
+    def get_state(self):
+        state = super().get_state()
+        state['keys'] = np.array(self.keys, np.int64)
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.keys = state['keys'].tolist()
+        self.position = {key: position for position, key in enumerate(self.keys)}
+
+
+class LRUPolicy(EvictionPolicy):
+    def __init__(self):
+        super().__init__()
+        self.keys = OrderedDict()
+
+    def insert(self, key, size, cost):
+        self.keys[key] = None
+
+    def touch(self, key, n=1):
+        self.keys.move_to_end(key)
+
+    def remove(self, key):
+        self.keys.pop(key, None)
+
+    def victim(self):
+        return next(iter(self.keys))
+
+    def get_state(self):
+        state = super().get_state()
+        state['keys'] = np.array(list(self.keys), np.int64)
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.keys = OrderedDict.fromkeys(state['keys'].tolist())
+
+
+class LFUPolicy(EvictionPolicy):
+    # frequency buckets, least recently used first within a bucket; lowest frequency from a lazy heap
+    def __init__(self):
+        super().__init__()
+        self.freq = dict()
+        self.buckets = dict()
+        self.heap = list()
+
+    def _add(self, key, freq):
+        self.freq[key] = freq
+        if freq not in self.buckets:
+            self.buckets[freq] = OrderedDict()
+            heapq.heappush(self.heap, freq)
+
+            # DROP STALE FREQUENCIES WHEN THE HEAP OUTGROWS THE BUCKETS
+            if len(self.heap) > 2 * len(self.buckets) + 16:
+                self.heap = list(self.buckets)
+                heapq.heapify(self.heap)
+        self.buckets[freq][key] = None
+
+    def _drop(self, key):
+        freq = self.freq.pop(key)
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if len(bucket) == 0:
+            del self.buckets[freq]
+        return freq
+
+    def insert(self, key, size, cost):
+        self._add(key, 1)
+
+    def touch(self, key, n=1):
+        self._add(key, self._drop(key) + n)
+
+    def remove(self, key):
+        if key in self.freq:
+            self._drop(key)
+
+    def victim(self):
+        while self.heap[0] not in self.buckets:
+            heapq.heappop(self.heap)
+        return next(iter(self.buckets[self.heap[0]]))
+
+    def get_state(self):
+        # keys bucket by bucket, least recently used first
+        state = super().get_state()
+        keys = [key for bucket in self.buckets.values() for key in bucket]
+        state['keys'] = np.array(keys, np.int64)
+        state['freq'] = np.array([self.freq[key] for key in keys], np.int64)
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.freq = dict()
+        self.buckets = dict()
+        self.heap = list()
+        for key, freq in zip(state['keys'].tolist(), state['freq'].tolist()):
+            self._add(key, freq)
+
+
+class GreedyDualSizePolicy(EvictionPolicy):
+    # H = L + cost / size, evict the lowest H and inflate L to it (lazy heap)
+    def __init__(self):
+        super().__init__()
+        self.inflation = 0.0
+        self.value = dict()
+        self.priority = dict()
+        self.heap = list()
+        self.count = 0
+
+    def _push(self, key):
+        self.count += 1
+        self.priority[key] = (self.inflation + self.value[key], self.count)
+        heapq.heappush(self.heap, self.priority[key] + (key,))
+
+        # DROP STALE ENTRIES WHEN THE HEAP OUTGROWS THE CACHE
+        if len(self.heap) > 2 * len(self.priority) + 16:
+            self.heap = [self.priority[key] + (key,) for key in self.priority]
+            heapq.heapify(self.heap)
+
+    def insert(self, key, size, cost):
+        self.value[key] = cost / size if size > 0 else float('inf')
+        self._push(key)
+
+    def touch(self, key, n=1):
+        self._push(key)
+
+    def remove(self, key):
+        self.priority.pop(key, None)
+        self.value.pop(key, None)
+
+    def victim(self):
+        while self.priority.get(self.heap[0][2]) != self.heap[0][:2]:
+            heapq.heappop(self.heap)
+        self.inflation = self.heap[0][0]
+        return self.heap[0][2]
+
+    def get_state(self):
+        # live priorities only, the heap is rebuilt from them
+        state = super().get_state()
+        keys = list(self.priority)
+        state['keys'] = np.array(keys, np.int64)
+        state['value'] = np.array([self.value[key] for key in keys], np.float64)
+        state['priority'] = np.array([self.priority[key][0] for key in keys], np.float64)
+        state['order'] = np.array([self.priority[key][1] for key in keys], np.int64)
+        state['clock'] = np.array([self.inflation, self.count], np.float64)
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        keys = state['keys'].tolist()
+        self.value = dict(zip(keys, state['value'].tolist()))
+        self.priority = {key: (priority, order) for key, priority, order in
+                         zip(keys, state['priority'].tolist(), state['order'].tolist())}
+        self.heap = [self.priority[key] + (key,) for key in keys]
+        heapq.heapify(self.heap)
+        self.inflation = float(state['clock'][0])
+        self.count = int(state['clock'][1])
+
+
+POLICIES = {'random': RandomPolicy, 'lru': LRUPolicy, 'lfu': LFUPolicy, 'gds': GreedyDualSizePolicy}
+
+
+def make_policy(name):
+    if name not in POLICIES:
+        raise ValueError(f"Unknown eviction policy {name}.")
+    return POLICIES[name]()
@@ -1,38 +1,80 @@
 import numpy as np
+from collections import deque
 
 from src.scenario.env import Env
+from src.scenario.sharing import processor_sharing
+from src.tools.instrument import timed
 
 
 class Operate:
     def __init__(self, num_iot, num_edge, num_time, duration, task_arrive_prob, max_bit_arrive, min_bit_arrive,
                  comp_cap_iot, comp_cap_edge, tran_cap_iot, comp_density, container_size, container_startup,
                  container_delete, image_size, image_delete, edge_container_cache_limit, edge_image_cache_limit,
-                 edge_download_speed):
+                 edge_download_speed, queue_engine='deque', cache_policy='random', delay_path=None):
         self.env = Env(num_iot, num_edge, num_time, duration, task_arrive_prob, max_bit_arrive, min_bit_arrive,
                        comp_cap_iot, comp_cap_edge, tran_cap_iot, comp_density, container_size, container_startup,
                        container_delete, image_size, image_delete, edge_container_cache_limit, edge_image_cache_limit,
-                       edge_download_speed)
+                       edge_download_speed, queue_engine, cache_policy, delay_path)
         self.is_serial = True
 
+        # TASKS FINISHED OR MOVED SO FAR (a slot without any, and without cache changes, is steady)
+        self.n_event = 0
+        # TASKS PUT IN AND NOT FINISHED YET, IN ANY QUEUE
+        self.n_pending = 0
+
         # INFO FOR OPTIMIZATION
         self.queue_iot_comp_remain: np.ndarray = np.zeros(self.env.n_iot)
         self.queue_iot_tran_remain: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
         self.queue_fog_comp_remain: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
+        self.queue_fog_comp_count: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge], np.int64)
         self.y_pre: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
         self.z_pre: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
+        self.rebuild_info_for_opt()
 
     def put_task_into_iot_comp(self, iot_index):
+        if self.env.queue_engine == 'array':
+            self.put_tasks_into_iot_comp(iot_indices=[iot_index])
+            return
+
         bit_arrive = np.squeeze(self.env.bit_arrive[self.env.time_count, iot_index])
         iot_comp_task = {'time': self.env.time_count, 'size': bit_arrive, 'remain': bit_arrive}
         self.env.Queue_iot_comp[iot_index].append(iot_comp_task)
+        self.queue_iot_comp_remain[iot_index] += bit_arrive
+        self.n_pending += 1
 
     def put_task_into_iot_trans(self, iot_index, edge_index):
+        if self.env.queue_engine == 'array':
+            self.put_tasks_into_iot_trans(iot_indices=[iot_index], edge_indices=[edge_index])
+            return
+
         bit_arrive = np.squeeze(self.env.bit_arrive[self.env.time_count, iot_index])
         iot_tran_task = {'time': self.env.time_count, 'edge': edge_index,
                          'size': bit_arrive, 'remain': bit_arrive}
         self.env.Queue_iot_tran[iot_index][iot_tran_task['edge']].append(iot_tran_task)
-
+        self.queue_iot_tran_remain[iot_index, edge_index] += bit_arrive
+        self.n_pending += 1
+
+    def put_tasks_into_iot_comp(self, iot_indices):
+        # ARRAY ENGINE ONLY
+        iot_indices = np.asarray(iot_indices, np.int64)
+        bit_arrive = self.env.bit_arrive[self.env.time_count, iot_indices]
+        self.env.Queue_iot_comp.push(lanes=iot_indices, time=self.env.time_count, size=bit_arrive)
+        self.n_pending += iot_indices.size
+
+    def put_tasks_into_iot_trans(self, iot_indices, edge_indices):
+        # ARRAY ENGINE ONLY
+        iot_indices = np.asarray(iot_indices, np.int64)
+        bit_arrive = self.env.bit_arrive[self.env.time_count, iot_indices]
+        lanes = iot_indices * self.env.n_edge + np.asarray(edge_indices, np.int64)
+        self.env.Queue_iot_tran.push(lanes=lanes, time=self.env.time_count, size=bit_arrive)
+        self.n_pending += iot_indices.size
+
+    @timed('iot_comp')
     def process_iot_comp_queue(self):
+        if self.env.queue_engine == 'array':
+            self._process_iot_comp_array()
+            return
+
         for iot_index in range(self.env.n_iot):
             iot_comp_cap = self.env.comp_cap_iot[iot_index]
             iot_comp_density = self.env.comp_density[iot_index]
@@ -44,15 +86,29 @@ class Operate:
 
                 if iot_comp_time_remain >= get_task['remain'] * iot_comp_density / iot_comp_cap:
                     iot_comp_time_remain -= get_task['remain'] * iot_comp_density / iot_comp_cap
-                    self.env.process_delay[get_task['time'], iot_index] = \
-                        self.env.time_count * self.env.duration + (self.env.duration - iot_comp_time_remain) - get_task[
-                            'time'] * self.env.duration
+                    self.queue_iot_comp_remain[iot_index] -= get_task['remain']
+                    self.n_event += 1
+                    self.n_pending -= 1
+                    delay = self.env.time_count * self.env.duration + (self.env.duration - iot_comp_time_remain) - \
+                        get_task['time'] * self.env.duration
+                    self.env.process_delay[get_task['time'], iot_index] = delay
+                    if self.env.task_log is not None:
+                        self._log_tasks(get_task['time'], iot_index, -1, get_task['size'], 0.0, 0.0, delay)
                 else:
                     get_task['remain'] -= iot_comp_time_remain * iot_comp_cap / iot_comp_density
+                    self.queue_iot_comp_remain[iot_index] -= iot_comp_time_remain * iot_comp_cap / iot_comp_density
                     iot_comp_time_remain = 0
                     self.env.Queue_iot_comp[iot_index].appendleft(get_task)
 
+            if len(self.env.Queue_iot_comp[iot_index]) == 0:
+                self.queue_iot_comp_remain[iot_index] = 0
+
+    @timed('iot_tran')
     def process_iot_tran_queue(self):
+        if self.env.queue_engine == 'array':
+            self._process_iot_tran_array()
+            return
+
         for iot_index in range(self.env.n_iot):
             for edge_index in range(self.env.n_edge):
                 iot_tran_cap = self.env.tran_cap_iot[iot_index, edge_index]
@@ -64,31 +120,170 @@ class Operate:
 
                     if iot_tran_time_remain >= get_task['remain'] / iot_tran_cap:
                         iot_tran_time_remain -= get_task['remain'] / iot_tran_cap
+                        self.queue_iot_tran_remain[iot_index, edge_index] -= get_task['remain']
+                        self.n_event += 1
 
-                        tmp_dict = {'iot': iot_index, 'time': get_task['time'],
-                                    'size': get_task['size'], 'remain': get_task['size']}
+                        trans_delay = self.env.time_count * self.env.duration + \
+                            (self.env.duration - iot_tran_time_remain) - get_task['time'] * self.env.duration
+                        tmp_dict = {'iot': iot_index, 'time': get_task['time'], 'size': get_task['size'],
+                                    'remain': get_task['size'], 'trans': trans_delay, 'deploy': 0.0}
                         self.env.Queue_edge_wait[iot_index][edge_index].append(tmp_dict)
 
-                        self.env.process_delay_trans[get_task['time'], iot_index] \
-                            = self.env.time_count * self.env.duration + (self.env.duration - iot_tran_time_remain) - \
-                            get_task['time'] * self.env.duration
+                        self.env.process_delay_trans[get_task['time'], iot_index] = trans_delay
 
                     else:
                         get_task['remain'] -= iot_tran_time_remain * iot_tran_cap
+                        self.queue_iot_tran_remain[iot_index, edge_index] -= iot_tran_time_remain * iot_tran_cap
                         iot_tran_time_remain = 0
                         self.env.Queue_iot_tran[iot_index][edge_index].appendleft(get_task)
 
+                if len(self.env.Queue_iot_tran[iot_index][edge_index]) == 0:
+                    self.queue_iot_tran_remain[iot_index, edge_index] = 0
+
+    def _process_iot_comp_array(self):
+        iot_index, task_time, task_size, elapsed = self.env.Queue_iot_comp.drain(
+            self.env.duration, cap=self.env.comp_cap_iot, density=self.env.comp_density)
+        self.n_event += iot_index.size
+        self.n_pending -= iot_index.size
+        delay = self.env.time_count * self.env.duration + elapsed - task_time * self.env.duration
+        self.env.process_delay[task_time, iot_index] = delay
+        if self.env.task_log is not None and iot_index.size > 0:
+            self._log_tasks(task_time, iot_index, -1, task_size, 0.0, 0.0, delay)
+
+    def _process_iot_tran_array(self):
+        lane, task_time, task_size, elapsed = self.env.Queue_iot_tran.drain(
+            self.env.duration, cap=self.env.tran_cap_iot.reshape(-1))
+        self.n_event += lane.size
+        iot_index, edge_index = np.divmod(lane, self.env.n_edge)
+        trans_delay = self.env.time_count * self.env.duration + elapsed - task_time * self.env.duration
+        self.env.process_delay_trans[task_time, iot_index] = trans_delay
+
+        for n in range(lane.size):
+            tmp_dict = {'iot': int(iot_index[n]), 'time': int(task_time[n]), 'size': task_size[n],
+                        'remain': task_size[n], 'trans': trans_delay[n], 'deploy': 0.0}
+            self.env.Queue_edge_wait[iot_index[n]][edge_index[n]].append(tmp_dict)
+
+    def queue_empty(self):
+        return self.n_pending == 0
+
+    def count_pending(self):
+        # TASKS IN ALL QUEUES (FULL RESCAN, n_pending is kept up to date as tasks are put in and finished)
+        if self.env.queue_engine == 'array':
+            n_pending = len(self.env.Queue_iot_comp) + len(self.env.Queue_iot_tran)
+        else:
+            n_pending = sum(len(queue) for queue in self.env.Queue_iot_comp) + \
+                sum(len(queue) for queues in self.env.Queue_iot_tran for queue in queues)
+        n_pending += sum(len(queue) for queues in self.env.Queue_edge_wait for queue in queues)
+        return n_pending + sum(len(queue) for queue in self.env.Queue_edge_comp)
+
+    def queue_lengths(self):
+        lengths = [len(self.env.Queue_edge_comp[edge_index]) for edge_index in range(self.env.n_edge)]
+        lengths += [len(queue) for queues in self.env.Queue_edge_wait for queue in queues]
+        if self.env.queue_engine == 'array':
+            lengths += list(self.env.Queue_iot_comp.count) + list(self.env.Queue_iot_tran.count)
+        else:
+            lengths += [len(queue) for queue in self.env.Queue_iot_comp]
+            lengths += [len(queue) for queues in self.env.Queue_iot_tran for queue in queues]
+
+        return np.array(lengths, np.int64)
+
+    def event_count(self):
+        # TASKS FINISHED OR MOVED AND CACHE ENTRIES CHANGED SO FAR
+        return self.n_event + sum(len(cache.changes) for cache in self.env.edge_server_cache)
+
+    def snapshot_progress(self):
+        """State before a slot: the event count and the remaining work of every queue head.
+
+        In a slot without events only heads are served (FIFO lanes, serial edges), so the heads' progress over one
+        such slot gives every queue's next completion.
+        """
+        heads = [(edge_index, queue[0]) for edge_index, queue in enumerate(self.env.Queue_edge_comp) if len(queue) > 0]
+        lanes = list()
+        if self.env.queue_engine == 'array':
+            for queue in (self.env.Queue_iot_comp, self.env.Queue_iot_tran):
+                lane = np.flatnonzero(queue.count > 0)
+                lanes.append((queue, lane, queue.head[lane], queue.remain[lane, queue.head[lane]]))
+        else:
+            heads += [(None, queue[0]) for queue in self.env.Queue_iot_comp if len(queue) > 0]
+            heads += [(None, queue[0]) for queues in self.env.Queue_iot_tran for queue in queues if len(queue) > 0]
+
+        return {'event': self.event_count(), 'head': heads,
+                'remain': np.array([task['remain'] for _, task in heads], np.float64), 'lane': lanes,
+                'aggregate': [self.queue_iot_comp_remain.copy(), self.queue_iot_tran_remain.copy(),
+                              self.queue_fog_comp_remain.copy()]}
+
+    def skip_steady_slots(self, before):
+        """Repeat the slot processed since snapshot_progress() as long as it provably changes nothing but remains.
+
+        The slot is steady when no task finished or moved and no cache entry changed, so every following slot serves
+        the same amounts until the earliest next completion of a queue head. Returns the number of skipped slots.
+        """
+        if self.event_count() != before['event']:
+            return 0
+
+        remain = np.array([task['remain'] for _, task in before['head']], np.float64)
+        served = [before['remain'] - remain]
+        left = [remain]
+        for queue, lane, head, old in before['lane']:
+            new = queue.remain[lane, head]
+            served.append(old - new)
+            left.append(new)
+        served, left = np.concatenate(served), np.concatenate(left)
+        progress = served > 0
+        if not progress.any():
+            return 0
+
+        # KEEP ONE SPARE SLOT BEFORE THE EARLIEST COMPLETION
+        n_slot = int(np.ceil(left[progress] / served[progress]).min()) - 2
+        if n_slot <= 0:
+            return 0
+
+        hit = [set() for _ in range(self.env.n_edge)]
+        for n, (edge_index, task) in enumerate(before['head']):
+            if progress[n]:
+                task['remain'] -= n_slot * served[n]
+                if edge_index is not None:
+                    hit[edge_index].add(task['iot'])
+        for queue, lane, head, old in before['lane']:
+            queue.remain[lane, head] -= n_slot * (old - queue.remain[lane, head])
+        for old, new in zip(before['aggregate'], [self.queue_iot_comp_remain, self.queue_iot_tran_remain,
+                                                  self.queue_fog_comp_remain]):
+            new -= n_slot * (old - new)
+
+        # CONTAINERS IN USE ARE HIT ONCE PER SLOT
+        for edge_index in range(self.env.n_edge):
+            for iot_index in hit[edge_index]:
+                self.env.edge_server_cache[edge_index].container_policy.hit(iot_index, n=n_slot)
+
+        self.env.time_count += n_slot
+
+        return n_slot
+
     def put_task_into_edge_comp_in_circle(self, edge_index):
-        for iot_index in range(self.env.n_iot):
-            while len(self.env.Queue_edge_wait[iot_index][edge_index]) > 0:
-                get_task = self.env.Queue_edge_wait[iot_index][edge_index].popleft()
-                self.env.Queue_edge_comp[edge_index].append(get_task)
+        self.put_task_into_edge_comp_in_order(edge_index, order=range(self.env.n_iot))
 
     def put_task_into_edge_comp_in_order(self, edge_index, order):
         for iot_index in order:
             while len(self.env.Queue_edge_wait[iot_index][edge_index]) > 0:
                 get_task = self.env.Queue_edge_wait[iot_index][edge_index].popleft()
                 self.env.Queue_edge_comp[edge_index].append(get_task)
+                self.queue_fog_comp_remain[iot_index, edge_index] += get_task['remain']
+                self.queue_fog_comp_count[iot_index, edge_index] += 1
+                self.n_event += 1
+
+    def _finish_edge_task(self, edge_index, get_task):
+        iot_index = get_task['iot']
+        self.n_event += 1
+        self.n_pending -= 1
+        self.queue_fog_comp_count[iot_index, edge_index] -= 1
+        if self.queue_fog_comp_count[iot_index, edge_index] == 0:
+            self.queue_fog_comp_remain[iot_index, edge_index] = 0
+        else:
+            self.queue_fog_comp_remain[iot_index, edge_index] -= get_task['remain']
+
+    def _serve_edge_task(self, edge_index, get_task, served):
+        get_task['remain'] -= served
+        self.queue_fog_comp_remain[get_task['iot'], edge_index] -= served
 
     def process_edge_comp_without_caching(self, edge_index):
         edge_time_remain = self.env.duration
@@ -122,91 +317,117 @@ class Operate:
 
             iot_index = get_task['iot']
             iot_comp_density = self.env.comp_density[iot_index]
-            edge_time_remain -= self.env.edge_server_cache[edge_index].dep_container(container_index=iot_index)
+            deploy_time = self.env.edge_server_cache[edge_index].dep_container(container_index=iot_index)
+            edge_time_remain -= deploy_time
+            get_task['deploy'] += deploy_time
 
             if self.env.edge_server_cache[edge_index].has_container(container_index=iot_index):
                 if edge_time_remain * comp_cap_edge / iot_comp_density >= get_task['remain']:
                     edge_time_remain -= get_task['remain'] * iot_comp_density / comp_cap_edge
-                    self.env.process_delay[get_task['time'], iot_index] = self.env.time_count * self.env.duration + \
-                        (self.env.duration - edge_time_remain) - get_task['time'] * self.env.duration
+                    self._finish_edge_task(edge_index, get_task)
+                    delay = self.env.time_count * self.env.duration + (self.env.duration - edge_time_remain) - \
+                        get_task['time'] * self.env.duration
+                    self.env.process_delay[get_task['time'], iot_index] = delay
+                    if self.env.task_log is not None:
+                        self._log_edge_task(edge_index, get_task, delay)
 
                 elif edge_time_remain * comp_cap_edge / iot_comp_density < get_task['remain']:
-                    get_task['remain'] -= edge_time_remain * comp_cap_edge / iot_comp_density
+                    self._serve_edge_task(edge_index, get_task, edge_time_remain * comp_cap_edge / iot_comp_density)
                     edge_time_remain = 0
                     self.env.Queue_edge_comp[edge_index].appendleft(get_task)
 
             else:
                 self.env.Queue_edge_comp[edge_index].appendleft(get_task)
 
-    def _activated_comp_task(self, edge_index):
-        activated_queues = {}
-        for task in self.env.Queue_edge_comp[edge_index]:
-            if task['remain'] > 0:
-                activated_queues[task['iot']] = activated_queues.get(task['iot'], 0) + task['remain']
-
-        return activated_queues
-
     def _process_edge_comp_in_concurrent(self, edge_time_remain, edge_index):
-        activated_queues = self._activated_comp_task(edge_index)
-        for iot_index in activated_queues.keys():
-            edge_time_remain -= self.env.edge_server_cache[edge_index].dep_container(container_index=iot_index)
-
-        while edge_time_remain > 0 and len(activated_queues) > 0:
-            comp_cap_edge = self.env.comp_cap_edge[edge_index] / len(activated_queues)
-            min_remain_index = min(activated_queues, key=activated_queues.get)
-            min_remain_time = activated_queues[min_remain_index] * self.env.comp_density[min_remain_index] / comp_cap_edge
-
-            for iot_index, remain_task in activated_queues.items():
-                remain_time = min_remain_time.copy()
-
-                while remain_task > 0 and remain_time > 0:
-                    get_task = next((task for task in self.env.Queue_edge_comp[edge_index] if task['iot'] == iot_index), None)
-                    iot_comp_density = self.env.comp_density[iot_index]
-                    if remain_time * comp_cap_edge / iot_comp_density >= get_task['remain']:
-                        remain_task -= get_task['remain']
-                        remain_time -= get_task['remain'] * iot_comp_density / comp_cap_edge
-                        self.env.process_delay[get_task['time'], iot_index] = \
-                            self.env.time_count * self.env.duration + (self.env.duration - edge_time_remain) \
-                            + (min_remain_time - remain_time) - get_task['time'] * self.env.duration
-                        try:
-                            self.env.Queue_edge_comp[edge_index].remove(get_task)
-                        except ValueError:
-                            print(f"Element {get_task} not found in deque.")
-                    else:
-                        get_task['remain'] -= remain_time * comp_cap_edge / iot_comp_density
-                        remain_time = 0
-
-            edge_time_remain -= min_remain_time
-            activated_queues = self._activated_comp_task(edge_index)
-
+        tasks = [task for task in self.env.Queue_edge_comp[edge_index] if task['remain'] > 0]
+
+        # DEPLOY ONCE PER DEVICE, CHARGED TO ITS FIRST TASK
+        first_task = dict()
+        for task in tasks:
+            first_task.setdefault(task['iot'], task)
+        for iot_index, task in first_task.items():
+            deploy_time = self.env.edge_server_cache[edge_index].dep_container(container_index=iot_index)
+            edge_time_remain -= deploy_time
+            task['deploy'] += deploy_time
+
+        if edge_time_remain <= 0 or len(tasks) == 0:
+            return
+
+        done, finish_time, remain_new = processor_sharing(
+            device=np.array([task['iot'] for task in tasks]), remain=np.array([task['remain'] for task in tasks]),
+            density=self.env.comp_density, comp_cap=self.env.comp_cap_edge[edge_index], time_budget=edge_time_remain)
+
+        finished = set()
+        for n, get_task in enumerate(tasks):
+            if done[n]:
+                self._finish_edge_task(edge_index, get_task)
+                delay = self.env.time_count * self.env.duration + (self.env.duration - edge_time_remain) \
+                    + finish_time[n] - get_task['time'] * self.env.duration
+                self.env.process_delay[get_task['time'], get_task['iot']] = delay
+                if self.env.task_log is not None:
+                    self._log_edge_task(edge_index, get_task, delay)
+                finished.add(id(get_task))
+            elif remain_new[n] != get_task['remain']:
+                self._serve_edge_task(edge_index, get_task, get_task['remain'] - remain_new[n])
+
+        self.env.Queue_edge_comp[edge_index] = deque(
+            task for task in self.env.Queue_edge_comp[edge_index] if id(task) not in finished)
+
+    def _log_tasks(self, task_time, iot_index, edge_index, size, trans, deploy, delay):
+        # COMPUTE DELAY OF THE TASK ALONE ON ITS DEVICE (edge_index = -1) OR EDGE
+        iot_index, edge_index = np.asarray(iot_index), np.asarray(edge_index)
+        comp_cap = np.where(edge_index < 0, self.env.comp_cap_iot[iot_index], self.env.comp_cap_edge[edge_index])
+        self.env.task_log.append(time=task_time, iot=iot_index, edge=edge_index, trans=trans, deploy=deploy,
+                                 comp=size * self.env.comp_density[iot_index] / comp_cap, delay=delay)
+
+    def _log_edge_task(self, edge_index, task, delay):
+        self._log_tasks(task['time'], task['iot'], edge_index, task['size'], task['trans'], task['deploy'], delay)
+
+    @timed('update_info')
     def update_info_for_opt(self):
-        # INFO FOT OPTIMIZATION
-        self.queue_iot_comp_remain: np.ndarray = np.zeros(self.env.n_iot)
-        self.queue_iot_tran_remain: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
+        # QUEUE AGGREGATES ARE KEPT UP TO DATE AS TASKS MOVE, ONLY CACHE CHANGES ARE APPLIED HERE
+        for edge_index in range(self.env.n_edge):
+            for kind, index, cached in self.env.edge_server_cache[edge_index].drain_changes():
+                if kind == 'container':
+                    self.y_pre[index, edge_index] = cached
+                else:
+                    self.z_pre[index, edge_index] = cached
+
+    def rebuild_info_for_opt(self):
+        # INFO FOT OPTIMIZATION (FULL RESCAN)
         self.queue_fog_comp_remain: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
+        self.queue_fog_comp_count: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge], np.int64)
+        self.n_pending = self.count_pending()
 
-        for iot_index in range(self.env.n_iot):
-            for iot_comp_task in self.env.Queue_iot_comp[iot_index]:
-                self.queue_iot_comp_remain[iot_index] += iot_comp_task['remain']
+        if self.env.queue_engine == 'array':
+            # LIVE VIEWS ON THE LANE TOTALS
+            self.queue_iot_comp_remain = self.env.Queue_iot_comp.lane_remain()
+            self.queue_iot_tran_remain = self.env.Queue_iot_tran.lane_remain().reshape([self.env.n_iot, self.env.n_edge])
+        else:
+            self.queue_iot_comp_remain: np.ndarray = np.zeros(self.env.n_iot)
+            self.queue_iot_tran_remain: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
 
-            for edge_index in range(self.env.n_edge):
-                for iot_tran_task in self.env.Queue_iot_tran[iot_index][edge_index]:
-                    self.queue_iot_tran_remain[iot_index, edge_index] += iot_tran_task['remain']
+            for iot_index in range(self.env.n_iot):
+                for iot_comp_task in self.env.Queue_iot_comp[iot_index]:
+                    self.queue_iot_comp_remain[iot_index] += iot_comp_task['remain']
+
+                for edge_index in range(self.env.n_edge):
+                    for iot_tran_task in self.env.Queue_iot_tran[iot_index][edge_index]:
+                        self.queue_iot_tran_remain[iot_index, edge_index] += iot_tran_task['remain']
 
         for edge_index in range(self.env.n_edge):
             for edge_comp_task in self.env.Queue_edge_comp[edge_index]:
                 self.queue_fog_comp_remain[edge_comp_task['iot'], edge_index] += edge_comp_task['remain']
+                self.queue_fog_comp_count[edge_comp_task['iot'], edge_index] += 1
 
         self.y_pre: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
         self.z_pre: np.ndarray = np.zeros([self.env.n_iot, self.env.n_edge])
 
-        for iot_index in range(self.env.n_iot):
-            for edge_index in range(self.env.n_edge):
+        for edge_index in range(self.env.n_edge):
+            self.env.edge_server_cache[edge_index].drain_changes()
+            for iot_index in range(self.env.n_iot):
                 if self.env.edge_server_cache[edge_index].has_container(container_index=iot_index):
                     self.y_pre[iot_index, edge_index] = 1
-                else:
-                    self.y_pre[iot_index, edge_index] = 0
                 if self.env.edge_server_cache[edge_index].has_image(image_index=iot_index):
                     self.z_pre[iot_index, edge_index] = 1
-                else:
-                    self.z_pre[iot_index, edge_index] = 0
@@ -0,0 +1,38 @@
+import numpy as np
+
+
+def processor_sharing(device, remain, density, comp_cap, time_budget):
+    """Serve tasks with comp_cap shared equally among devices, each device running its own tasks in FIFO order.
+
+    Time advances from one device completion to the next while time_budget is left (the step that crosses it is
+    finished). Returns the finish mask, the finish time since the start and the new remain of every task.
+    """
+    cycles = remain * density[device]
+
+    # FINISH TAGS: CUMULATIVE CYCLES OF EACH DEVICE'S SUBQUEUE
+    order = np.argsort(device, kind='stable')
+    sorted_device = device[order]
+    first = np.r_[True, sorted_device[1:] != sorted_device[:-1]]
+    last = np.r_[sorted_device[1:] != sorted_device[:-1], True]
+    cum = np.cumsum(cycles[order])
+    base = np.maximum.accumulate(np.where(first, cum - cycles[order], 0))
+    tag = np.empty_like(cycles)
+    tag[order] = cum - base
+
+    # COMPLETION EVENTS: ACTIVE DEVICES DROP BY ONE AT EVERY DEVICE FINISH TAG
+    level, count = np.unique(tag[order][last], return_counts=True)
+    n_share = count.sum() - np.r_[0, np.cumsum(count)[:-1]]
+    clock = np.cumsum(np.diff(level, prepend=0) * n_share / comp_cap)
+    n_step = min(int(np.searchsorted(clock, time_budget, side='left')) + 1, level.size)
+    tag_end = level[n_step - 1]
+
+    done = tag <= tag_end
+    segment = np.searchsorted(level, tag, side='left')
+    segment_clock = np.r_[0, clock][np.minimum(segment, level.size)]
+    segment_level = np.r_[0, level][np.minimum(segment, level.size)]
+    finish_time = segment_clock + (tag - segment_level) * n_share[np.minimum(segment, level.size - 1)] / comp_cap
+
+    started = tag - cycles < tag_end
+    remain_new = np.where(~done & started, (tag - tag_end) / density[device], remain)
+
+    return done, np.where(done, finish_time, np.inf), remain_new
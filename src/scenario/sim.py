@@ -1,47 +1,58 @@
+import copy
 import numpy as np
-from collections import deque
 
 from src.scenario.operate import Operate
+from src.scenario.snapshot import SimState, take_snapshot, restore_snapshot, fork_operate
+from src.scenario.stream import ArrivalStream
+from src.tools.instrument import INSTRUMENT
 
 
 class Sim:
     def __init__(self, num_iot, num_edge, num_time, duration, task_arrive_prob, max_bit_arrive, min_bit_arrive,
                  comp_cap_iot, comp_cap_edge, tran_cap_iot, comp_density, container_size, container_startup,
                  container_delete, image_size, image_delete, edge_container_cache_limit, edge_image_cache_limit,
-                 edge_download_speed):
+                 edge_download_speed, queue_engine='deque', cache_policy='random', delay_path=None):
         self.operate = Operate(num_iot, num_edge, num_time, duration, task_arrive_prob, max_bit_arrive, min_bit_arrive,
                                comp_cap_iot, comp_cap_edge, tran_cap_iot, comp_density, container_size, container_startup,
                                container_delete, image_size, image_delete, edge_container_cache_limit,
-                               edge_image_cache_limit, edge_download_speed)
+                               edge_image_cache_limit, edge_download_speed, queue_engine, cache_policy, delay_path)
+
+        # DRAIN WITHOUT NEW ARRIVALS BY JUMPING OVER STEADY SLOTS
+        self.is_event_driven = False
 
     def reset(self, bit_arrive):
+        # dense matrix, or a memory-mapped array / iterable of per-slot rows read one window at a time
+        if isinstance(bit_arrive, np.memmap) or not isinstance(bit_arrive, np.ndarray):
+            bit_arrive = ArrivalStream(bit_arrive, n_iot=self.operate.env.n_iot)
         self.operate.env.bit_arrive = bit_arrive
 
         # TIME COUNT
         self.operate.env.time_count = int(0)
 
-        self.operate.env.Queue_iot_comp = list()
-        self.operate.env.Queue_iot_tran = list()
-        self.operate.env.Queue_edge_wait = list()
-        self.operate.env.Queue_edge_comp = list()
-
-        for iot in range(self.operate.env.n_iot):
-            self.operate.env.Queue_iot_comp.append(deque())
-            self.operate.env.Queue_iot_tran.append(list())
-            self.operate.env.Queue_edge_wait.append(list())
-            for edge in range(self.operate.env.n_edge):
-                self.operate.env.Queue_iot_tran[iot].append(deque())
-                self.operate.env.Queue_edge_wait[iot].append(deque())
-        for edge in range(self.operate.env.n_edge):
-            self.operate.env.Queue_edge_comp.append(deque())
+        self.operate.env.init_queues()
 
         # TASK DELAY
-        self.operate.env.process_delay = np.zeros([self.operate.env.n_time, self.operate.env.n_iot])
-        self.operate.env.process_delay_trans = np.zeros([self.operate.env.n_time, self.operate.env.n_iot])
+        self.operate.env.init_delays()
 
-        self.operate.update_info_for_opt()
+        self.operate.rebuild_info_for_opt()
+
+    def snapshot(self) -> SimState:
+        return take_snapshot(self.operate)
+
+    def restore(self, state: SimState):
+        restore_snapshot(self.operate, state)
+
+    def fork(self, state: SimState = None):
+        # A Sim ON THE SAME CONSTANTS AND ARRIVALS AT state (default: the current one), stepped independently
+        sim = copy.copy(self)
+        sim.operate = fork_operate(self.operate, self.snapshot() if state is None else state)
+        return sim
 
     def _find_task_order(self, k):
+        # TASK ORDER GIVEN DIRECTLY (GreedyModel with dense_schedule = False)
+        if np.ndim(k) == 1:
+            return [int(i) for i in k]
+
         # Step 1: Compute the in-degree of each node
         in_degree = [int(sum(k[ii, i] for ii in range(self.operate.env.n_iot))) for i in range(self.operate.env.n_iot)]
 
@@ -62,22 +73,25 @@ class Sim:
         self.operate.process_iot_tran_queue()
 
         # PROCESS EDGE
-        for edge_index in range(self.operate.env.n_edge):
-            if schedule is None:
-                self.operate.put_task_into_edge_comp_in_circle(edge_index=edge_index)
-            else:
-                task_order = self._find_task_order(schedule[edge_index])
-                self.operate.put_task_into_edge_comp_in_order(edge_index=edge_index, order=task_order)
-
-            if container_cache is None or image_cache is None:
-                self.operate.process_edge_comp_without_caching(edge_index)
-            else:
-                self.operate.process_edge_comp_with_caching(edge_index, container_cache, image_cache)
+        with INSTRUMENT.phase('edge'):
+            for edge_index in range(self.operate.env.n_edge):
+                if schedule is None:
+                    self.operate.put_task_into_edge_comp_in_circle(edge_index=edge_index)
+                else:
+                    task_order = self._find_task_order(schedule[edge_index])
+                    self.operate.put_task_into_edge_comp_in_order(edge_index=edge_index, order=task_order)
+
+                if container_cache is None or image_cache is None:
+                    self.operate.process_edge_comp_without_caching(edge_index)
+                else:
+                    self.operate.process_edge_comp_with_caching(edge_index, container_cache, image_cache)
 
         # TIME UPDATE
         self.operate.env.time_count += 1
 
     def step(self, offload=None, schedule=None, container_cache=None, image_cache=None):
+        slot = self.operate.env.time_count
+
         # GET OFFLOAD ACTIONS
         iot_action_local: np.ndarray = np.zeros([self.operate.env.n_iot], np.int32)
         iot_action_edge: np.ndarray = np.zeros([self.operate.env.n_iot], np.int32)
@@ -88,39 +102,45 @@ class Sim:
                 iot_action_local[iot_index] = 1
 
         # PUT TASKS INTO IOT QUEUE
-        for iot_index in range(self.operate.env.n_iot):
-            if self.operate.env.bit_arrive[self.operate.env.time_count, iot_index] != 0:
-                if iot_action_local[iot_index] == 1:
-                    self.operate.put_task_into_iot_comp(iot_index=iot_index)
-                else:
-                    self.operate.put_task_into_iot_trans(iot_index=iot_index, edge_index=iot_action_edge[iot_index])
+        if self.operate.env.queue_engine == 'array':
+            arrive = self.operate.env.bit_arrive[self.operate.env.time_count] != 0
+            local = np.flatnonzero(arrive & (iot_action_local == 1))
+            edge = np.flatnonzero(arrive & (iot_action_local == 0))
+            self.operate.put_tasks_into_iot_comp(iot_indices=local)
+            self.operate.put_tasks_into_iot_trans(iot_indices=edge, edge_indices=iot_action_edge[edge])
+        else:
+            for iot_index in range(self.operate.env.n_iot):
+                if self.operate.env.bit_arrive[self.operate.env.time_count, iot_index] != 0:
+                    if iot_action_local[iot_index] == 1:
+                        self.operate.put_task_into_iot_comp(iot_index=iot_index)
+                    else:
+                        self.operate.put_task_into_iot_trans(iot_index=iot_index,
+                                                             edge_index=iot_action_edge[iot_index])
 
         self._process_env(schedule, container_cache, image_cache)
 
         done = False
         if self.operate.env.time_count >= self.operate.env.n_time:
+            # HEADS ARE ONLY SNAPSHOT AFTER A SLOT WITHOUT EVENTS (concurrent edges finish a task every slot)
+            is_steady = False
             while not done:
-                queue_empty = True
-                for iot_index in range(self.operate.env.n_iot):
-                    if len(self.operate.env.Queue_iot_comp[iot_index]) > 0:
-                        queue_empty = False
-                        break
-                    for edge_index in range(self.operate.env.n_edge):
-                        if len(self.operate.env.Queue_iot_tran[iot_index][edge_index]) > 0 \
-                                or len(self.operate.env.Queue_edge_wait[iot_index][edge_index]) > 0:
-                            queue_empty = False
-                            break
-
-                for edge_index in range(self.operate.env.n_edge):
-                    if len(self.operate.env.Queue_edge_comp[edge_index]) > 0:
-                        queue_empty = False
-                        break
-
-                if queue_empty:
+                if self.operate.queue_empty():
                     done = True
+                elif self.is_event_driven and is_steady:
+                    before = self.operate.snapshot_progress()
+                    self._process_env(schedule, container_cache, image_cache)
+                    self.operate.skip_steady_slots(before)
+                    is_steady = self.operate.event_count() == before['event']
                 else:
+                    n_event = self.operate.event_count() if self.is_event_driven else None
                     self._process_env(schedule, container_cache, image_cache)
+                    is_steady = self.is_event_driven and self.operate.event_count() == n_event
 
         self.operate.update_info_for_opt()
 
+        if done:
+            self.operate.env.close_delays()
+
+        INSTRUMENT.end_slot(slot)
+
         return done
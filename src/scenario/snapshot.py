@@ -0,0 +1,168 @@
+import copy
+import json
+import numpy as np
+from collections import deque
+
+from src.scenario.operate import Operate
+
+# TASK TABLES: one row per queued task, lane columns first, rows in queue order
+IOT_COMP_COLUMNS = ('iot', 'time', 'size', 'remain')
+IOT_TRAN_COLUMNS = ('iot', 'edge', 'time', 'size', 'remain')
+EDGE_WAIT_COLUMNS = ('iot', 'edge', 'time', 'size', 'remain', 'trans', 'deploy')
+EDGE_COMP_COLUMNS = ('edge', 'iot', 'time', 'size', 'remain', 'trans', 'deploy')
+INT_COLUMNS = ('iot', 'edge', 'time')
+
+
+class SimState:
+    """Simulation state of an Operate as flat NumPy arrays: task queues, edge caches with their policies and change
+    logs, time_count, delay matrices and the optimization aggregates.
+
+    Constants and arrivals are not part of it (a fork shares them), nor is the global random state.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.groups = dict()
+
+    def group(self, prefix):
+        # arrays named prefix.key as {key: array}, split once per state
+        if prefix not in self.groups:
+            self.groups[prefix] = {name[len(prefix) + 1:]: values for name, values in self.arrays.items()
+                                   if name.startswith(prefix + '.')}
+        return self.groups[prefix]
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.arrays.values())
+
+    def to_bytes(self):
+        # HEADER LENGTH, JSON HEADER (name, dtype, shape), THEN THE RAW ARRAY DATA BACK TO BACK
+        header = json.dumps([(name, values.dtype.str, values.shape) for name, values in self.arrays.items()]).encode()
+        return b''.join([len(header).to_bytes(8, 'little'), header] +
+                        [np.ascontiguousarray(values).tobytes() for values in self.arrays.values()])
+
+    @classmethod
+    def from_bytes(cls, data):
+        # arrays are read-only views on data (restore_snapshot copies them)
+        n_header = int.from_bytes(data[:8], 'little')
+        offset = 8 + n_header
+        arrays = dict()
+        for name, dtype, shape in json.loads(data[8:offset]):
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
+            arrays[name] = np.frombuffer(data, dtype, count=count, offset=offset).reshape(shape)
+            offset += count * dtype.itemsize
+        return cls(arrays)
+
+
+def _table(rows, columns):
+    return np.array(rows, np.float64).reshape([-1, len(columns)])
+
+
+def _edge_row(task):
+    return [task['time'], task['size'], task['remain'], task['trans'], task['deploy']]
+
+
+def _rows(table, columns):
+    # TABLE BACK TO TASK DICTS (lane columns and time as int)
+    for row in table.tolist():
+        task = dict(zip(columns, row))
+        for column in INT_COLUMNS:
+            if column in task:
+                task[column] = int(task[column])
+        yield task
+
+
+def take_snapshot(operate: Operate):
+    env = operate.env
+    if not isinstance(env.process_delay, np.ndarray) or env.task_log is not None:
+        raise ValueError(f"Snapshots need dense delay matrices and no task log, delay_path is {env.delay_path}.")
+
+    arrays = {'time_count': np.array(env.time_count, np.int64),
+              'process_delay': env.process_delay.copy(), 'process_delay_trans': env.process_delay_trans.copy(),
+              'queue_fog_comp_remain': operate.queue_fog_comp_remain.copy(),
+              'queue_fog_comp_count': operate.queue_fog_comp_count.copy(),
+              'y_pre': operate.y_pre.copy(), 'z_pre': operate.z_pre.copy()}
+
+    # EDGE QUEUES
+    arrays['edge_wait'] = _table([[iot_index, edge_index] + _edge_row(task)
+                                  for iot_index in range(env.n_iot) for edge_index in range(env.n_edge)
+                                  for task in env.Queue_edge_wait[iot_index][edge_index]], EDGE_WAIT_COLUMNS)
+    arrays['edge_comp'] = _table([[edge_index, task['iot']] + _edge_row(task)
+                                  for edge_index in range(env.n_edge) for task in env.Queue_edge_comp[edge_index]],
+                                 EDGE_COMP_COLUMNS)
+
+    # IOT QUEUES
+    if env.queue_engine == 'array':
+        for name, queue in (('iot_comp', env.Queue_iot_comp), ('iot_tran', env.Queue_iot_tran)):
+            arrays.update({f'{name}.{column}': values for column, values in queue.get_state().items()})
+    else:
+        arrays['iot_comp'] = _table([[iot_index, task['time'], task['size'], task['remain']]
+                                     for iot_index in range(env.n_iot) for task in env.Queue_iot_comp[iot_index]],
+                                    IOT_COMP_COLUMNS)
+        arrays['iot_tran'] = _table([[iot_index, edge_index, task['time'], task['size'], task['remain']]
+                                     for iot_index in range(env.n_iot) for edge_index in range(env.n_edge)
+                                     for task in env.Queue_iot_tran[iot_index][edge_index]], IOT_TRAN_COLUMNS)
+        arrays['queue_iot_comp_remain'] = operate.queue_iot_comp_remain.copy()
+        arrays['queue_iot_tran_remain'] = operate.queue_iot_tran_remain.copy()
+
+    # EDGE CACHES
+    for edge_index, cache in enumerate(env.edge_server_cache):
+        arrays.update({f'cache{edge_index}.{key}': values for key, values in cache.get_state().items()})
+
+    return SimState(arrays)
+
+
+def restore_snapshot(operate: Operate, state: SimState):
+    # every queue, cache dict, policy and array is rebuilt, nothing is shared with the state or the previous one
+    env, arrays = operate.env, state.arrays
+
+    env.time_count = int(arrays['time_count'])
+    env.process_delay = arrays['process_delay'].copy()
+    env.process_delay_trans = arrays['process_delay_trans'].copy()
+    operate.queue_fog_comp_remain = arrays['queue_fog_comp_remain'].copy()
+    operate.queue_fog_comp_count = arrays['queue_fog_comp_count'].copy()
+    operate.y_pre = arrays['y_pre'].copy()
+    operate.z_pre = arrays['z_pre'].copy()
+
+    # EDGE QUEUES
+    env.Queue_edge_wait = [[deque() for _ in range(env.n_edge)] for _ in range(env.n_iot)]
+    env.Queue_edge_comp = [deque() for _ in range(env.n_edge)]
+    for task in _rows(arrays['edge_wait'], EDGE_WAIT_COLUMNS):
+        env.Queue_edge_wait[task['iot']][task.pop('edge')].append(task)
+    for task in _rows(arrays['edge_comp'], EDGE_COMP_COLUMNS):
+        env.Queue_edge_comp[task.pop('edge')].append(task)
+
+    # IOT QUEUES
+    if env.queue_engine == 'array':
+        for name in ('iot_comp', 'iot_tran'):
+            queue = copy.copy(getattr(env, f'Queue_{name}'))
+            queue.set_state(state.group(name))
+            setattr(env, f'Queue_{name}', queue)
+        # LIVE VIEWS ON THE LANE TOTALS
+        operate.queue_iot_comp_remain = env.Queue_iot_comp.lane_remain()
+        operate.queue_iot_tran_remain = env.Queue_iot_tran.lane_remain().reshape([env.n_iot, env.n_edge])
+    else:
+        env.Queue_iot_comp = [deque() for _ in range(env.n_iot)]
+        env.Queue_iot_tran = [[deque() for _ in range(env.n_edge)] for _ in range(env.n_iot)]
+        for task in _rows(arrays['iot_comp'], IOT_COMP_COLUMNS):
+            env.Queue_iot_comp[task.pop('iot')].append(task)
+        for task in _rows(arrays['iot_tran'], IOT_TRAN_COLUMNS):
+            env.Queue_iot_tran[task.pop('iot')][task['edge']].append(task)
+        operate.queue_iot_comp_remain = arrays['queue_iot_comp_remain'].copy()
+        operate.queue_iot_tran_remain = arrays['queue_iot_tran_remain'].copy()
+
+    operate.n_pending = operate.count_pending()
+
+    # EDGE CACHES
+    for edge_index, cache in enumerate(env.edge_server_cache):
+        cache.set_state(state.group(f'cache{edge_index}'))
+
+
+def fork_operate(operate: Operate, state: SimState):
+    # SHALLOW COPIES SHARE THE CONSTANTS, ARRIVALS AND CONTAINER/IMAGE SETS; restore_snapshot REPLACES THE REST
+    fork = copy.copy(operate)
+    fork.env = copy.copy(operate.env)
+    fork.env.edge_server_cache = [copy.copy(cache) for cache in operate.env.edge_server_cache]
+    restore_snapshot(fork, state)
+    return fork
@@ -0,0 +1,132 @@
+import os
+import numpy as np
+
+
+class ArrivalStream:
+    """Arrivals read one window of slots at a time, indexed like the dense n_time x n_iot bit_arrive matrix.
+
+    source is an array on disk (np.memmap or np.load(..., mmap_mode='r')) or an iterable of per-slot rows. Slots are
+    read in increasing order; a window is dropped once the simulation has moved past it.
+    """
+
+    def __init__(self, source, n_iot, window=1024):
+        self.n_iot = n_iot
+        self.window = window
+
+        if hasattr(source, 'shape') and hasattr(source, '__getitem__'):
+            self.array = source
+            self.rows = None
+        else:
+            self.array = None
+            self.rows = iter(source)
+
+        # CURRENT WINDOW: slots start .. start + len(block) - 1
+        self.start = 0
+        self.block = np.zeros([0, self.n_iot])
+
+    def _load(self, t):
+        if t < self.start:
+            raise ValueError(f"Arrival stream is past slot {t}, slots must be read in increasing order.")
+
+        if self.array is not None:
+            self.start = t
+            self.block = np.array(self.array[t:t + self.window], dtype=np.float64).reshape([-1, self.n_iot])
+        else:
+            # SKIP ROWS BEFORE t, THEN READ ONE WINDOW
+            for _ in range(t - self.start - len(self.block)):
+                next(self.rows, None)
+            self.start = t
+            rows = list()
+            for row in self.rows:
+                rows.append(np.asarray(row, dtype=np.float64).reshape(self.n_iot))
+                if len(rows) == self.window:
+                    break
+            self.block = np.array(rows).reshape([-1, self.n_iot])
+
+        if len(self.block) == 0:
+            raise ValueError(f"Arrival stream ended before slot {t}.")
+
+    def __getitem__(self, key):
+        t, index = key if isinstance(key, tuple) else (key, slice(None))
+        if not self.start <= t < self.start + len(self.block):
+            self._load(int(t))
+
+        return self.block[t - self.start][index]
+
+
+class RecordLog:
+    """Append-only typed records, written through a fixed buffer to path (kept in memory without a path)."""
+
+    def __init__(self, dtype, path=None, buffer_size=65536):
+        self.dtype = np.dtype(dtype)
+        self.path = path
+        self.file = open(path, 'wb') if path is not None else None
+        self.chunks = list()
+        self.buffer = np.zeros(buffer_size, self.dtype)
+        self.n_buffer = 0
+        self.n_record = 0
+
+    def __len__(self):
+        return self.n_record
+
+    def append(self, **fields):
+        # one array (or scalar) per field, broadcast to the same length
+        columns = np.broadcast_arrays(*(np.atleast_1d(fields[name]) for name in self.dtype.names))
+        size = columns[0].size
+        if self.n_buffer + size > self.buffer.size:
+            self.flush()
+
+        if size > self.buffer.size:
+            records = np.zeros(size, self.dtype)
+        else:
+            records = self.buffer[self.n_buffer:self.n_buffer + size]
+        for name, column in zip(self.dtype.names, columns):
+            records[name] = column
+        self.n_record += size
+
+        if size > self.buffer.size:
+            self._write(records)
+        else:
+            self.n_buffer += size
+
+    def _write(self, records):
+        if self.file is None:
+            self.chunks.append(records.copy())
+        else:
+            self.file.write(records.tobytes())
+
+    def flush(self):
+        if self.n_buffer > 0:
+            self._write(self.buffer[:self.n_buffer])
+        if self.file is not None:
+            self.file.flush()
+        self.n_buffer = 0
+
+    def close(self):
+        if self.file is None:
+            self.flush()
+        elif not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def read(self):
+        # ALL RECORDS SO FAR (mapped from disk with a path)
+        if self.file is None or not self.file.closed:
+            self.flush()
+        if self.file is None:
+            return np.concatenate(self.chunks) if len(self.chunks) > 0 else np.zeros(0, self.dtype)
+        if os.path.getsize(self.path) == 0:
+            return np.zeros(0, self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='r')
+
+
+class DelayLog(RecordLog):
+    """Append-only (time, iot, delay) records on disk in place of a dense n_time x n_iot delay matrix."""
+
+    def __init__(self, path, buffer_size=65536):
+        super().__init__(dtype=[('time', np.int64), ('iot', np.int64), ('delay', np.float64)], path=path,
+                         buffer_size=buffer_size)
+
+    def __setitem__(self, key, value):
+        task_time, iot_index = key
+        self.append(time=task_time, iot=iot_index, delay=value)
@@ -0,0 +1,93 @@
+import numpy as np
+
+from src.scenario.stream import RecordLog
+
+
+class QuantileSketch:
+    """Streaming quantiles with bounded relative error (log-spaced buckets, DDSketch style)."""
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-9):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.min_value = min_value
+        self.buckets = dict()
+        self.n_zero = 0
+        self.count = 0
+
+    def add(self, values):
+        values = np.atleast_1d(np.asarray(values, np.float64))
+        positive = values[values > self.min_value]
+        self.n_zero += values.size - positive.size
+        self.count += values.size
+
+        index, count = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        for key, n in zip(index.tolist(), count.tolist()):
+            self.buckets[key] = self.buckets.get(key, 0) + n
+
+    def quantile(self, q):
+        q = np.atleast_1d(np.asarray(q, np.float64))
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+
+        index = np.array(sorted(self.buckets), np.int64)
+        cum = self.n_zero + np.cumsum([self.buckets[key] for key in index.tolist()])
+        rank = q * (self.count - 1)
+        pick = np.searchsorted(cum, rank, side='right')
+        value = 2 * self.gamma ** index[np.minimum(pick, index.size - 1)] / (self.gamma + 1) if index.size > 0 \
+            else np.zeros(q.shape)
+
+        return np.where(rank < self.n_zero, 0.0, value)
+
+
+class TaskLog:
+    """Append-only record per finished task plus delay sketches per device and per edge (local last, edge = -1).
+
+    Delays are split into transmission (arrival to end of upload), deploy (container deploy charged for the task),
+    compute (service time of the task alone) and queueing (the rest: waiting, slot alignment and sharing). Queueing
+    can be negative since a task uploaded within a slot is computed from the start of that slot.
+    """
+
+    dtype = np.dtype([('time', np.int64), ('iot', np.int64), ('edge', np.int64), ('trans', np.float64),
+                      ('queue', np.float64), ('deploy', np.float64), ('comp', np.float64), ('delay', np.float64)])
+
+    def __init__(self, n_iot, n_edge, path=None, relative_accuracy=0.01):
+        self.n_iot = n_iot
+        self.n_edge = n_edge
+        self.records = RecordLog(self.dtype, path=path)
+
+        # SKETCHES
+        self.device_sketch = [QuantileSketch(relative_accuracy) for _ in range(self.n_iot)]
+        self.edge_sketch = [QuantileSketch(relative_accuracy) for _ in range(self.n_edge + 1)]
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def __len__(self):
+        return len(self.records)
+
+    def append(self, time, iot, edge, trans, deploy, comp, delay):
+        time, iot, edge, trans, deploy, comp, delay = np.broadcast_arrays(
+            *(np.atleast_1d(values) for values in (time, iot, edge, trans, deploy, comp, delay)))
+        self.records.append(time=time, iot=iot, edge=edge, trans=trans, queue=delay - trans - deploy - comp,
+                            deploy=deploy, comp=comp, delay=delay)
+
+        self.sketch.add(delay)
+        for keys, sketches in ((iot, self.device_sketch), (edge, self.edge_sketch)):
+            order = np.argsort(keys, kind='stable')
+            group, start = np.unique(keys[order], return_index=True)
+            for key, values in zip(group.tolist(), np.split(delay[order], start[1:])):
+                sketches[key].add(values)
+
+    def quantile(self, q=(0.5, 0.95, 0.99), by=None):
+        # by=None: all tasks [len(q)], 'device': [n_iot, len(q)], 'edge': [n_edge + 1, len(q)] with local last
+        if by is None:
+            return self.sketch.quantile(q)
+        if by == 'device':
+            return np.array([sketch.quantile(q) for sketch in self.device_sketch])
+        if by == 'edge':
+            return np.array([sketch.quantile(q) for sketch in self.edge_sketch])
+        raise ValueError(f"Unknown quantile grouping {by}.")
+
+    def read(self):
+        return self.records.read()
+
+    def close(self):
+        self.records.close()
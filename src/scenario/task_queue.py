@@ -0,0 +1,117 @@
+import numpy as np
+
+
+class ArrayTaskQueue:
+    """FIFO task lanes stored as NumPy columns (one ring buffer per lane)."""
+
+    def __init__(self, n_lane, capacity=4):
+        self.n_lane = n_lane
+        self.capacity = capacity
+
+        # TASK COLUMNS
+        self.time = np.zeros([self.n_lane, self.capacity], np.int64)
+        self.size = np.zeros([self.n_lane, self.capacity])
+        self.remain = np.zeros([self.n_lane, self.capacity])
+        self.iot = np.zeros([self.n_lane, self.capacity], np.int64)
+
+        # HEAD POINTERS
+        self.head = np.zeros(self.n_lane, np.int64)
+        self.count = np.zeros(self.n_lane, np.int64)
+
+        # REMAINING WORK PER LANE (kept up to date by push and drain)
+        self.remain_total = np.zeros(self.n_lane)
+
+    def __len__(self):
+        return int(self.count.sum())
+
+    def lane_len(self, lane):
+        return int(self.count[lane])
+
+    def get_state(self):
+        return {column: getattr(self, column).copy()
+                for column in ('time', 'size', 'remain', 'iot', 'head', 'count', 'remain_total')}
+
+    def set_state(self, state):
+        for column, values in state.items():
+            setattr(self, column, values.copy())
+        self.capacity = self.time.shape[1]
+
+    def _grow(self, capacity):
+        order = (self.head[:, None] + np.arange(self.capacity)[None, :]) % self.capacity
+        for column in ('time', 'size', 'remain', 'iot'):
+            old = getattr(self, column)
+            new = np.zeros([self.n_lane, capacity], old.dtype)
+            new[:, :self.capacity] = np.take_along_axis(old, order, axis=1)
+            setattr(self, column, new)
+        self.head[:] = 0
+        self.capacity = capacity
+
+    def push(self, lanes, time, size, iot=0):
+        # lanes must be distinct: at most one arrival per lane and call (iot tells the device on shared lanes)
+        lanes = np.asarray(lanes, np.int64)
+        if lanes.size == 0:
+            return
+        if self.count[lanes].max() >= self.capacity:
+            self._grow(2 * self.capacity)
+
+        pos = (self.head[lanes] + self.count[lanes]) % self.capacity
+        self.time[lanes, pos] = time
+        self.size[lanes, pos] = size
+        self.remain[lanes, pos] = size
+        self.iot[lanes, pos] = iot
+        self.count[lanes] += 1
+        self.remain_total[lanes] += size
+
+    def lane_remain(self):
+        return self.remain_total
+
+    def drain(self, duration, cap, density=None):
+        """Serve every lane for one slot of `duration`.
+
+        With `density` the service time of a task is remain * density / cap (computing), otherwise it is
+        remain / cap (transmitting). Returns lane, arrival slot, size and elapsed slot time of finished tasks.
+        """
+        time_remain = np.full(self.n_lane, duration, np.float64)
+        done_lane, done_time, done_size, done_elapsed = list(), list(), list(), list()
+
+        active = np.flatnonzero(self.count > 0)
+        while active.size > 0:
+            pos = self.head[active]
+            remain = self.remain[active, pos]
+            if density is None:
+                need = remain / cap[active]
+            else:
+                need = remain * density[active] / cap[active]
+
+            finish = time_remain[active] >= need
+
+            # FINISHED TASKS
+            lane = active[finish]
+            time_remain[lane] -= need[finish]
+            done_lane.append(lane)
+            done_time.append(self.time[lane, pos[finish]])
+            done_size.append(self.size[lane, pos[finish]])
+            done_elapsed.append(duration - time_remain[lane])
+            self.head[lane] = (self.head[lane] + 1) % self.capacity
+            self.count[lane] -= 1
+            self.remain_total[lane] -= remain[finish]
+
+            # PARTIALLY SERVED TASKS
+            part = active[~finish]
+            if density is None:
+                served = time_remain[part] * cap[part]
+            else:
+                served = time_remain[part] * cap[part] / density[part]
+            self.remain[part, pos[~finish]] -= served
+            self.remain_total[part] -= served
+            time_remain[part] = 0
+
+            active = lane[(time_remain[lane] > 0) & (self.count[lane] > 0)]
+
+        # EMPTY LANES CARRY NO ROUNDING RESIDUE
+        self.remain_total[self.count == 0] = 0
+
+        if len(done_lane) == 0:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0), np.zeros(0)
+        return np.concatenate(done_lane), np.concatenate(done_time), np.concatenate(done_size), \
+            np.concatenate(done_elapsed)
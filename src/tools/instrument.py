@@ -0,0 +1,91 @@
+import time
+from functools import wraps
+
+
+class _Phase:
+    __slots__ = ('instrument', 'name', 'start')
+
+    def __init__(self, instrument, name):
+        self.instrument = instrument
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.instrument.add(self.name, time.perf_counter() - self.start)
+
+
+class _NoPhase:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Instrument:
+    """Wall time and call count per phase, closed into one row per slot by Sim.step.
+
+    Disabled (the default) a probe costs one attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.phases = dict()
+        self.rows = list()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.phases = dict()
+        self.rows = list()
+
+    def add(self, name, seconds):
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def phase(self, name):
+        # with INSTRUMENT.phase(name): ...
+        return _Phase(self, name) if self.enabled else _NO_PHASE
+
+    def end_slot(self, slot):
+        if not self.enabled:
+            return
+        row = {'slot': slot}
+        for name, (seconds, calls) in self.phases.items():
+            row[name + '_time'] = seconds
+            row[name + '_calls'] = calls
+        self.rows.append(row)
+        self.phases = dict()
+
+    def table(self):
+        # rows with the same columns (phases in order of first appearance, 0 where a slot skipped one)
+        columns = dict.fromkeys(column for row in self.rows for column in row)
+        return [{column: row.get(column, 0) for column in columns} for row in self.rows]
+
+
+INSTRUMENT = Instrument()
+
+
+def timed(name):
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENT.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                INSTRUMENT.add(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
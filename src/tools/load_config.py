@@ -1,19 +1,37 @@
 import configparser
+import os
+from functools import lru_cache
 
 
 def load_config_and_initialize_class(config_file, section, cls):
-    config = configparser.ConfigParser()
-    config.read(config_file)
+    config = read_config(config_file)
 
     if section not in config:
         raise ValueError(f"Section {section} not found in the config file.")
 
-    params = {key: _convert_type(value) for key, value in config[section].items()}
+    params = dict(config[section])
 
     instance = cls(**params)
     return instance
 
 
+def read_config(config_file):
+    # {section: {key: value}}, parsed once per file version and shared (do not modify)
+    if not os.path.isfile(config_file):
+        return dict()
+    stat = os.stat(config_file)
+    return _read_config(os.path.abspath(config_file), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=32)
+def _read_config(config_file, mtime_ns, size):
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    return {section: {key: _convert_type(value) for key, value in config[section].items()}
+            for section in config.sections()}
+
+
 def _convert_type(value):
     if value.isdigit():
         return int(value)
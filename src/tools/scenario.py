@@ -0,0 +1,178 @@
+import hashlib
+import inspect
+import json
+import os
+import random
+import numpy as np
+from functools import lru_cache
+from types import MappingProxyType
+
+from src.scenario.env import Env
+from src.scenario.sim import Sim
+from src.scenario.snapshot import SimState
+from src.tools.load_config import read_config
+
+# bump when the compiled layout changes, older cache files are then ignored
+SCENARIO_VERSION = 1
+
+# PARAMETER TYPES (every other Env parameter is a number)
+INT_PARAMS = ('num_iot', 'num_edge', 'num_time')
+STR_PARAMS = ('queue_engine', 'cache_policy', 'delay_path')
+POSITIVE_PARAMS = ('num_iot', 'num_edge', 'num_time', 'duration', 'comp_cap_iot', 'comp_cap_edge', 'tran_cap_iot',
+                   'edge_download_speed')
+
+
+def validate_params(params, section):
+    signature = inspect.signature(Env.__init__).parameters
+    names = [name for name in signature if name != 'self']
+
+    for name in params:
+        if name not in names:
+            raise ValueError(f"Unknown parameter {name} in section {section}.")
+    for name in names:
+        if name not in params and signature[name].default is inspect.Parameter.empty:
+            raise ValueError(f"Missing parameter {name} in section {section}.")
+
+    for name, value in params.items():
+        if name in INT_PARAMS:
+            valid, kind = isinstance(value, int), 'an integer'
+        elif name in STR_PARAMS:
+            valid, kind = value is None or isinstance(value, str), 'a string'
+        else:
+            valid, kind = isinstance(value, (int, float)), 'a number'
+        if not valid or isinstance(value, bool):
+            raise ValueError(f"Parameter {name} in section {section} must be {kind}, got {value!r}.")
+
+    for name in POSITIVE_PARAMS:
+        if params[name] <= 0:
+            raise ValueError(f"Parameter {name} in section {section} must be positive, got {params[name]}.")
+    if not 0 <= params['task_arrive_prob'] <= 1:
+        raise ValueError(f"Parameter task_arrive_prob in section {section} must be in [0, 1].")
+    if params['min_bit_arrive'] > params['max_bit_arrive']:
+        raise ValueError(f"min_bit_arrive exceeds max_bit_arrive in section {section}.")
+
+
+class Scenario:
+    """A compiled config section: the validated parameters, the random draws of Env construction under seed
+    (transmit capacities and initial caches) and the initial SimState, all read-only.
+
+    instantiate() forks a new Sim from one template built per process, equal to seeding np.random and random with
+    seed and constructing Sim, but without touching the global random state.
+    """
+
+    def __init__(self, section, params, seed, arrays):
+        self.section = section
+        self.params = MappingProxyType(dict(params))
+        self.seed = seed
+
+        for values in arrays.values():
+            values.setflags(write=False)
+        self.arrays = MappingProxyType(arrays)
+        self.state = SimState({name[len('state.'):]: values for name, values in arrays.items()
+                               if name.startswith('state.')})
+        self.template = None
+
+    def instantiate(self) -> Sim:
+        if self.template is None:
+            self.template = self._build()
+        sim = self.template.fork(self.state)
+        # delay logs are opened by Sim.reset
+        sim.operate.env.delay_path = self.params.get('delay_path')
+        return sim
+
+    def _build(self):
+        # CONSTRUCTION DRAWS ARE REPLACED BY THE COMPILED ONES
+        with _isolated_random(self.seed):
+            sim = Sim(**{**self.params, 'delay_path': None})
+        sim.operate.env.tran_cap_iot = self.arrays['tran_cap_iot']
+        sim.restore(self.state)
+        return sim
+
+
+class _isolated_random:
+    # SEED np.random AND random, PUT THE PREVIOUS STATES BACK ON EXIT
+    def __init__(self, seed):
+        self.seed = seed
+
+    def __enter__(self):
+        self.states = (np.random.get_state(), random.getstate())
+        np.random.seed(self.seed)
+        random.seed(self.seed)
+
+    def __exit__(self, *exc_info):
+        np.random.set_state(self.states[0])
+        random.setstate(self.states[1])
+
+
+def compile_section(params, section, seed=0):
+    validate_params(params, section)
+
+    with _isolated_random(seed):
+        sim = Sim(**{**params, 'delay_path': None})
+    arrays = {'tran_cap_iot': sim.operate.env.tran_cap_iot}
+    arrays.update({f'state.{name}': values for name, values in sim.snapshot().arrays.items()})
+
+    return Scenario(section, params, seed, arrays)
+
+
+def compile_config(config_file, seed=0, cache_dir=None):
+    """Every section of config_file as a Scenario {section: Scenario}, compiled once per process and file version.
+
+    With cache_dir the compiled arrays are also kept on disk, keyed by the file content, seed and SCENARIO_VERSION.
+    """
+    if not os.path.isfile(config_file):
+        raise ValueError(f"Config file {config_file} not found.")
+    stat = os.stat(config_file)
+    return _compile_config(os.path.abspath(config_file), stat.st_mtime_ns, stat.st_size, seed, cache_dir)
+
+
+def load_scenario(config_file, section, seed=0, cache_dir=None) -> Scenario:
+    scenarios = compile_config(config_file, seed, cache_dir)
+    if section not in scenarios:
+        raise ValueError(f"Section {section} not found in the config file.")
+    return scenarios[section]
+
+
+@lru_cache(maxsize=32)
+def _compile_config(config_file, mtime_ns, size, seed, cache_dir):
+    path = None
+    if cache_dir is not None:
+        with open(config_file, 'rb') as file:
+            digest = hashlib.sha256(file.read() + f'{seed} {SCENARIO_VERSION}'.encode()).hexdigest()
+        name = os.path.splitext(os.path.basename(config_file))[0]
+        path = os.path.join(cache_dir, f'{name}_{digest[:16]}.scenario')
+        if os.path.isfile(path):
+            return _load(path)
+
+    scenarios = {section: compile_section(params, section, seed)
+                 for section, params in read_config(config_file).items()}
+    if path is not None:
+        _save(path, scenarios)
+    return scenarios
+
+
+def _save(path, scenarios):
+    # ONE SimState BLOB: section/name arrays and the parameters as JSON, written under a temporary name then moved
+    arrays = {f'{section}/{name}': values for section, scenario in scenarios.items()
+              for name, values in scenario.arrays.items()}
+    meta = json.dumps({section: {'params': dict(scenario.params), 'seed': scenario.seed}
+                       for section, scenario in scenarios.items()})
+    arrays['scenarios'] = np.frombuffer(meta.encode(), np.uint8)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(SimState(arrays).to_bytes())
+    os.replace(temp_path, path)
+
+
+def _load(path):
+    with open(path, 'rb') as file:
+        data = SimState.from_bytes(file.read()).arrays
+    meta = json.loads(data.pop('scenarios').tobytes())
+    arrays = {section: dict() for section in meta}
+    for key, values in data.items():
+        section, _, name = key.rpartition('/')
+        arrays[section][name] = values
+
+    return {section: Scenario(section, item['params'], item['seed'], arrays[section])
+            for section, item in meta.items()}
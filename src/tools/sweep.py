@@ -0,0 +1,103 @@
+import csv
+import random
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.tools.load_config import load_config_and_initialize_class
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+
+
+def expand_jobs(config_path, sections, variants, seeds, base_seed=0):
+    """Cross product of config sections, algorithm variants (dicts of run_job keywords) and seeds.
+
+    Every job gets its own child of np.random.SeedSequence(base_seed), so results do not depend on the worker that
+    runs it or on the job order.
+    """
+    n_job = len(sections) * len(variants) * len(seeds)
+    streams = iter(np.random.SeedSequence(base_seed).spawn(n_job))
+
+    jobs = list()
+    for section in sections:
+        for variant_name, variant in variants.items():
+            for seed in seeds:
+                jobs.append({'config_path': config_path, 'section': section, 'variant': variant_name,
+                             'seed': seed, 'stream': next(streams), **variant})
+    return jobs
+
+
+def step_with_action(sim, action, is_scheduled, has_caching):
+    if is_scheduled and has_caching:
+        return sim.step(offload=action[0], schedule=action[1], container_cache=action[2], image_cache=action[3])
+    elif is_scheduled:
+        return sim.step(offload=action[0], schedule=action[1])
+    elif has_caching:
+        return sim.step(offload=action[0], container_cache=action[1], image_cache=action[2])
+    else:
+        return sim.step(offload=action[0])
+
+
+def run_job(job):
+    start_time = time.time()
+
+    # RNG STREAMS: global ones drive Env (trans caps, initial caches, random eviction), rng the arrivals
+    state = job['stream'].generate_state(2)
+    np.random.seed(int(state[0]))
+    random.seed(int(state[1]))
+    rng = np.random.default_rng(job['stream'])
+
+    sim = load_config_and_initialize_class(job['config_path'], job['section'], Sim)
+    sim.operate.is_serial = job.get('is_serial', True)
+    env = sim.operate.env
+    brain = Brain(env, is_scheduled=job['is_scheduled'], has_caching=job['has_caching'],
+                  solver=job.get('solver', 'cplex'))
+
+    bit_arrive = rng.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (rng.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+
+    solve_time, obj_value, n_slot = 0.0, 0.0, 0
+    done = False
+    while not done:
+        brain.set_mutable_param(sim.operate)
+        action = brain.choose_action()
+        solve_time += action[-2]
+        obj_value += action[-1]
+        n_slot += 1
+        done = step_with_action(sim, action, job['is_scheduled'], job['has_caching'])
+    brain.close()
+
+    delay = env.process_delay[env.bit_arrive != 0]
+    return {'section': job['section'], 'variant': job['variant'], 'seed': job['seed'],
+            'n_task': int(delay.size), 'total_delay': float(delay.sum()),
+            'mean_delay': float(delay.mean()) if delay.size > 0 else 0.0,
+            'max_delay': float(delay.max()) if delay.size > 0 else 0.0,
+            'obj_value': float(obj_value), 'solve_time': solve_time, 'n_slot': n_slot,
+            'wall_time': time.time() - start_time}
+
+
+def run_sweep(jobs, max_workers=None):
+    # results come back in job order; max_workers=None uses all cores, 1 runs in this process
+    if max_workers == 1:
+        return [run_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run_job, jobs))
+
+
+def format_table(rows):
+    if len(rows) == 0:
+        return ''
+    columns = list(rows[0].keys())
+    cells = [[f'{row[column]:.4f}' if isinstance(row[column], float) else str(row[column]) for column in columns]
+             for row in rows]
+    width = [max(len(column), *(len(cell[n]) for cell in cells)) for n, column in enumerate(columns)]
+    lines = [' '.join(column.rjust(width[n]) for n, column in enumerate(columns))]
+    lines += [' '.join(cell[n].rjust(width[n]) for n in range(len(columns))) for cell in cells]
+    return '\n'.join(lines)
+
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
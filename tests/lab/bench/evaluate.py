@@ -0,0 +1,54 @@
+import time
+import numpy as np
+
+from src.scenario.sim import Sim
+from src.opt.solver.evaluator import Evaluator
+
+np.random.seed(0)
+
+"""
+Throughput of Evaluator.evaluate on random decisions (offload, caching, task order) with the full objective (schedule,
+caching and deletion terms): one decision per call against batches of 1000, with the order given as task orders and as
+dense precedence matrices.
+"""
+
+
+def random_decisions(n_iot, n_edge, n_batch):
+    edge = np.random.randint(0, n_edge + 1, [n_batch, n_iot])
+    x = (edge[:, :, None] == np.arange(1, n_edge + 1)).astype(float)
+    y = np.random.randint(0, 2, [n_batch, n_iot, n_edge])
+    z = np.maximum(y, np.random.randint(0, 2, [n_batch, n_iot, n_edge]))
+    order = np.argsort(np.random.rand(n_batch, n_edge, n_iot), axis=2)
+    position = np.argsort(order, axis=2)
+    k = (position[:, :, :, None] < position[:, :, None, :]).astype(float)
+    return x, y, z, order, k
+
+
+if __name__ == '__main__':
+    n_batch = 1000
+    for num_iot, num_edge in ((10, 5), (50, 10), (100, 20)):
+        sim = Sim(num_iot=num_iot, num_edge=num_edge, num_time=2, duration=10, task_arrive_prob=0.3,
+                  max_bit_arrive=5, min_bit_arrive=2, comp_cap_iot=0.25, comp_cap_edge=41.8, tran_cap_iot=1000,
+                  comp_density=0.297, container_size=1, container_startup=1, container_delete=0.01, image_size=1,
+                  image_delete=0.01, edge_container_cache_limit=1000, edge_image_cache_limit=1000,
+                  edge_download_speed=10)
+        evaluator = Evaluator(sim.operate.env, is_scheduled=True, has_caching=True, deletion=True)
+        evaluator.set_param_array('D', np.random.uniform(2, 5, num_iot))
+        evaluator.set_param_array('Q', np.random.uniform(0, 5, [num_iot, num_edge]))
+        evaluator.set_param_array('y_pre', np.random.randint(0, 2, [num_iot, num_edge]))
+        x, y, z, order, k = random_decisions(num_iot, num_edge, n_batch)
+
+        start_time = time.perf_counter()
+        single = [evaluator.evaluate(x[n], y[n], z[n], order[n]) for n in range(n_batch)]
+        single_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        batch_order = evaluator.evaluate(x, y, z, order)
+        order_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        batch_k = evaluator.evaluate(x, y, z, k)
+        k_time = time.perf_counter() - start_time
+
+        error = max(np.abs(batch_order - single).max(), np.abs(batch_k - single).max())
+        print(f'{num_iot} devices x {num_edge} edges: single={n_batch / single_time / 1e3:.1f}/ms '
+              f'batch order={n_batch / order_time / 1e3:.1f}/ms batch k={n_batch / k_time / 1e3:.1f}/ms '
+              f'max difference={error:.1e}')
@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+
+"""
+Scaling benchmark over num_iot (10 to 10k) and num_edge (2 to 100): Env construction, Sim.step throughput in serial
+and concurrent mode, PyoModel build time per objective variant and per-slot solve latency. Every timing is the best
+of --repeat runs and is compared with baseline.json next to this script; a case slower than the baseline by more than
+--threshold (and by more than --floor seconds, sub-millisecond cases are mostly noise) is a regression (exit status 1),
+one faster by the same margins a speedup.
+
+    python -m tests.lab.bench.scaling                  # compare with the committed baseline
+    python -m tests.lab.bench.scaling --update         # rewrite the baseline after an intended change
+
+Timings are only comparable on the machine that wrote the baseline, rerun with --update there first.
+"""
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+NUM_IOT = (10, 100, 1000, 10000)
+NUM_EDGE = (2, 10, 100)
+NUM_TIME = 10
+
+# OBJECTIVE VARIANTS: Brain keywords; the schedule constraints grow with num_iot^3 * num_edge
+MODEL_VARIANTS = {
+    'offload': {'is_scheduled': False, 'has_caching': False},
+    'cache': {'is_scheduled': False, 'has_caching': True},
+    'schedule': {'is_scheduled': True, 'has_caching': False},
+    'linear': {'is_scheduled': True, 'has_caching': True, 'linear': True},
+    'nonlinear': {'is_scheduled': True, 'has_caching': True, 'linear': False},
+    'deletion': {'is_scheduled': True, 'has_caching': True, 'linear': True, 'deletion': True},
+}
+MAX_BUILD_SIZE = 2e4
+MAX_SOLVE_SIZE = 2e3
+
+SCENARIO = {'duration': 10, 'task_arrive_prob': 0.3, 'max_bit_arrive': 5, 'min_bit_arrive': 2, 'comp_cap_iot': 0.25,
+            'comp_cap_edge': 41.8, 'tran_cap_iot': 1000, 'comp_density': 0.297, 'container_size': 1,
+            'container_startup': 1, 'container_delete': 0.01, 'image_size': 1, 'image_delete': 0.01,
+            'edge_container_cache_limit': 1000, 'edge_image_cache_limit': 1000, 'edge_download_speed': 10}
+
+
+def model_size(num_iot, num_edge, variant):
+    return num_iot ** 3 * num_edge if variant['is_scheduled'] else num_iot * num_edge
+
+
+def make_sim(num_iot, num_edge, seed=0):
+    # one slot past NUM_TIME, so stepping NUM_TIME slots never starts the drain
+    np.random.seed(seed)
+    return Sim(num_iot=num_iot, num_edge=num_edge, num_time=NUM_TIME + 1, queue_engine='array', **SCENARIO)
+
+
+def make_arrivals(env, seed=0):
+    rng = np.random.default_rng(seed)
+    bit_arrive = rng.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    return bit_arrive * (rng.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob)
+
+
+def best_of(repeat, function):
+    timings = list()
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def bench_env(num_iot, num_edge):
+    make_sim(num_iot, num_edge)
+
+
+def bench_step(num_iot, num_edge, is_serial):
+    # seconds per slot over NUM_TIME slots, random offloading without cache decisions
+    sim = make_sim(num_iot, num_edge)
+    sim.operate.is_serial = is_serial
+    sim.reset(make_arrivals(sim.operate.env))
+    offload = np.random.default_rng(1).integers(0, num_edge + 1, [NUM_TIME, num_iot])
+
+    start_time = time.perf_counter()
+    for t in range(NUM_TIME):
+        sim.step(offload=offload[t])
+    return (time.perf_counter() - start_time) / NUM_TIME
+
+
+def bench_build(num_iot, num_edge, variant, solver):
+    Brain(make_sim(num_iot, num_edge).operate.env, solver=solver, **variant)
+
+
+def bench_solve(num_iot, num_edge, variant, solver):
+    # seconds per slot of set_mutable_param + choose_action on the first slots
+    sim = make_sim(num_iot, num_edge)
+    brain = Brain(sim.operate.env, solver=solver, persistent=solver.endswith('persistent'), **variant)
+    sim.reset(make_arrivals(sim.operate.env))
+
+    n_slot, total = 3, 0.0
+    for _ in range(n_slot):
+        start_time = time.perf_counter()
+        brain.set_mutable_param(sim.operate)
+        action = brain.choose_action()
+        total += time.perf_counter() - start_time
+        if variant['is_scheduled'] and variant['has_caching']:
+            sim.step(offload=action[0], schedule=action[1], container_cache=action[2], image_cache=action[3])
+        elif variant['is_scheduled']:
+            sim.step(offload=action[0], schedule=action[1])
+        elif variant['has_caching']:
+            sim.step(offload=action[0], container_cache=action[1], image_cache=action[2])
+        else:
+            sim.step(offload=action[0])
+    return total / n_slot
+
+
+def run_cases(repeat, solver, max_iot):
+    results = dict()
+    for num_iot in NUM_IOT:
+        if num_iot > max_iot:
+            continue
+        for num_edge in NUM_EDGE:
+            case = f'iot_{num_iot}_edge_{num_edge}'
+            results[f'env/{case}'] = best_of(repeat, lambda: bench_env(num_iot, num_edge))
+            results[f'step_serial/{case}'] = min(bench_step(num_iot, num_edge, True) for _ in range(repeat))
+            results[f'step_concurrent/{case}'] = min(bench_step(num_iot, num_edge, False) for _ in range(repeat))
+
+            for name, variant in MODEL_VARIANTS.items():
+                size = model_size(num_iot, num_edge, variant)
+                if size <= MAX_BUILD_SIZE:
+                    results[f'build_{name}/{case}'] = best_of(
+                        repeat, lambda: bench_build(num_iot, num_edge, variant, solver))
+                if size <= MAX_SOLVE_SIZE and name != 'nonlinear':
+                    results[f'solve_{name}/{case}'] = min(
+                        bench_solve(num_iot, num_edge, variant, solver) for _ in range(repeat))
+            print(f'{case} done', file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold, floor=0.0):
+    # rows of (case, baseline, current, ratio, verdict); cases missing on either side are listed as new / dropped
+    rows, n_regression = list(), 0
+    for case in dict.fromkeys(list(baseline) + list(results)):
+        base, now = baseline.get(case), results.get(case)
+        if base is None or now is None:
+            rows.append((case, base, now, None, 'new' if base is None else 'dropped'))
+            continue
+        ratio = now / base
+        if ratio > 1 + threshold and now - base > floor:
+            verdict = 'REGRESSION'
+            n_regression += 1
+        elif ratio < 1 / (1 + threshold) and base - now > floor:
+            verdict = 'speedup'
+        else:
+            verdict = ''
+        rows.append((case, base, now, ratio, verdict))
+    return rows, n_regression
+
+
+def format_rows(rows):
+    def ms(seconds):
+        return '-' if seconds is None else f'{1e3 * seconds:.3f}'
+
+    width = max([len(row[0]) for row in rows] + [4])
+    lines = [f'{"case":<{width}} {"base ms":>12} {"now ms":>12} {"ratio":>7}  verdict']
+    for case, base, now, ratio, verdict in rows:
+        lines.append(f'{case:<{width}} {ms(base):>12} {ms(now):>12} '
+                     f'{"-" if ratio is None else f"{ratio:.2f}":>7}  {verdict}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--update', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative slowdown counted as a regression')
+    parser.add_argument('--floor', type=float, default=0.005, help='absolute change in seconds below which not to flag')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--solver', default='appsi_highs')
+    parser.add_argument('--max-iot', type=int, default=max(NUM_IOT))
+    args = parser.parse_args()
+
+    results = run_cases(args.repeat, args.solver, args.max_iot)
+
+    if args.update:
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump({'solver': args.solver, 'repeat': args.repeat, 'seconds': results}, file, indent=1)
+        print(f'baseline written to {BASELINE_PATH} ({len(results)} cases)')
+        sys.exit(0)
+
+    with open(BASELINE_PATH) as file:
+        baseline = json.load(file)
+    if baseline['solver'] != args.solver:
+        raise ValueError(f"Baseline was taken with solver {baseline['solver']}, not {args.solver}.")
+    # only the cases this run covers (--max-iot)
+    baseline_seconds = {case: seconds for case, seconds in baseline['seconds'].items()
+                        if case in results or int(case.split('_')[-3]) <= args.max_iot}
+    rows, n_regression = compare(results, baseline_seconds, args.threshold, args.floor)
+    print(format_rows(rows))
+    print(f'{n_regression} regression(s) above {100 * args.threshold:.0f}%')
+    sys.exit(1 if n_regression > 0 else 0)
@@ -0,0 +1,69 @@
+import os
+import random
+import tempfile
+import time
+import numpy as np
+
+from src.scenario.sim import Sim
+from src.tools.load_config import load_config_and_initialize_class, _read_config
+from src.tools.scenario import compile_config, _compile_config
+
+"""
+Startup of a sweep over every section of the exp01/exp02 configs: seeding and constructing Sim per job through
+load_config_and_initialize_class (as parsed per call before, and with the parse cache) against compiled scenarios
+(compile_config cold, from the disk cache in a fresh process, and Scenario.instantiate per job). Checks that an
+instantiated Sim has the same constants and state as the seeded construction.
+"""
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'config')
+CONFIG_PATHS = [os.path.join(CONFIG_DIR, 'exp01_order', 'exp01.ini'),
+                os.path.join(CONFIG_DIR, 'exp02_ablation', 'exp02.ini')]
+
+
+def construct(config_path, section, seed, parse_cache=True):
+    if not parse_cache:
+        _read_config.cache_clear()
+    np.random.seed(seed)
+    random.seed(seed)
+    return load_config_and_initialize_class(config_path, section, Sim)
+
+
+def same_sim(sim: Sim, other: Sim):
+    state, other_state = sim.snapshot().arrays, other.snapshot().arrays
+    return np.array_equal(sim.operate.env.tran_cap_iot, other.operate.env.tran_cap_iot) and \
+        state.keys() == other_state.keys() and all(np.array_equal(state[name], other_state[name]) for name in state)
+
+
+def timed_jobs(make, jobs, n_repeat):
+    start_time = time.perf_counter()
+    for _ in range(n_repeat):
+        for config_path, section in jobs:
+            make(config_path, section)
+    return (time.perf_counter() - start_time) / (n_repeat * len(jobs)) * 1e6
+
+
+if __name__ == '__main__':
+    seed, n_repeat = 0, 20
+    jobs = [(config_path, section) for config_path in CONFIG_PATHS for section in compile_config(config_path, seed)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        _compile_config.cache_clear()
+        start_time = time.perf_counter()
+        scenarios = {config_path: compile_config(config_path, seed, cache_dir) for config_path in CONFIG_PATHS}
+        cold_time = time.perf_counter() - start_time
+
+        _compile_config.cache_clear()
+        start_time = time.perf_counter()
+        scenarios = {config_path: compile_config(config_path, seed, cache_dir) for config_path in CONFIG_PATHS}
+        disk_time = time.perf_counter() - start_time
+
+    exact = all(same_sim(scenarios[config_path][section].instantiate(), construct(config_path, section, seed))
+                for config_path, section in jobs)
+
+    reparse = timed_jobs(lambda config_path, section: construct(config_path, section, seed, parse_cache=False),
+                         jobs, n_repeat)
+    parse_cached = timed_jobs(lambda config_path, section: construct(config_path, section, seed), jobs, n_repeat)
+    instantiate = timed_jobs(lambda config_path, section: scenarios[config_path][section].instantiate(), jobs, n_repeat)
+
+    print(f'{len(jobs)} sections: exact={exact} compile cold={cold_time * 1e3:.1f}ms disk={disk_time * 1e3:.1f}ms')
+    print(f'per job: reparse+construct={reparse:.0f}us construct={parse_cached:.0f}us instantiate={instantiate:.0f}us')
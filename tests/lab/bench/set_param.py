@@ -0,0 +1,56 @@
+import time
+import numpy as np
+
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+
+np.random.seed(0)
+
+"""
+Per-slot cost of Brain.set_mutable_param at 1k devices x 20 edges (offload model only, the schedule variables
+do not fit at this size): element-wise Pyomo __setitem__ against the bulk path that skips unchanged entries.
+"""
+
+
+def set_param_per_entry(brain: Brain, sim: Sim):
+    operate = sim.operate
+    t = operate.env.time_count
+    for iot_index in range(operate.env.n_iot):
+        brain.opt.model.G[iot_index] = operate.queue_iot_comp_remain[iot_index]
+        brain.opt.model.D[iot_index] = operate.env.bit_arrive[t][iot_index]
+        for edge_index in range(operate.env.n_edge):
+            brain.opt.model.U[iot_index, edge_index] = operate.queue_iot_tran_remain[iot_index, edge_index]
+            brain.opt.model.Q[iot_index, edge_index] = operate.queue_fog_comp_remain[iot_index, edge_index]
+            brain.opt.model.y_pre[iot_index, edge_index] = operate.y_pre[iot_index, edge_index]
+            brain.opt.model.z_pre[iot_index, edge_index] = operate.z_pre[iot_index, edge_index]
+
+
+if __name__ == '__main__':
+    num_iot, num_edge, num_time = 1000, 20, 20
+    sim = Sim(num_iot=num_iot, num_edge=num_edge, num_time=num_time, duration=10, task_arrive_prob=0.3,
+              max_bit_arrive=5, min_bit_arrive=2, comp_cap_iot=0.25, comp_cap_edge=41.8, tran_cap_iot=1000,
+              comp_density=0.297, container_size=1, container_startup=1, container_delete=0.01, image_size=1,
+              image_delete=0.01, edge_container_cache_limit=1000, edge_image_cache_limit=1000, edge_download_speed=10,
+              queue_engine='array')
+    env = sim.operate.env
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [num_time, num_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [num_time, num_iot]) < env.task_arrive_prob))
+
+    start_time = time.time()
+    brain = Brain(env, is_scheduled=False, has_caching=False)
+    print(f'build model: {time.time() - start_time:.3f} s')
+
+    per_entry, bulk = list(), list()
+    for t in range(num_time - 1):
+        start_time = time.perf_counter()
+        set_param_per_entry(brain, sim)
+        per_entry.append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        brain.set_mutable_param(sim.operate)
+        bulk.append(time.perf_counter() - start_time)
+
+        sim.step(offload=np.random.randint(0, num_edge + 1, num_iot))
+
+    print(f'per-entry set_mutable_param: {1e3 * np.mean(per_entry):.2f} ms/slot')
+    print(f'bulk set_mutable_param:      {1e3 * np.mean(bulk):.2f} ms/slot')
@@ -0,0 +1,60 @@
+import numpy as np
+
+from src.tools.load_config import load_config_and_initialize_class
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+
+np.random.seed(0)
+np.set_printoptions(linewidth=np.inf)
+
+"""
+Objective gap of the heuristic (solver='heuristic') against the MIP on the exp01/exp02 settings. Both decide on the
+same state every slot, the MIP decision drives the simulation. gap = (heuristic - mip) / mip over the whole run.
+"""
+
+
+def run_gap(sim: Sim, is_scheduled, has_caching, solver='cplex'):
+    env = sim.operate.env
+    mip = Brain(env, is_scheduled=is_scheduled, has_caching=has_caching, solver=solver)
+    heuristic = Brain(env, is_scheduled=is_scheduled, has_caching=has_caching, solver='heuristic')
+
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+
+    mip_obj, heuristic_obj, mip_time, heuristic_time = 0, 0, 0, 0
+    done = False
+    while not done:
+        mip.set_mutable_param(sim.operate)
+        heuristic.set_mutable_param(sim.operate)
+        action = mip.choose_action()
+        heuristic_action = heuristic.choose_action()
+
+        mip_obj += action[-1]
+        heuristic_obj += heuristic_action[-1]
+        mip_time += action[-2]
+        heuristic_time += heuristic_action[-2]
+
+        if is_scheduled and has_caching:
+            done = sim.step(offload=action[0], schedule=action[1], container_cache=action[2], image_cache=action[3])
+        elif is_scheduled:
+            done = sim.step(offload=action[0], schedule=action[1])
+        elif has_caching:
+            done = sim.step(offload=action[0], container_cache=action[1], image_cache=action[2])
+        else:
+            done = sim.step(offload=action[0])
+
+    gap = (heuristic_obj - mip_obj) / mip_obj if mip_obj > 0 else 0.0
+    return gap, mip_time, heuristic_time
+
+
+if __name__ == '__main__':
+    experiments = [('../../config/exp01_order/exp01.ini', 50), ('../../config/exp02_ablation/exp02.ini', 30)]
+    variants = [(True, True), (True, False), (False, True), (False, False)]
+    for config_path, max_iot in experiments:
+        for num_iot in range(10, max_iot + 5, 5):
+            setting_name = 'iot_' + f'{int(num_iot)}' + '_edge_5'
+            for is_scheduled, has_caching in variants:
+                sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+                gap, mip_time, heuristic_time = run_gap(sim, is_scheduled, has_caching)
+                print(f'{config_path} {setting_name} scheduled={is_scheduled} caching={has_caching}: '
+                      f'gap={100 * gap:.3f}% mip_time={mip_time:.2f}s heuristic_time={heuristic_time:.3f}s')
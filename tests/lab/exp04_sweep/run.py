@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.tools.sweep import expand_jobs, run_sweep, format_table, write_csv
+
+np.set_printoptions(linewidth=np.inf)
+
+"""
+exp01 and exp02 over all iot_N_edge_5 sections, every variant and several seeds on a process pool (all cores).
+Each job has its own RNG stream from SeedSequence(base_seed), the table lists delay and solve time per job.
+"""
+
+EXP01_VARIANTS = {
+    'sec1(Serial+Schedule)': {'is_serial': True, 'is_scheduled': True, 'has_caching': True, 'solver': 'cplex'},
+    'sec2(Concurrent)': {'is_serial': False, 'is_scheduled': True, 'has_caching': True, 'solver': 'cplex'},
+    'sec3(Serial+Random)': {'is_serial': True, 'is_scheduled': False, 'has_caching': True, 'solver': 'cplex'},
+}
+
+EXP02_VARIANTS = {
+    'sec1(Offload+Schedule+Cache)': {'is_serial': True, 'is_scheduled': True, 'has_caching': True, 'solver': 'cplex'},
+    'sec2(Offload+Schedule)': {'is_serial': True, 'is_scheduled': True, 'has_caching': False, 'solver': 'cplex'},
+    'sec3(Offload+Cache)': {'is_serial': True, 'is_scheduled': False, 'has_caching': True, 'solver': 'cplex'},
+    'sec4(Offload)': {'is_serial': True, 'is_scheduled': False, 'has_caching': False, 'solver': 'cplex'},
+}
+
+if __name__ == '__main__':
+    seeds = range(5)
+    experiments = [('../../config/exp01_order/exp01.ini', 50, EXP01_VARIANTS, 0),
+                   ('../../config/exp02_ablation/exp02.ini', 30, EXP02_VARIANTS, 1)]
+    for config_path, max_iot, variants, base_seed in experiments:
+        sections = ['iot_' + f'{int(num_iot)}' + '_edge_5' for num_iot in range(10, max_iot + 5, 5)]
+        jobs = expand_jobs(config_path, sections, variants, seeds, base_seed=base_seed)
+        results = run_sweep(jobs)
+        print(format_table(results))
+        write_csv(results, config_path.split('/')[-1].replace('.ini', '_sweep.csv'))
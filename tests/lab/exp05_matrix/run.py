@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+from src.tools.load_config import load_config_and_initialize_class
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+
+np.random.seed(0)
+np.set_printoptions(linewidth=np.inf)
+
+"""
+Equivalence of the matrix builder (builder='matrix') and the Pyomo model on the demo and exp01/exp02 settings. Both
+decide on the same state every slot with HiGHS, the Pyomo decision drives the simulation; the optimal objectives
+must agree within the relative MIP gap of HiGHS (1e-4) every slot, also when the first slot is solved again from the
+written MPS file.
+"""
+
+VARIANTS = {
+    'offload': {'is_scheduled': False, 'has_caching': False},
+    'cache': {'is_scheduled': False, 'has_caching': True},
+    'schedule': {'is_scheduled': True, 'has_caching': False},
+    'linear': {'is_scheduled': True, 'has_caching': True, 'linear': True},
+    'deletion': {'is_scheduled': True, 'has_caching': True, 'linear': True, 'deletion': True},
+}
+
+
+def solve_mps(brain: Brain):
+    import highspy
+    path = os.path.join(tempfile.mkdtemp(), 'model.mps')
+    brain.opt.write_mps(path)
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    highs.readModel(path)
+    highs.run()
+    return highs.getInfo().objective_function_value
+
+
+def run_equivalence(sim: Sim, variant, solver='appsi_highs'):
+    env = sim.operate.env
+    start_time = time.time()
+    pyomo = Brain(env, solver=solver, **variant)
+    pyomo_build = time.time() - start_time
+    start_time = time.time()
+    matrix = Brain(env, solver=solver, builder='matrix', **variant)
+    matrix_build = time.time() - start_time
+
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+
+    max_gap, mps_gap = 0.0, None
+    done = False
+    while not done:
+        pyomo.set_mutable_param(sim.operate)
+        matrix.set_mutable_param(sim.operate)
+        action = pyomo.choose_action()
+        matrix_action = matrix.choose_action()
+
+        max_gap = max(max_gap, abs(matrix_action[-1] - action[-1]) / max(1.0, abs(action[-1])))
+        if mps_gap is None:
+            mps_gap = abs(solve_mps(matrix) - action[-1]) / max(1.0, abs(action[-1]))
+
+        if variant['is_scheduled'] and variant['has_caching']:
+            done = sim.step(offload=action[0], schedule=action[1], container_cache=action[2], image_cache=action[3])
+        elif variant['is_scheduled']:
+            done = sim.step(offload=action[0], schedule=action[1])
+        elif variant['has_caching']:
+            done = sim.step(offload=action[0], container_cache=action[1], image_cache=action[2])
+        else:
+            done = sim.step(offload=action[0])
+
+    return max_gap, mps_gap, pyomo_build, matrix_build
+
+
+if __name__ == '__main__':
+    settings = [('../../config/demo/test_load_env.ini', 'Settings'),
+                ('../../config/exp01_order/exp01.ini', 'iot_10_edge_5'),
+                ('../../config/exp02_ablation/exp02.ini', 'iot_10_edge_5')]
+    n_fail = 0
+    for config_path, setting_name in settings:
+        for variant_name, variant in VARIANTS.items():
+            sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+            max_gap, mps_gap, pyomo_build, matrix_build = run_equivalence(sim, variant)
+            ok = max_gap <= 1e-4 and mps_gap <= 1e-4
+            n_fail += not ok
+            print(f'{config_path} {setting_name} {variant_name}: max_gap={max_gap:.2e} mps_gap={mps_gap:.2e} '
+                  f'build pyomo={pyomo_build:.3f}s matrix={matrix_build:.3f}s {"ok" if ok else "MISMATCH"}')
+    sys.exit(1 if n_fail > 0 else 0)
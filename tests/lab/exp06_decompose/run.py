@@ -0,0 +1,96 @@
+import time
+import numpy as np
+
+from src.tools.load_config import load_config_and_initialize_class
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+
+np.random.seed(0)
+np.set_printoptions(linewidth=np.inf)
+
+"""
+Per-edge Lagrangian decomposition (builder='decompose') against the monolithic matrix model on the exp01 settings.
+Both decide on the same state every slot, the monolithic decision drives the simulation. Reports the objective gap
+of the decomposition, how far its dual bound is below the optimum and the solve times. Then each builder drives its
+own simulation (closed loop) on iot_10_edge_5, reporting the total objective, the total delay and the run time.
+"""
+
+
+def step(sim: Sim, action, is_scheduled, has_caching):
+    if is_scheduled and has_caching:
+        return sim.step(offload=action[0], schedule=action[1], container_cache=action[2], image_cache=action[3])
+    elif is_scheduled:
+        return sim.step(offload=action[0], schedule=action[1])
+    elif has_caching:
+        return sim.step(offload=action[0], container_cache=action[1], image_cache=action[2])
+    return sim.step(offload=action[0])
+
+
+def run_decompose(sim: Sim, is_scheduled, has_caching):
+    env = sim.operate.env
+    full = Brain(env, is_scheduled=is_scheduled, has_caching=has_caching, solver='highs', builder='matrix')
+    decompose = Brain(env, is_scheduled=is_scheduled, has_caching=has_caching, solver='highs', builder='decompose')
+
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+
+    full_obj, decompose_obj, dual_bound, full_time, decompose_time = 0, 0, 0, 0, 0
+    done = False
+    while not done:
+        full.set_mutable_param(sim.operate)
+        decompose.set_mutable_param(sim.operate)
+        action = full.choose_action()
+        decompose_action = decompose.choose_action()
+
+        full_obj += action[-1]
+        decompose_obj += decompose_action[-1]
+        dual_bound += decompose.opt.dual_bound
+        full_time += action[-2]
+        decompose_time += decompose_action[-2]
+        done = step(sim, action, is_scheduled, has_caching)
+    decompose.close()
+
+    gap = (decompose_obj - full_obj) / full_obj if full_obj > 0 else 0.0
+    bound_gap = (full_obj - dual_bound) / full_obj if full_obj > 0 else 0.0
+    return gap, bound_gap, full_time, decompose_time
+
+
+def run_closed_loop(sim: Sim, builder, is_scheduled, has_caching):
+    env = sim.operate.env
+    brain = Brain(env, is_scheduled=is_scheduled, has_caching=has_caching, solver='highs', builder=builder)
+
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+
+    start_time = time.time()
+    total_obj = 0
+    done = False
+    while not done:
+        brain.set_mutable_param(sim.operate)
+        action = brain.choose_action()
+        total_obj += action[-1]
+        done = step(sim, action, is_scheduled, has_caching)
+    brain.close()
+
+    return total_obj, env.process_delay.sum(), time.time() - start_time
+
+
+if __name__ == '__main__':
+    config_path = '../../config/exp01_order/exp01.ini'
+    variants = [(True, True), (True, False), (False, True), (False, False)]
+    for num_iot in (10, 15):
+        setting_name = 'iot_' + f'{int(num_iot)}' + '_edge_5'
+        for is_scheduled, has_caching in variants:
+            sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+            gap, bound_gap, full_time, decompose_time = run_decompose(sim, is_scheduled, has_caching)
+            print(f'{setting_name} scheduled={is_scheduled} caching={has_caching}: gap={100 * gap:.3f}% '
+                  f'bound_gap={100 * bound_gap:.3f}% full_time={full_time:.2f}s decompose_time={decompose_time:.2f}s')
+
+    setting_name = 'iot_10_edge_5'
+    for is_scheduled, has_caching in variants:
+        for builder in ('matrix', 'decompose'):
+            np.random.seed(0)
+            sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+            total_obj, delay, run_time = run_closed_loop(sim, builder, is_scheduled, has_caching)
+            print(f'{setting_name} scheduled={is_scheduled} caching={has_caching} closed loop {builder}: '
+                  f'obj={total_obj:.4f} delay={delay:.4f} time={run_time:.1f}s')
@@ -0,0 +1,56 @@
+import numpy as np
+
+from src.tools.load_config import load_config_and_initialize_class
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+
+np.random.seed(0)
+np.set_printoptions(linewidth=np.inf)
+
+"""
+Slot deadline mode on the exp01 settings: the fallback decision and the MIP share time_limit seconds per slot, a slot
+without an incumbent takes the fallback decision. Reports the total objective, the worst decision latency, the deadline
+misses and the fallbacks for a range of limits, no limit first, on the matrix model and on the pyomo model
+(appsi_highs).
+"""
+
+
+def run_deadline(sim: Sim, time_limit, fallback, solver='highs', builder='matrix'):
+    env = sim.operate.env
+    brain = Brain(env, is_scheduled=True, has_caching=True, solver=solver, builder=builder, time_limit=time_limit,
+                  fallback=fallback)
+
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+
+    total_obj, max_time = 0, 0
+    done = False
+    while not done:
+        brain.set_mutable_param(sim.operate)
+        action = brain.choose_action()
+        total_obj += action[-1]
+        max_time = max(max_time, action[-2])
+        done = sim.step(offload=action[0], schedule=action[1], container_cache=action[2], image_cache=action[3])
+
+    n_miss = sum(slot['deadline_miss'] for slot in brain.slot_log)
+    n_fallback = sum(slot['fallback'] is not None for slot in brain.slot_log)
+    return total_obj, max_time, n_miss, n_fallback
+
+
+if __name__ == '__main__':
+    config_path = '../../config/exp01_order/exp01.ini'
+    setting_name = 'iot_15_edge_5'
+    for fallback in ('greedy', 'previous'):
+        for time_limit in (None, 1.0, 0.1, 0.01):
+            np.random.seed(0)
+            sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+            total_obj, max_time, n_miss, n_fallback = run_deadline(sim, time_limit, fallback)
+            print(f'{setting_name} fallback={fallback} time_limit={time_limit}: obj={total_obj:.4f} '
+                  f'max_time={max_time:.3f}s misses={n_miss} fallbacks={n_fallback}')
+
+    for time_limit in (None, 1.0, 0.1):
+        np.random.seed(0)
+        sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+        total_obj, max_time, n_miss, n_fallback = run_deadline(sim, time_limit, 'greedy', 'appsi_highs', 'pyomo')
+        print(f'{setting_name} pyomo fallback=greedy time_limit={time_limit}: obj={total_obj:.4f} '
+              f'max_time={max_time:.3f}s misses={n_miss} fallbacks={n_fallback}')
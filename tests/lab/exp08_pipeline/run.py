@@ -0,0 +1,71 @@
+import time
+import numpy as np
+
+from src.tools.load_config import load_config_and_initialize_class
+from src.tools.sweep import step_with_action
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+from src.opt.solver.pipeline import Pipeline
+
+np.set_printoptions(linewidth=np.inf)
+
+"""
+Pipelined decisions (Pipeline) against the sequential loop on the exp01 settings with the same arrivals. The pipeline
+solves slot t+1 on the predicted state while slot t is simulated; reports the wall time per slot of both loops, the
+prefetched decisions that were used and the largest prediction error. Overlap needs a second core.
+"""
+
+
+def make_sim(config_path, setting_name, seed):
+    np.random.seed(seed)
+    sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+    env = sim.operate.env
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+    return sim
+
+
+def run_sequential(sim: Sim, is_scheduled, has_caching, **brain_kwargs):
+    brain = Brain(sim.operate.env, is_scheduled=is_scheduled, has_caching=has_caching, **brain_kwargs)
+    start_time = time.time()
+    total_obj, n_slot = 0, 0
+    done = False
+    while not done:
+        brain.set_mutable_param(sim.operate)
+        action = brain.choose_action()
+        total_obj += action[-1]
+        n_slot += 1
+        done = step_with_action(sim, action, is_scheduled, has_caching)
+    return total_obj, (time.time() - start_time) / n_slot
+
+
+def run_pipeline(sim: Sim, is_scheduled, has_caching, **brain_kwargs):
+    pipeline = Pipeline(sim.operate.env, is_scheduled=is_scheduled, has_caching=has_caching, **brain_kwargs)
+    start_time = time.time()
+    total_obj, n_slot = 0, 0
+    done = False
+    while not done:
+        action = pipeline.choose_action(sim.operate)
+        pipeline.prefetch(sim.operate, action)
+        total_obj += action[-1]
+        n_slot += 1
+        done = step_with_action(sim, action, is_scheduled, has_caching)
+    slot_time = (time.time() - start_time) / n_slot
+    pipeline.close()
+    return total_obj, slot_time, pipeline.stats(), max(pipeline.errors, default=0.0)
+
+
+if __name__ == '__main__':
+    config_path = '../../config/exp01_order/exp01.ini'
+    variants = [(True, True), (False, True), (False, False)]
+    for setting_name in ('iot_10_edge_5', 'iot_15_edge_5'):
+        for is_scheduled, has_caching in variants:
+            sequential_obj, sequential_time = run_sequential(make_sim(config_path, setting_name, 0), is_scheduled,
+                                                             has_caching, solver='highs', builder='matrix')
+            pipeline_obj, pipeline_time, stats, max_error = run_pipeline(make_sim(config_path, setting_name, 0),
+                                                                         is_scheduled, has_caching, solver='highs',
+                                                                         builder='matrix')
+            print(f'{setting_name} scheduled={is_scheduled} caching={has_caching}: '
+                  f'sequential={sequential_time:.3f}s/slot pipeline={pipeline_time:.3f}s/slot '
+                  f'obj {sequential_obj:.4f}/{pipeline_obj:.4f} hit={stats["hit"]} mismatch={stats["mismatch"]} '
+                  f'max_error={max_error:.2e}')
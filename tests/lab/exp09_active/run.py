@@ -0,0 +1,52 @@
+import numpy as np
+
+from src.tools.load_config import load_config_and_initialize_class
+from src.tools.sweep import step_with_action
+from src.scenario.sim import Sim
+from src.opt.solver.brain import Brain
+
+np.set_printoptions(linewidth=np.inf)
+
+"""
+Active-device reduction (reduce_active=True) against the full matrix model on the exp01 settings. Both decide on the
+same state every slot, the reduced decision drives the simulation. Reports the largest objective difference, the solve
+times and the mean number of devices with pending work.
+"""
+
+
+def run_active(sim: Sim, is_scheduled, has_caching):
+    env = sim.operate.env
+    full = Brain(env, is_scheduled=is_scheduled, has_caching=has_caching, solver='highs', builder='matrix')
+    reduced = Brain(env, is_scheduled=is_scheduled, has_caching=has_caching, solver='highs', builder='matrix',
+                    reduce_active=True)
+
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+
+    max_gap, full_time, reduced_time, n_active = 0.0, 0.0, 0.0, list()
+    done = False
+    while not done:
+        full.set_mutable_param(sim.operate)
+        reduced.set_mutable_param(sim.operate)
+        action = full.choose_action()
+        reduced_action = reduced.choose_action()
+
+        max_gap = max(max_gap, abs(reduced_action[-1] - action[-1]) / max(1.0, abs(action[-1])))
+        full_time += action[-2]
+        reduced_time += reduced_action[-2]
+        n_active.append(reduced.opt.active.size)
+        done = step_with_action(sim, reduced_action, is_scheduled, has_caching)
+
+    return max_gap, full_time, reduced_time, np.mean(n_active)
+
+
+if __name__ == '__main__':
+    config_path = '../../config/exp01_order/exp01.ini'
+    variants = [(True, True), (False, True), (False, False)]
+    for setting_name in ('iot_10_edge_5', 'iot_15_edge_5'):
+        for is_scheduled, has_caching in variants:
+            np.random.seed(0)
+            sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+            max_gap, full_time, reduced_time, n_active = run_active(sim, is_scheduled, has_caching)
+            print(f'{setting_name} scheduled={is_scheduled} caching={has_caching}: max_gap={max_gap:.2e} '
+                  f'full={full_time:.2f}s reduced={reduced_time:.2f}s active={n_active:.1f}/{sim.operate.env.n_iot}')
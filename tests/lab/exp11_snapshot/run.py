@@ -0,0 +1,80 @@
+import copy
+import time
+import numpy as np
+
+from src.tools.load_config import load_config_and_initialize_class
+from src.scenario.sim import Sim
+from src.scenario.snapshot import SimState
+
+np.set_printoptions(linewidth=np.inf)
+
+"""
+Snapshot/fork of the simulation state (Sim.snapshot, Sim.fork, SimState.to_bytes) on the exp01 settings with both
+queue engines. Half way through the horizon the live state is branched with random offloads for a few slots per branch;
+replaying a branch's offloads on the live Sim must give the same state. Reports the state size, the cost per snapshot,
+fork and serialization round trip against copy.deepcopy, and the rollout branches per second.
+"""
+
+
+def random_offloads(env, n_slot, seed):
+    return np.random.RandomState(seed).randint(0, env.n_edge + 1, [n_slot, env.n_iot])
+
+
+def rollout(sim: Sim, offloads):
+    for offload in offloads:
+        if sim.step(offload=offload):
+            break
+    return sim.operate.env.process_delay.sum() + sim.operate.queue_iot_comp_remain.sum() + \
+        sim.operate.queue_iot_tran_remain.sum() + sim.operate.queue_fog_comp_remain.sum()
+
+
+def same_state(state: SimState, other: SimState):
+    return state.arrays.keys() == other.arrays.keys() and \
+        all(np.array_equal(state.arrays[name], other.arrays[name]) for name in state.arrays)
+
+
+def run_snapshot(sim: Sim, n_branch=100, horizon=3, n_repeat=200):
+    env = sim.operate.env
+    bit_arrive = np.random.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (np.random.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+    rollout(sim, random_offloads(env, env.n_time // 2, seed=0))
+    state = sim.snapshot()
+
+    # BRANCHES FROM ONE LIVE STATE
+    start_time = time.perf_counter()
+    costs = [rollout(sim.fork(state), random_offloads(env, horizon, seed)) for seed in range(n_branch)]
+    branch_rate = n_branch / (time.perf_counter() - start_time)
+
+    # REPLAY OF THE BEST BRANCH ON THE LIVE SIM, THEN BACK
+    best = int(np.argmin(costs))
+    branch = sim.fork(state)
+    rollout(branch, random_offloads(env, horizon, best))
+    rollout(sim, random_offloads(env, horizon, best))
+    exact = same_state(branch.snapshot(), sim.snapshot())
+    sim.restore(SimState.from_bytes(state.to_bytes()))
+    exact = exact and same_state(sim.snapshot(), state)
+
+    times = dict()
+    for name, operation in (('snapshot', sim.snapshot), ('fork', lambda: sim.fork(state)),
+                            ('bytes', lambda: SimState.from_bytes(state.to_bytes())),
+                            ('deepcopy', lambda: copy.deepcopy(sim))):
+        start_time = time.perf_counter()
+        for _ in range(n_repeat):
+            operation()
+        times[name] = (time.perf_counter() - start_time) / n_repeat * 1e6
+
+    return exact, len(state.to_bytes()), times, branch_rate
+
+
+if __name__ == '__main__':
+    config_path = '../../config/exp01_order/exp01.ini'
+    for setting_name in ('iot_10_edge_5', 'iot_15_edge_5'):
+        for queue_engine in ('deque', 'array'):
+            np.random.seed(0)
+            sim: Sim = load_config_and_initialize_class(config_path, setting_name, Sim)
+            # the queues are built by Sim.reset
+            sim.operate.env.queue_engine = queue_engine
+            exact, n_byte, times, branch_rate = run_snapshot(sim)
+            print(f'{setting_name} {queue_engine}: exact={exact} bytes={n_byte} '
+                  + ' '.join(f'{name}={value:.0f}us' for name, value in times.items())
+                  + f' branches={branch_rate:.0f}/s')
@@ -0,0 +1,80 @@
+import random
+import time
+import numpy as np
+
+from src.tools.load_config import read_config
+from src.scenario.sim import Sim
+
+np.set_printoptions(linewidth=np.inf)
+
+"""
+Event-driven drain (sim.is_event_driven = True) against the slotted drain. Random decisions on small edges with tight
+caches (every eviction policy, both queue engines, serial and concurrent edges, 8 seeds) must give the same end slot,
+cache counters and delays; the exp01 settings with every task local and 100x larger tasks time long drains.
+"""
+
+SMALL = {'num_iot': 6, 'num_edge': 2, 'num_time': 10, 'duration': 10, 'task_arrive_prob': 0.5, 'max_bit_arrive': 50,
+         'min_bit_arrive': 20, 'comp_cap_iot': 0.25, 'comp_cap_edge': 0.3, 'tran_cap_iot': 3, 'comp_density': 0.297,
+         'container_size': 1, 'container_startup': 1, 'container_delete': 0.01, 'image_size': 1,
+         'image_delete': 0.01, 'edge_container_cache_limit': 3, 'edge_image_cache_limit': 3,
+         'edge_download_speed': 10}
+
+
+def run_drain(params, seed, is_event_driven, is_serial=True, local=False):
+    np.random.seed(seed)
+    random.seed(seed)
+    sim = Sim(**params)
+    sim.is_event_driven = is_event_driven
+    sim.operate.is_serial = is_serial
+    env = sim.operate.env
+
+    rng = np.random.RandomState(seed)
+    bit_arrive = rng.uniform(env.min_bit_arrive, env.max_bit_arrive, [env.n_time, env.n_iot])
+    sim.reset(bit_arrive * (rng.uniform(0, 1, [env.n_time, env.n_iot]) < env.task_arrive_prob))
+
+    start_time = time.perf_counter()
+    done = False
+    while not done:
+        if local:
+            done = sim.step(offload=np.zeros(env.n_iot, np.int64))
+        else:
+            schedule = [rng.permutation(env.n_iot) for _ in range(env.n_edge)]
+            container_cache = rng.randint(0, 2, [env.n_iot, env.n_edge])
+            image_cache = np.maximum(container_cache, rng.randint(0, 2, [env.n_iot, env.n_edge]))
+            done = sim.step(offload=rng.randint(0, env.n_edge + 1, env.n_iot), schedule=schedule,
+                            container_cache=container_cache, image_cache=image_cache)
+
+    return sim, time.perf_counter() - start_time
+
+
+def same_run(sim: Sim, other: Sim):
+    env, other_env = sim.operate.env, other.operate.env
+    return env.time_count == other_env.time_count and \
+        [cache.stats() for cache in env.edge_server_cache] == [cache.stats() for cache in other_env.edge_server_cache] \
+        and np.allclose(env.process_delay, other_env.process_delay, rtol=1e-9, atol=1e-9) and \
+        np.allclose(env.process_delay_trans, other_env.process_delay_trans, rtol=1e-9, atol=1e-9)
+
+
+if __name__ == '__main__':
+    for cache_policy in ('random', 'lru', 'lfu', 'gds'):
+        for queue_engine in ('deque', 'array'):
+            for is_serial in (True, False):
+                params = {**SMALL, 'cache_policy': cache_policy, 'queue_engine': queue_engine}
+                n_same, n_slot = 0, 0
+                for seed in range(8):
+                    slotted, _ = run_drain(params, seed, False, is_serial)
+                    event, _ = run_drain(params, seed, True, is_serial)
+                    n_same += same_run(slotted, event)
+                    n_slot += slotted.operate.env.time_count
+                print(f'{cache_policy} {queue_engine} serial={is_serial}: same={n_same}/8 slots={n_slot}')
+
+    config_path = '../../config/exp01_order/exp01.ini'
+    for setting_name in ('iot_10_edge_5', 'iot_50_edge_5'):
+        for queue_engine in ('deque', 'array'):
+            params = {**read_config(config_path)[setting_name], 'queue_engine': queue_engine}
+            params['min_bit_arrive'], params['max_bit_arrive'] = 100 * params['min_bit_arrive'], \
+                100 * params['max_bit_arrive']
+            slotted, slotted_time = run_drain(params, 0, False, local=True)
+            event, event_time = run_drain(params, 0, True, local=True)
+            print(f'{setting_name} {queue_engine} all local: same={same_run(slotted, event)} '
+                  f'slots={slotted.operate.env.time_count} slotted={slotted_time:.3f}s event={event_time:.3f}s')
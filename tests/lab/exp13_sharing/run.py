@@ -0,0 +1,65 @@
+import numpy as np
+
+from src.scenario.sharing import processor_sharing
+
+np.set_printoptions(linewidth=np.inf)
+
+"""
+processor_sharing against a loop over device completions: hand-made cases with devices of tied total work (two 1-cycle
+devices on cap 1 finish at 2.0, work [1, 1, 2] at [3, 3, 4]) and random queues with integer cycles (many ties) and real
+cycles, with and without a slot budget that stops the service early.
+"""
+
+
+def reference_sharing(device, remain, density, comp_cap, time_budget):
+    # ONE DEVICE COMPLETION PER STEP, THE CAPACITY SPLIT AMONG THE DEVICES WITH WORK LEFT, EACH DEVICE IN FIFO ORDER
+    cycles = remain * density[device]
+    queues = [list(np.flatnonzero(device == i)) for i in np.unique(device)]
+    left = cycles.copy()
+    done = np.zeros(device.size, bool)
+    finish_time = np.full(device.size, np.inf)
+    clock = 0.0
+    while clock < time_budget and any(queues):
+        active = [queue for queue in queues if queue]
+        n_share = len(active)
+        step = min(sum(left[task] for task in queue) for queue in active)
+        for queue in active:
+            served = 0.0
+            while queue and served + left[queue[0]] <= step + 1e-12:
+                served += left[queue[0]]
+                left[queue[0]] = 0.0
+                done[queue[0]], finish_time[queue[0]] = True, clock + served * n_share / comp_cap
+                queue.pop(0)
+            if queue:
+                left[queue[0]] -= step - served
+        clock += step * n_share / comp_cap
+    remain_new = np.where(~done & (left < cycles), left / density[device], remain)
+    return done, finish_time, remain_new
+
+
+def same(result, other):
+    return all(np.allclose(values, other_values, rtol=1e-9, atol=1e-9) for values, other_values in zip(result, other))
+
+
+if __name__ == '__main__':
+    density = np.ones(3)
+    for device, remain, expected in ((np.array([0, 1]), np.array([1.0, 1.0]), [2.0, 2.0]),
+                                     (np.array([0, 1, 2]), np.array([1.0, 1.0, 2.0]), [3.0, 3.0, 4.0]),
+                                     (np.array([0, 0, 1]), np.array([1.0, 1.0, 2.0]), [2.0, 4.0, 4.0])):
+        done, finish_time, _ = processor_sharing(device, remain, density, 1.0, np.inf)
+        print(f'work {remain.tolist()} on devices {device.tolist()}: finish={finish_time.tolist()} expected={expected} '
+              f'same={np.allclose(finish_time, expected)}')
+
+    rng = np.random.RandomState(0)
+    for kind in ('integer', 'real'):
+        for time_budget in (np.inf, 2.0):
+            n_same = 0
+            for _ in range(200):
+                n_task, n_device = rng.randint(1, 12), rng.randint(1, 5)
+                device = rng.randint(0, n_device, n_task)
+                remain = rng.randint(1, 4, n_task).astype(float) if kind == 'integer' else rng.uniform(0.1, 3, n_task)
+                density = rng.choice([0.5, 1.0], n_device) if kind == 'integer' else rng.uniform(0.5, 2, n_device)
+                comp_cap = rng.choice([0.5, 1.0, 2.0])
+                n_same += same(processor_sharing(device, remain, density, comp_cap, time_budget),
+                               reference_sharing(device, remain, density, comp_cap, time_budget))
+            print(f'{kind} cycles, time_budget={time_budget}: same={n_same}/200')